@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+
+from app.core.storage import audio_storage
+
+router = APIRouter()
+
+# ----------------------------
+# /audio/{audio_id} endpoint
+# ----------------------------
+@router.api_route("/audio/{audio_id}", methods=["GET", "HEAD"])
+async def get_audio(audio_id: str):
+    """
+    Serves a rendered clip. Local storage answers directly (with Range support
+    and immutable cache headers); Cloudinary ids redirect to the CDN.
+    """
+    return audio_storage.response(audio_id)
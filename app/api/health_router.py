@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.utils.warmup import warmup
+
+router = APIRouter()
+
+# ----------------------------
+# /ready readiness probe
+# ----------------------------
+@router.get("/ready", include_in_schema=False)
+async def ready():
+    """200 once start-up warm-up has finished, 503 before; the body has each step's outcome and duration."""
+    return JSONResponse(warmup.status(), status_code=200 if warmup.ready else 503)
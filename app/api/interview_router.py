@@ -1,22 +1,81 @@
-from fastapi import APIRouter
-from app.models.questionManager import questionManager, QuestionManagerResponse, DecisionHeapItem
+from fastapi import APIRouter, Header, HTTPException, Request
+from app.models.questionManager import (
+    questionManager, QuestionManagerResponse, DecisionHeapItem,
+    InterviewPlan, InterviewPlanResponse, CandidatePlanResponse, SessionPlan,
+)
 from app.models.followup import FollowUp
-from app.services.question_trail_dict import AsyncQATrailManager
-from app.services.decision_update import make_decision
+from app.services.question_trail_dict import AsyncQATrailManager, question_from_conversation, format_conversation
+from app.services.decision_update import make_decision, replay_question, shadow_check_intent
+from app.services.intent_rules import intent_rules
+from app.services.answer_cache import answer_cache
 from app.services.mongo import final_collection
-from app.utils.text_speech_cloud import analyze_audio_url
+from app.services.prefetch import SessionPrefetcher
+from app.services.idempotency import idempotency_store, IdempotencyConflict
+from app.services.question_matching import question_index, strip_role_prefix
+from app.utils.text_speech_cloud import analyze_audio_url, prerender_question_audio, question_audio_cache
 from app.utils.heapq_compare import DecisionHeap
+from app.core.transcribe import transcriber
+from app.core.storage import audio_storage
+from app.utils.endpointing import Endpointer, EndpointEvent
+from app.utils.metrics import stage_timer
+from app.utils.logger import bind_context, get_logger
+from app.utils.loop_monitor import tag_task, inherit_task_tags
+from app.utils.profiler import inherit_profile
+from app.utils.inflight import question_work, CHUNK_WORK_DROPPED
+from app.utils.sequencer import chunk_sequencer, session_budget, SessionBusy
+from app.utils.deadline import deadline_scope, STREAM_DEADLINE_MS
+from app.utils.stage_graph import StageGraph, StopGraph
 
+from contextlib import asynccontextmanager
 from datetime import datetime
 from collections import defaultdict
+from typing import Optional
+import asyncio
+import math
+import os
 import uuid
 
+MAX_AUDIO_CHUNK_BYTES = int(os.getenv("MAX_AUDIO_CHUNK_BYTES", str(5 * 1024 * 1024)))
+# Largest candidates x questions expansion one /start/bulk request may ask for
+PLAN_MAX_ITEMS = int(os.getenv("PLAN_MAX_ITEMS", "500"))
+
+log = get_logger(__name__)
 router = APIRouter()
 qa_manager = AsyncQATrailManager()
+prefetcher = SessionPrefetcher(qa_manager)
 
 # Store multiple heaps using candidate Qid as key
 decision_heap_store: dict[str, DecisionHeap] = defaultdict(DecisionHeap)
 
+# Server-side end-of-speech tracking for audio-streamed questions, keyed by Qid
+endpointer_store: dict[str, Endpointer] = defaultdict(Endpointer)
+
+# Keep references to fire-and-forget tasks so they aren't garbage collected mid-flight
+_background_tasks: set[asyncio.Task] = set()
+
+def _bind_request(qid: str, candidate_id: str) -> None:
+    # Log lines and loop-stall reports from this request carry its ids
+    bind_context(qid=qid, candidate_id=candidate_id)
+    tag_task(qid=qid)
+
+def _spawn(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+@asynccontextmanager
+async def _session_slot(candidate_id: str):
+    # Per-candidate in-flight budget; over it the client is told to back off
+    try:
+        async with session_budget.slot(candidate_id):
+            yield
+    except SessionBusy as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many chunks in flight for this session",
+            headers={"Retry-After": str(e.retry_after_s)},
+        )
+
 # ----------------------------
 # /interview/start endpoint
 # ----------------------------
@@ -26,7 +85,13 @@ async def start_interview(request: questionManager):
     new_question = f"{role}: {request.questions}"
     candidate_id = request.candidate_id
 
-    Qid = await qa_manager.create_question(question_text=new_question)
+    # A trail doc prepared while the previous question was being answered skips the Redis write
+    Qid = await prefetcher.claim(candidate_id, request.questions)
+    if Qid is None:
+        Qid = await qa_manager.create_question(question_text=new_question)
+    prefetcher.schedule_next(candidate_id, request.questions)
+    question_index.add_asked(candidate_id, request.questions)
+    audio_id, audio_profile = question_audio_cache.get(request.questions, ("", ""))
 
     return QuestionManagerResponse(
         Qid=Qid,
@@ -34,68 +99,348 @@ async def start_interview(request: questionManager):
         priority=0,
         question=new_question,
         field_up_id="",
-        audio_id=""
+        audio_id=audio_id,
+        audio_profile=audio_profile
     )
 
 # ----------------------------
-# /interview/stream endpoint
+# /interview/plan endpoint
 # ----------------------------
-@router.post("/stream")
-async def stream_transcript(request: FollowUp):
-    qid = request.Qid
-    transcript = request.transcript
-    candidate_id = request.candidate_id
-    final_chunk = request.final_chunk  # ✅ this is guaranteed from FollowUp model
+@router.post("/plan", status_code=202)
+async def set_session_plan(plan: SessionPlan):
+    """
+    Registers the ordered main questions of one candidate's session. The trail
+    doc and audio of each next question are then prepared in the background
+    (see app/services/prefetch.py); sending a different plan cancels that work.
+    """
+    # Planned questions count as asked for this candidate, so follow-ups can't pre-empt ones still to come
+    for question in plan.questions:
+        question_index.add_asked(plan.candidate_id, question)
+    changed = prefetcher.set_plan(plan.candidate_id, plan.questions)
+    return {"candidate_id": plan.candidate_id, "questions": len(plan.questions), "changed": changed}
+
+# ----------------------------
+# /interview/start/bulk endpoint
+# ----------------------------
+@router.post("/start/bulk", response_model=InterviewPlanResponse)
+async def start_interview_plan(plan: InterviewPlan):
+    """
+    Starts a whole interview plan: one trail doc per (candidate, question),
+    written in a single pipelined Redis round-trip, while the audio for every
+    distinct question is rendered and uploaded in parallel.
+    """
+    role = "AI_Interviewer"
+    if len(plan.candidate_ids) * len(plan.questions) > PLAN_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Plan larger than {PLAN_MAX_ITEMS} (candidate, question) pairs")
+    pairs = [(candidate_id, question) for candidate_id in plan.candidate_ids for question in plan.questions]
+
+    qids, audio_ids = await asyncio.gather(
+        qa_manager.create_questions([f"{role}: {question}" for _, question in pairs]),
+        prerender_question_audio(plan.questions),
+    )
 
-    # Step 1: Append transcript to conversation history
-    await qa_manager.append_answer(qid, answer_text=transcript, role="human")
+    # Scripted questions count as asked for each candidate, so follow-ups can't repeat or pre-empt them
+    for candidate_id, question in pairs:
+        question_index.add_asked(candidate_id, question)
 
+    by_candidate: dict[str, list[QuestionManagerResponse]] = {candidate_id: [] for candidate_id in plan.candidate_ids}
+    for (candidate_id, question), qid in zip(pairs, qids):
+        audio_id, audio_profile = audio_ids.get(question, ("", ""))
+        by_candidate[candidate_id].append(QuestionManagerResponse(
+            Qid=qid,
+            status=201,
+            priority=0,
+            question=f"{role}: {question}",
+            field_up_id="",
+            audio_id=audio_id,
+            audio_profile=audio_profile
+        ))
+
+    return InterviewPlanResponse(
+        status=201,
+        candidates=[
+            CandidatePlanResponse(candidate_id=candidate_id, questions=questions)
+            for candidate_id, questions in by_candidate.items()
+        ]
+    )
+
+# ----------------------------
+# Shared chunk pipeline
+# ----------------------------
+# The per-chunk steps run as a stage graph (see app/utils/stage_graph.py):
+#   append ─┐
+#   intent ─┴─ decide ── dedup ── audio ── push
+# Appends of one question take turns (arrival or `seq` order, see
+# app/utils/sequencer.py); everything after them overlaps freely.
+# A stage ends the run early with StopGraph: either a message for the client
+# or _FINALIZE, which closes the question with the best decision so far.
+_FINALIZE = object()
+
+class _ChunkContext:
+    def __init__(self, qid: str, candidate_id: str, transcript: str, final_chunk: bool, seq: Optional[int] = None):
+        self.qid = qid
+        self.candidate_id = candidate_id
+        self.transcript = transcript
+        self.final_chunk = final_chunk
+        self.seq = seq
+        self.full_trail = ""
+        self.question = ""
+        self.fresh_decision = False
+
+chunk_graph = StageGraph("chunk")
+
+@chunk_graph.stage(name="append")
+async def _append_stage(ctx: _ChunkContext):
+    # Step 1: Append transcript to conversation history; the updated doc doubles as the trail read
+    async with chunk_sequencer.turn(ctx.qid, ctx.seq):
+        doc = await qa_manager.append_answer(ctx.qid, answer_text=ctx.transcript, role="human")
+    ctx.full_trail = format_conversation(ctx.qid, doc)
+    return doc
+
+@chunk_graph.stage(name="intent")
+async def _intent_stage(ctx: _ChunkContext):
+    # Obvious intents (repeat requests, filler) skip the LLM
+    return intent_rules.match(ctx.transcript)
+
+@chunk_graph.stage("append", "intent", name="decide")
+async def _decide_stage(ctx: _ChunkContext, doc, intent):
     # Step 2: Decision logic
-    full_trail = await qa_manager.get_question_conversation(qid)
-    decision_result = await make_decision(full_trail, transcript, qid)
+    if intent is not None and intent_rules.should_shadow():
+        _spawn(shadow_check_intent(intent, ctx.full_trail, ctx.transcript))
 
+    if intent is None:
+        # Near-identical chunks for the same question can reuse a past decision (and its audio)
+        ctx.question = question_from_conversation(ctx.full_trail)
+        cached = answer_cache.lookup(ctx.question, ctx.transcript)
+        if cached is not None and answer_cache.serving:
+            return cached.result
+        decision_result = await make_decision(ctx.full_trail, ctx.transcript, ctx.qid)
+        ctx.fresh_decision = True
+        if cached is not None:
+            answer_cache.record_shadow(cached, decision_result)
+        return decision_result
+    if intent.action == "replay_question":
+        question = strip_role_prefix(doc["question"])
+        return replay_question(question, *question_audio_cache.get(question, ("", "")))
+    # Filler: nothing to decide, but a final chunk still closes the question
+    raise StopGraph(_FINALIZE if ctx.final_chunk else {"message": f"💤 Filler chunk skipped ({intent.intent})"})
+
+@chunk_graph.stage("decide", name="dedup")
+async def _dedup_stage(ctx: _ChunkContext, decision_result):
+    # Step 3: Drop follow-ups the candidate has effectively been asked already.
+    # Repeats (506) are meant to echo the question, and priority 0 never gets spoken.
     priority = decision_result.get("priority", 0)
+    if decision_result.get("status", 200) == 506 or priority <= 0:
+        return
     response = decision_result.get("discussion", "No discussion found.")
-    status_code = decision_result.get("status", 200)
+    pending = decision_heap_store[ctx.qid].all_items() if ctx.qid in decision_heap_store else []
+    score, match = question_index.find_duplicate(ctx.candidate_id, response, extra=[item.question for item in pending])
+    if match is not None:
+        raise StopGraph(_FINALIZE if ctx.final_chunk else {"message": f"🔁 Near-duplicate follow-up skipped (score={score:.0f})"})
 
-    # Step 3: Audio generation + Cloudinary upload
+@chunk_graph.stage("decide", "dedup", name="audio")
+async def _audio_stage(ctx: _ChunkContext, decision_result, _):
+    # Step 4: Audio generation + storage upload (skipped when the audio already exists)
     field_up_id = str(uuid.uuid4())
-    success, audio_id = await analyze_audio_url(response, field_up_id)
+    audio_id = decision_result.get("audio_id")
+    audio_profile = decision_result.get("audio_profile", "")
+    if not audio_id:
+        response = decision_result.get("discussion", "No discussion found.")
+        success, audio_id, audio_profile = await analyze_audio_url(response, field_up_id)
+        if not success:
+            raise StopGraph({"message": f"❌ Failed to process chunk {field_up_id}"})
+    return field_up_id, audio_id, audio_profile
 
-    if not success:
-        return {"message": f"❌ Failed to process chunk {field_up_id}"}
+@chunk_graph.stage("decide", "audio", name="push")
+async def _push_stage(ctx: _ChunkContext, decision_result, rendered):
+    field_up_id, audio_id, audio_profile = rendered
+    priority = decision_result.get("priority", 0)
+    if question_work.is_finalized(ctx.qid):
+        # Nobody pops this heap any more
+        CHUNK_WORK_DROPPED.inc(reason="discarded")
+        raise StopGraph({"message": "⏹️ Chunk superseded: question already finalized"})
+    if ctx.fresh_decision:
+        answer_cache.add(ctx.question, ctx.transcript, {**decision_result, "audio_id": audio_id, "audio_profile": audio_profile})
 
-    # Step 4: Push to heap
+    # Step 5: Push to heap
     heap_item = DecisionHeapItem(
-        status=status_code,
+        status=decision_result.get("status", 200),
         priority=priority,
-        question=response,
+        question=decision_result.get("discussion", "No discussion found."),
         field_up_id=field_up_id,
-        audio_id=audio_id
+        audio_id=audio_id,
+        audio_profile=audio_profile,
+        action=decision_result.get("action", "")
     )
-    decision_heap_store[qid].push(heap_item, priority)
-
-    # Step 5: Final chunk — respond with best item
-    if final_chunk:
-        top_item = decision_heap_store[qid].pop()
-        del decision_heap_store[qid]  # ✅ Free memory
-
-        final_doc = {
-            "qid": qid,
-            "candidate_id": candidate_id,
-            "final_decision": top_item.dict(),
-            "full_trail": full_trail,
-            "timestamp": datetime.now()
-        }
-        await final_collection.insert_one(final_doc)
-
-        return QuestionManagerResponse(
-            Qid=qid,
-            status=top_item.status,
-            priority=top_item.priority,
-            question=top_item.question,
-            field_up_id=top_item.field_up_id,
-            audio_id=top_item.audio_id
+    decision_heap_store[ctx.qid].push(heap_item, priority)
+
+    # Step 6: Final chunk — respond with best item
+    return _FINALIZE if ctx.final_chunk else {"message": f"✅ Chunk processed with priority={priority}"}
+
+
+async def process_chunk(qid: str, candidate_id: str, transcript: str, final_chunk: bool, seq: Optional[int] = None):
+    _bind_request(qid, candidate_id)
+    if question_work.is_finalized(qid):
+        CHUNK_WORK_DROPPED.inc(reason="late")
+        return {"message": f"⏹️ Question {qid} is already finalized"}
+
+    # Run as a tracked task, so finalizing the question can cancel it
+    ctx = _ChunkContext(qid, candidate_id, transcript, final_chunk, seq)
+    task = asyncio.create_task(chunk_graph.run(ctx))
+    inherit_task_tags(task)
+    inherit_profile(task)
+    question_work.add(qid, task)
+    try:
+        result, _ = await task
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            raise  # this request itself was cancelled
+        return {"message": "⏹️ Chunk superseded: question already finalized"}
+    finally:
+        question_work.discard(qid, task)
+
+    if result is _FINALIZE:
+        return await finalize_question(qid, candidate_id, ctx.full_trail)
+    return result
+
+
+async def _store_final(final_doc: dict) -> None:
+    with stage_timer("mongo") as timer:
+        try:
+            await final_collection.insert_one(final_doc)
+        except Exception as e:
+            timer.outcome = "error"
+            log.error("final_response.store_failed", qid=final_doc["qid"], error=str(e))
+
+
+async def finalize_question(qid: str, candidate_id: str, full_trail: str):
+    # Let earlier chunks still in flight land (FINALIZE_GRACE_MS), then cancel the rest
+    if not question_work.is_finalized(qid):
+        await question_work.settle(qid)
+    if question_work.is_finalized(qid):
+        return {"message": f"⚠️ Question {qid} was already finalized"}
+    question_work.finalize(qid)
+    chunk_sequencer.forget(qid)
+
+    heap = decision_heap_store.pop(qid, None)  # ✅ Free memory
+    top_item = heap.pop() if heap is not None else None
+    endpointer_store.pop(qid, None)
+
+    if top_item is None:
+        return {"message": f"⚠️ No decision available for {qid}"}
+
+    if top_item.priority > 0:
+        question_index.add_asked(candidate_id, top_item.question)
+
+    final_doc = {
+        "qid": qid,
+        "candidate_id": candidate_id,
+        "final_decision": top_item.dict(),
+        "full_trail": full_trail,
+        "timestamp": datetime.now()
+    }
+    # The response doesn't depend on the write, so it happens off the critical path
+    _spawn(_store_final(final_doc))
+
+    return QuestionManagerResponse(
+        Qid=qid,
+        status=top_item.status,
+        priority=top_item.priority,
+        question=top_item.question,
+        field_up_id=top_item.field_up_id,
+        audio_id=top_item.audio_id,
+        audio_profile=top_item.audio_profile
+    )
+
+# ----------------------------
+# /interview/stream endpoint
+# ----------------------------
+@router.post("/stream")
+async def stream_transcript(request: FollowUp, idempotency_key: Optional[str] = Header(None)):
+    """
+    A retry carrying the same `Idempotency-Key` header, `idempotency_key` or
+    `seq` as an earlier submission gets that submission's result instead of
+    being processed again. `seq` also orders chunks of the same question that
+    arrive out of order. A session with too many chunks in flight gets 429.
+    """
+    key = idempotency_store.key_for(request.Qid, idempotency_key or request.idempotency_key, request.seq)
+
+    async def compute():
+        async with _session_slot(request.candidate_id):
+            with deadline_scope(STREAM_DEADLINE_MS):
+                return await process_chunk(
+                    request.Qid, request.candidate_id, request.transcript, request.final_chunk, request.seq
+                )
+
+    try:
+        return await idempotency_store.run(key, compute)
+    except IdempotencyConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail="This chunk is still being processed",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after_ms / 1000)))},
         )
 
-    return {"message": f"✅ Chunk processed with priority={priority}"}
+# ----------------------------
+# /interview/stream/audio endpoint
+# ----------------------------
+@router.post("/stream/audio")
+async def stream_audio(request: Request, Qid: str, candidate_id: str, final_chunk: Optional[bool] = None):
+    """
+    Accepts a raw audio chunk (any container ffmpeg/av can decode) as the request
+    body, transcribes it on-box and feeds the text into the regular chunk pipeline.
+
+    When `final_chunk` is omitted the server decides it: VAD tracks trailing
+    silence across chunks and finalizes the question once the candidate stops
+    speaking. An explicit true/false from the client always wins.
+    Chunks count against the same per-session in-flight budget as /stream.
+    """
+    _bind_request(Qid, candidate_id)
+    if question_work.is_finalized(Qid):
+        CHUNK_WORK_DROPPED.inc(reason="late")
+        return {"message": f"⏹️ Question {Qid} is already finalized", "transcript": "", "endpoint": EndpointEvent.END.value}
+    async with _session_slot(candidate_id):
+        with deadline_scope(STREAM_DEADLINE_MS):
+            # Endpointing state advances in arrival order, whatever order transcriptions finish in
+            endpointer = endpointer_store[Qid]
+            ticket = endpointer.ticket()
+            try:
+                audio_bytes = await request.body()
+                if not audio_bytes:
+                    raise HTTPException(status_code=400, detail="Empty audio chunk")
+                if len(audio_bytes) > MAX_AUDIO_CHUNK_BYTES:
+                    raise HTTPException(status_code=413, detail="Audio chunk too large")
+
+                with stage_timer("stt") as timer:
+                    result = await transcriber.transcribe(audio_bytes)
+                    if result["error"]:
+                        timer.outcome = "error"
+                if result["error"]:
+                    raise HTTPException(status_code=422, detail=f"Could not decode audio: {result['error']}")
+
+                event = await endpointer.update_in_order(ticket, result["has_speech"], result["trailing_silence"], result["duration"])
+            finally:
+                endpointer.finish(ticket)
+
+            if event == EndpointEvent.PAUSE:
+                # Candidate may be done — get the current best follow-up's audio to the edge now
+                top_item = decision_heap_store[Qid].peek() if Qid in decision_heap_store else None
+                if top_item is not None and top_item.audio_id:
+                    _spawn(audio_storage.prewarm(top_item.audio_id))
+
+            if final_chunk is None:
+                final_chunk = event == EndpointEvent.END
+
+            transcript = result["text"]
+            if not transcript:
+                # Nothing was said — don't spend an LLM call, but still honour the final pop
+                if final_chunk:
+                    full_trail = await qa_manager.get_question_conversation(Qid)
+                    return await finalize_question(Qid, candidate_id, full_trail)
+                return {"message": "🤫 No speech detected in chunk", "transcript": "", "endpoint": event.value}
+
+            response = await process_chunk(Qid, candidate_id, transcript, final_chunk)
+            if isinstance(response, dict):
+                response["transcript"] = transcript
+                response["endpoint"] = event.value
+            return response
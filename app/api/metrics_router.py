@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Match
+
+from app.utils.metrics import render_metrics, HTTP_REQUEST_SECONDS, HTTP_IN_FLIGHT
+
+router = APIRouter()
+
+# ----------------------------
+# /metrics scrape endpoint
+# ----------------------------
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+def _route_template(request: Request) -> str:
+    # Label by route template, not raw path, so ids in the URL don't explode cardinality
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path)
+    return "unmatched"
+
+
+async def metrics_middleware(request: Request, call_next):
+    route = _route_template(request)
+    with HTTP_REQUEST_SECONDS.time(in_flight=HTTP_IN_FLIGHT, route=route, method=request.method) as timer:
+        response = await call_next(request)
+        timer.outcome = f"{response.status_code // 100}xx"
+        return response
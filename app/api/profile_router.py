@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.utils.profiler import request_profiler
+
+router = APIRouter()
+
+# ----------------------------
+# /debug/profiles endpoints
+# ----------------------------
+@router.get("/profiles")
+async def list_profiles():
+    """Most recent profiled requests, newest first (without the stack data)."""
+    return [
+        {k: v for k, v in profile.items() if k != "folded"}
+        for profile in reversed(request_profiler.recent.values())
+    ]
+
+
+@router.get("/profiles/{request_id}", response_class=PlainTextResponse)
+async def get_profile(request_id: str):
+    """Collapsed stacks (`frame;frame;frame count`) for flamegraph.pl or speedscope."""
+    profile = request_profiler.recent.get(request_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(profile["folded"] + "\n")
@@ -1,17 +1,33 @@
+import os
+import json
+import time
+import asyncio
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from app.services.followup_generator import generate_followup
-from app.services.backend_integration import send_to_backend
+from app.services.backend_integration import send_to_backend, send_batch_to_backend
+from app.utils.logger import get_logger
+
+log = get_logger(__name__)
 
 router = APIRouter(tags=["Flow Controller"])
 
+# --- Batch config ---
+FLOW_BATCH_CONCURRENCY = int(os.getenv("FLOW_BATCH_CONCURRENCY", "8"))
+FLOW_BATCH_MAX_ITEMS = int(os.getenv("FLOW_BATCH_MAX_ITEMS", "500"))
+
 class UserResponse(BaseModel):
     question_id: str
     answer: str
+    qa_trail: str = ""
 
 class InterviewQuestion(BaseModel):
     question: str
 
+class BatchRequest(BaseModel):
+    items: list[UserResponse]
+
 @router.post("/interview", response_model=InterviewQuestion , summary="Generate follow-up question")
 async def interview_flow(user_response: UserResponse):
     """
@@ -23,7 +39,7 @@ async def interview_flow(user_response: UserResponse):
     """
     try:
         # 1. Get follow-up question from Member 4
-        followup_question = await generate_followup(user_response.answer)
+        followup_question = await generate_followup(user_response.answer, user_response.qa_trail)
 
         # 2. Send the follow-up question to Member 6's backend
         await send_to_backend({
@@ -36,3 +52,51 @@ async def interview_flow(user_response: UserResponse):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/interview/batch", summary="Generate follow-up questions for many answers")
+async def interview_flow_batch(batch: BatchRequest):
+    """
+    Generates follow-ups for many (question_id, answer) pairs, at most
+    FLOW_BATCH_CONCURRENCY at a time. Results stream back as NDJSON in
+    completion order (each line carries its input `index`); the last line is a
+    summary, sent after all questions went to the backend in one bulk call.
+    """
+    if not batch.items:
+        raise HTTPException(status_code=422, detail="Empty batch")
+    if len(batch.items) > FLOW_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch larger than {FLOW_BATCH_MAX_ITEMS} items")
+
+    semaphore = asyncio.Semaphore(max(1, FLOW_BATCH_CONCURRENCY))
+
+    async def generate(index: int, item: UserResponse) -> dict:
+        async with semaphore:
+            started = time.perf_counter()
+            question = await generate_followup(item.answer, item.qa_trail)
+        return {
+            "index": index,
+            "question_id": item.question_id,
+            "question": question,
+            "ms": round((time.perf_counter() - started) * 1000),
+        }
+
+    async def results():
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(generate(i, item)) for i, item in enumerate(batch.items)]
+        delivered = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                delivered.append({"question_id": result["question_id"], "question": result["question"]})
+                yield json.dumps(result) + "\n"
+        finally:
+            # Client went away mid-stream: don't keep spending LLM calls on it
+            for task in tasks:
+                task.cancel()
+
+        sent = await send_batch_to_backend(delivered)
+        total_ms = round((time.perf_counter() - started) * 1000)
+        log.info("flow.batch_done", count=len(delivered), delivered=sent, ms=total_ms)
+        yield json.dumps({"done": True, "count": len(delivered), "delivered": sent, "ms": total_ms}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
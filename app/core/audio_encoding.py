@@ -0,0 +1,144 @@
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from dotenv import load_dotenv
+
+from app.utils.logger import get_logger
+from app.utils.metrics import Counter, stage_timer
+
+load_dotenv()
+log = get_logger(__name__)
+
+# Re-encodes gTTS output into a smaller speech profile before it is stored.
+# gTTS MP3s are 24 kHz mono at 64 kbps; speech stays intelligible at a
+# fraction of that. Encoding runs in a process pool (PyAV, off the event
+# loop). A clip that fails to encode is shipped as the original MP3, and the
+# profile actually used is returned alongside the audio id.
+#
+# AUDIO_ENCODING_PROFILE:
+#   original   - keep the gTTS MP3 as is
+#   mp3_speech - mono MP3, 22.05 kHz, 32 kbps (plays everywhere)
+#   opus       - mono Opus in OGG, 24 kHz, 16 kbps (smallest; needs Opus support on the client)
+
+# --- Config ---
+AUDIO_ENCODING_PROFILE = os.getenv("AUDIO_ENCODING_PROFILE", "original").lower()
+AUDIO_ENCODE_WORKERS = int(os.getenv("AUDIO_ENCODE_WORKERS", "2"))
+
+ORIGINAL_PROFILE = "original"
+
+AUDIO_ENCODED_BYTES = Counter(
+    "audio_encoded_bytes_total", "Audio bytes before (side=in) and after (side=out) encoding.", ("profile", "side")
+)
+AUDIO_ENCODE_FALLBACKS = Counter(
+    "audio_encode_fallbacks_total", "Clips shipped as the original MP3 because encoding failed.", ("profile",)
+)
+
+
+@dataclass(frozen=True)
+class EncodingProfile:
+    name: str
+    codec: str
+    container: str
+    suffix: str
+    sample_rate: int
+    bit_rate: int
+
+
+PROFILES = {
+    "mp3_speech": EncodingProfile("mp3_speech", "libmp3lame", "mp3", ".mp3", 22050, 32_000),
+    "opus": EncodingProfile("opus", "libopus", "ogg", ".ogg", 24000, 16_000),
+}
+
+
+# --- Worker side ---
+def _encode_file(src: str, dst: str, profile: EncodingProfile) -> int:
+    import av
+
+    with av.open(src) as source, av.open(dst, "w", format=profile.container) as sink:
+        stream = sink.add_stream(profile.codec, rate=profile.sample_rate, layout="mono")
+        stream.bit_rate = profile.bit_rate
+        # The encoder resamples and re-frames (Opus wants 20 ms frames) on its own
+        for frame in source.decode(audio=0):
+            frame.pts = None
+            for packet in stream.encode(frame):
+                sink.mux(packet)
+        for packet in stream.encode(None):
+            sink.mux(packet)
+    return os.path.getsize(dst)
+
+
+def _ping_worker() -> int:
+    import av  # noqa: F401 - the import is the slow part of a cold worker
+
+    return os.getpid()
+
+
+# --- Event-loop side ---
+class AudioEncoder:
+    def __init__(self, profile: str = AUDIO_ENCODING_PROFILE, workers: int = AUDIO_ENCODE_WORKERS):
+        if profile != ORIGINAL_PROFILE and profile not in PROFILES:
+            log.warning("audio_encoding.unknown_profile", profile=profile, fallback=ORIGINAL_PROFILE)
+            profile = ORIGINAL_PROFILE
+        self.profile = profile
+        self.workers = max(1, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def warm_up(self) -> None:
+        if self.profile == ORIGINAL_PROFILE:
+            return
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        await asyncio.gather(*(loop.run_in_executor(pool, _ping_worker) for _ in range(self.workers)))
+
+    async def encode(self, file_path: str) -> tuple[str, str]:
+        """
+        Encodes the clip with the configured profile. Returns (path, profile):
+        the new file (the source is removed) or the untouched source with
+        profile "original".
+        """
+        if self.profile == ORIGINAL_PROFILE:
+            return file_path, ORIGINAL_PROFILE
+
+        profile = PROFILES[self.profile]
+        src = Path(file_path)
+        dst = src.with_name(f"{src.stem}.{profile.name}{profile.suffix}")
+        loop = asyncio.get_running_loop()
+        with stage_timer("encode") as timer:
+            try:
+                size_in = src.stat().st_size
+                size_out = await loop.run_in_executor(self._get_pool(), _encode_file, str(src), str(dst), profile)
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    # A worker died (OOM, crash); start a fresh pool on the next clip
+                    self.shutdown()
+                timer.outcome = "error"
+                log.warning("audio_encoding.failed", path=file_path, profile=profile.name, error=str(e))
+                AUDIO_ENCODE_FALLBACKS.inc(profile=profile.name)
+                dst.unlink(missing_ok=True)
+                return file_path, ORIGINAL_PROFILE
+
+        AUDIO_ENCODED_BYTES.inc(size_in, profile=profile.name, side="in")
+        AUDIO_ENCODED_BYTES.inc(size_out, profile=profile.name, side="out")
+        src.unlink(missing_ok=True)
+        return str(dst), profile.name
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+audio_encoder = AudioEncoder()
@@ -0,0 +1,194 @@
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import asyncio
+import inspect
+import threading
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Optional
+from dotenv import load_dotenv
+
+from app.utils.logger import get_logger
+from app.utils.metrics import Counter
+
+load_dotenv()
+log = get_logger(__name__)
+
+# Record/replay of external calls (LLM, TTS, upload) for offline regression runs.
+#
+# record: calls go out as usual (real backends or the fakes); each one is
+#   appended to <CASSETTE_DIR>/<CASSETTE_NAME>/<backend>.jsonl as
+#   {"fp", "latency_ms", "response"} (or "error"). TTS audio is kept under
+#   blobs/, named by its content hash.
+# replay: calls are answered from those files. Each response comes after its
+#   recorded latency scaled by CASSETTE_LATENCY_SCALE; 0 means instantly.
+#   Calls with the same fingerprint get their recordings in recorded order,
+#   then start over. Calls that were never recorded raise CassetteMiss, or go
+#   out for real with CASSETTE_ON_MISS=live.
+#
+# Fingerprints hash the request with UUIDs blanked out, so the Qids that end
+# up in prompts don't make each run unique.
+# Hedged LLM calls are separate calls here too; run both sides with
+# LLM_HEDGE_ENABLED=0 when comparing runs call for call.
+
+# --- Config ---
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off").lower()  # off, record, replay
+CASSETTE_DIR = os.getenv("CASSETTE_DIR", "cassettes")
+CASSETTE_NAME = os.getenv("CASSETTE_NAME", "default")
+CASSETTE_LATENCY_SCALE = float(os.getenv("CASSETTE_LATENCY_SCALE", "1.0"))
+CASSETTE_ON_MISS = os.getenv("CASSETTE_ON_MISS", "error").lower()  # error, live
+
+CASSETTE_CALLS = Counter(
+    "cassette_calls_total", "Calls through the cassette layer: recorded, hit, miss.", ("backend", "result")
+)
+
+_UUID_RE = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE)
+
+
+class CassetteMiss(RuntimeError):
+    def __init__(self, backend: str, fp: str):
+        super().__init__(f"No {backend} recording for {fp[:12]}")
+        self.backend = backend
+        self.fp = fp
+
+
+class CassetteReplayError(RuntimeError):
+    """A recorded call that failed, failing again on replay."""
+
+
+def fingerprint(backend: str, request: Any) -> str:
+    material = json.dumps(request, sort_keys=True, default=str, ensure_ascii=False)
+    material = _UUID_RE.sub("<uuid>", material)
+    return hashlib.sha256(f"{backend}\n{material}".encode()).hexdigest()
+
+
+def _file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class Cassette:
+    def __init__(self, mode: str = CASSETTE_MODE, directory: str = os.path.join(CASSETTE_DIR, CASSETTE_NAME)):
+        if mode not in ("off", "record", "replay"):
+            raise ValueError(f"Unknown CASSETTE_MODE: {mode}")
+        self.mode = mode
+        self.directory = directory
+        self.blob_dir = os.path.join(directory, "blobs")
+        self._write_lock = threading.Lock()
+        self._recordings: dict[str, dict[str, list[dict]]] = defaultdict(lambda: defaultdict(list))
+        self._cursors: dict[tuple[str, str], int] = defaultdict(int)
+        if mode == "record":
+            os.makedirs(self.blob_dir, exist_ok=True)
+        elif mode == "replay":
+            self._load()
+
+    @property
+    def active(self) -> bool:
+        return self.mode != "off"
+
+    def _load(self) -> None:
+        if not os.path.isdir(self.directory):
+            raise FileNotFoundError(f"Cassette directory not found: {self.directory}")
+        loaded = 0
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".jsonl"):
+                continue
+            backend = name.removesuffix(".jsonl")
+            with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._recordings[backend][entry["fp"]].append(entry)
+                        loaded += 1
+        log.info("cassette.loaded", directory=self.directory, entries=loaded)
+
+    def _append(self, backend: str, entry: dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._write_lock, open(os.path.join(self.directory, f"{backend}.jsonl"), "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def _next(self, backend: str, fp: str) -> Optional[dict]:
+        entries = self._recordings[backend].get(fp)
+        if not entries:
+            return None
+        cursor = self._cursors[(backend, fp)]
+        self._cursors[(backend, fp)] = cursor + 1
+        return entries[cursor % len(entries)]
+
+    async def call(
+        self,
+        backend: str,
+        request: Any,
+        live: Callable[[], Awaitable[Any]],
+        encode: Callable[[Any], Any] = lambda value: value,
+        decode: Callable[[Any], Any] = lambda value: value,
+    ) -> Any:
+        """
+        `live()` recorded or replayed under the fingerprint of `request`.
+        `encode` turns its result into JSON for the cassette and `decode` turns
+        that back; either may be async.
+        """
+        if self.mode == "off":
+            return await live()
+        fp = fingerprint(backend, request)
+
+        if self.mode == "replay":
+            entry = self._next(backend, fp)
+            if entry is None:
+                CASSETTE_CALLS.inc(backend=backend, result="miss")
+                if CASSETTE_ON_MISS != "live":
+                    raise CassetteMiss(backend, fp)
+                log.warning("cassette.miss", backend=backend, fp=fp[:12])
+                return await live()
+            CASSETTE_CALLS.inc(backend=backend, result="hit")
+            delay = entry["latency_ms"] / 1000 * CASSETTE_LATENCY_SCALE
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if "error" in entry:
+                raise CassetteReplayError(entry["error"])
+            return await _maybe_await(decode(entry["response"]))
+
+        started = time.perf_counter()
+        try:
+            result = await live()
+        except Exception as e:
+            entry = {"fp": fp, "latency_ms": _elapsed_ms(started), "error": f"{type(e).__name__}: {e}"}
+            await asyncio.to_thread(self._append, backend, entry)
+            CASSETTE_CALLS.inc(backend=backend, result="recorded")
+            raise
+        entry = {"fp": fp, "latency_ms": _elapsed_ms(started), "response": await _maybe_await(encode(result))}
+        await asyncio.to_thread(self._append, backend, entry)
+        CASSETTE_CALLS.inc(backend=backend, result="recorded")
+        return result
+
+    # --- Files ---
+    async def file_digest(self, path: str) -> str:
+        return await asyncio.to_thread(_file_sha256, path)
+
+    async def store_blob(self, path: str) -> str:
+        """Copies a produced file into the cassette; returns its blob name."""
+        def copy() -> str:
+            name = _file_sha256(path) + os.path.splitext(path)[1]
+            target = os.path.join(self.blob_dir, name)
+            if not os.path.exists(target):
+                shutil.copyfile(path, target)
+            return name
+        return await asyncio.to_thread(copy)
+
+    async def load_blob(self, name: str, dest: str) -> str:
+        await asyncio.to_thread(shutil.copyfile, os.path.join(self.blob_dir, name), dest)
+        return dest
+
+
+async def _maybe_await(value: Any) -> Any:
+    return await value if inspect.isawaitable(value) else value
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+cassette = Cassette()
@@ -1,10 +1,16 @@
 import cloudinary
 import cloudinary.uploader
+import cloudinary.utils
+import httpx
 from dotenv import load_dotenv
 import os
 import asyncio
+from app.core.cassette import cassette
+from app.core.fakes import fake_enabled, fake_upload
+from app.utils.logger import get_logger
 
 load_dotenv()
+log = get_logger(__name__)
 
 cloudinary.config(
     cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
@@ -14,6 +20,16 @@ cloudinary.config(
 )
 
 async def upload_audio_async(file_path):
+    if not cassette.active:
+        return await _upload(file_path)
+    # Recorded/replayed by content, so a replayed TTS clip finds its upload
+    digest = await cassette.file_digest(file_path)
+    return await cassette.call("upload", {"sha256": digest}, lambda: _upload(file_path))
+
+async def _upload(file_path):
+    if fake_enabled("upload"):
+        return await fake_upload(file_path)
+
     loop = asyncio.get_event_loop()
     try:
         # Wrap the sync upload function to run in executor (non-blocking)
@@ -25,8 +41,30 @@ async def upload_audio_async(file_path):
                 # notification_url="https://www.example.com/cloudinary_webhook"
             )
         )
-        print(f"Async upload completed for: {file_path}. Public ID: {upload_result['public_id']}")
+        log.debug("upload.completed", path=file_path, public_id=upload_result["public_id"])
         return upload_result['public_id']
     except Exception as e:
-        print(f"Error uploading audio asynchronously: {e}")
+        log.error("upload.failed", path=file_path, error=str(e))
         return None
+
+_prewarm_client = None
+
+async def prewarm_audio(public_id: str) -> bool:
+    """
+    Touch the delivery URL so the CDN edge has the clip cached before the
+    candidate's client asks for it.
+    """
+    global _prewarm_client
+    if fake_enabled("upload"):
+        return True
+    if _prewarm_client is None:
+        _prewarm_client = httpx.AsyncClient(timeout=5.0)
+
+    # gTTS mp3s are stored by Cloudinary under the "video" resource type
+    url, _ = cloudinary.utils.cloudinary_url(public_id, resource_type="video", secure=True)
+    try:
+        resp = await _prewarm_client.head(url)
+        return resp.status_code < 400
+    except Exception as e:
+        log.warning("prewarm.failed", public_id=public_id, error=str(e))
+        return False
@@ -0,0 +1,142 @@
+import os
+import json
+import math
+import time
+import uuid
+import random
+import asyncio
+from typing import Any, Optional
+from dotenv import load_dotenv
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.utils.logger import get_logger
+
+load_dotenv()
+log = get_logger(__name__)
+
+# Local stand-ins for Gemini, gTTS and Cloudinary so the pipeline can be load
+# tested offline. Enable per backend, e.g. FAKE_BACKENDS=llm,tts,upload
+FAKE_BACKENDS = {b.strip().lower() for b in os.getenv("FAKE_BACKENDS", "").split(",") if b.strip()}
+
+
+def fake_enabled(backend: str) -> bool:
+    return backend in FAKE_BACKENDS or "all" in FAKE_BACKENDS
+
+
+class LatencyProfile:
+    """
+    Log-normal latency described by its median and p95 (milliseconds), plus an
+    error rate. Read from FAKE_<NAME>_LATENCY_MS="median,p95" and
+    FAKE_<NAME>_ERROR_RATE.
+    """
+
+    def __init__(self, median_ms: float, p95_ms: float, error_rate: float = 0.0):
+        self.median_ms = max(median_ms, 0.0)
+        self.p95_ms = max(p95_ms, self.median_ms)
+        self.error_rate = error_rate
+        self._mu = math.log(self.median_ms) if self.median_ms > 0 else 0.0
+        self._sigma = math.log(self.p95_ms / self.median_ms) / 1.645 if self.median_ms > 0 else 0.0
+
+    @classmethod
+    def from_env(cls, name: str, median_ms: float, p95_ms: float) -> "LatencyProfile":
+        raw = os.getenv(f"FAKE_{name}_LATENCY_MS")
+        if raw:
+            parts = [float(p) for p in raw.split(",")]
+            median_ms, p95_ms = parts[0], parts[1] if len(parts) > 1 else parts[0]
+        error_rate = float(os.getenv(f"FAKE_{name}_ERROR_RATE", "0"))
+        return cls(median_ms, p95_ms, error_rate)
+
+    def sample_seconds(self) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        return random.lognormvariate(self._mu, self._sigma) / 1000
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+LLM_PROFILE = LatencyProfile.from_env("LLM", 600, 1800)
+TTS_PROFILE = LatencyProfile.from_env("TTS", 400, 1200)
+UPLOAD_PROFILE = LatencyProfile.from_env("UPLOAD", 300, 1000)
+FAKE_LLM_MALFORMED_RATE = float(os.getenv("FAKE_LLM_MALFORMED_RATE", "0"))
+
+
+class FakeBackendError(RuntimeError):
+    pass
+
+
+# --- Fake LLM ---
+_ACTIONS = ["follow_up", "wrong_answer", "Repeat_question", "Elaborate", "No_question"]
+_ACTION_WEIGHTS = [0.45, 0.2, 0.05, 0.2, 0.1]
+_TOPICS = [
+    "caching", "DNS resolution", "TLS handshakes", "merge conflicts", "load balancing",
+    "database indexes", "retries", "rate limits", "observability", "rollbacks",
+    "message queues", "schema migrations", "connection pooling", "team conflict",
+]
+
+
+def _fake_llm_content(prompt_text: str) -> str:
+    if random.random() < FAKE_LLM_MALFORMED_RATE:
+        return "Sorry, I can't help with that."
+
+    if "decision engine" in prompt_text:
+        return json.dumps({
+            "action": random.choices(_ACTIONS, weights=_ACTION_WEIGHTS)[0],
+            "trail_summary": "The candidate is answering the main question.",
+            "context_summary": "The candidate described part of their approach.",
+        })
+
+    first, second = random.sample(_TOPICS, 2)
+    question = f"How would {first} interact with {second} in the system you described, case {random.randint(1, 10_000)}?"
+    if "repeat the question" in prompt_text:
+        return json.dumps({"status": 506, "discussion": question, "priority": 1000})
+    if "incorrect or incomplete answer" in prompt_text:
+        return json.dumps({"status": 404, "explanation": question, "priority": random.randint(50, 90)})
+    return json.dumps({"status": 206, "discussion": question, "priority": 60 + random.randint(1, 5)})
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers every prompt with plausible JSON after a sampled delay."""
+
+    temperature: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _result(self, messages: list[BaseMessage]) -> ChatResult:
+        if LLM_PROFILE.should_fail():
+            raise FakeBackendError("Fake LLM provider error")
+        prompt_text = "\n".join(str(m.content) for m in messages)
+        message = AIMessage(content=_fake_llm_content(prompt_text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(LLM_PROFILE.sample_seconds())
+        return self._result(messages)
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(LLM_PROFILE.sample_seconds())
+        return self._result(messages)
+
+
+# --- Fake TTS ---
+async def fake_text_to_speech(output_path: str) -> str:
+    await asyncio.sleep(TTS_PROFILE.sample_seconds())
+    if TTS_PROFILE.should_fail():
+        raise FakeBackendError("Fake TTS error")
+    with open(output_path, "wb") as f:
+        f.write(b"\xff\xfb\x90\x00" + b"\x00" * 412)  # one silent MPEG frame
+    return output_path
+
+
+# --- Fake upload ---
+async def fake_upload(file_path: str) -> Optional[str]:
+    await asyncio.sleep(UPLOAD_PROFILE.sample_seconds())
+    if UPLOAD_PROFILE.should_fail():
+        log.warning("fake_upload.failed", path=file_path)
+        return None
+    return f"fake/{uuid.uuid4()}"
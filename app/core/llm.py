@@ -0,0 +1,188 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Any, Optional
+from dotenv import load_dotenv
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+
+from app.core.cassette import cassette
+from app.core.fakes import FakeChatModel, fake_enabled
+from app.core.provider_guard import ProviderUnavailable, provider_guard
+from app.utils.deadline import DeadlineExceeded, stage_timeout
+from app.utils.logger import get_logger
+from app.utils.metrics import LLM_CALL_SECONDS, LLM_HEDGES, LLM_HEDGE_WINS, LLM_TIMEOUTS
+
+load_dotenv()
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash-lite-preview-06-17")
+
+# Hedging: if a call is still running after the stage's recent p95, fire one
+# duplicate and take whichever answers first. Costs ~5% extra calls and cuts
+# the tail the provider adds on its own.
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "1") == "1"
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+LLM_HEDGE_MIN_DELAY_MS = int(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "200"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+
+log = get_logger(__name__)
+
+# Every client handed out by get_llm, so start-up can warm each one
+_llm_clients: list[BaseChatModel] = []
+
+
+def get_llm(temperature: float) -> BaseChatModel:
+    """
+    Builds the chat model used by the decision engine and the handlers:
+    Gemini normally, or the local fake when FAKE_BACKENDS includes "llm".
+    """
+    llm = _build_llm(temperature)
+    _llm_clients.append(llm)
+    return llm
+
+
+async def warm_up_llms() -> None:
+    """
+    One trivial call per client, so its connection (TLS/gRPC channel) is open
+    before a candidate's first chunk. Skipped when replaying a cassette.
+    """
+    if cassette.mode == "replay":
+        return
+    await asyncio.gather(*(llm.ainvoke("Reply with OK.") for llm in _llm_clients))
+
+
+def _build_llm(temperature: float) -> BaseChatModel:
+    if fake_enabled("llm"):
+        return FakeChatModel(temperature=temperature)
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY not found in .env")
+
+    return ChatGoogleGenerativeAI(
+        model=GEMINI_MODEL,
+        temperature=temperature,
+        google_api_key=api_key
+    )
+
+
+def llm_model_name(llm: BaseChatModel) -> str:
+    """Short model label for metrics."""
+    name = getattr(llm, "model", None) or llm._llm_type
+    return str(name).removeprefix("models/")
+
+
+class LatencyWindow:
+    """Rolling window of successful call latencies for one stage."""
+
+    def __init__(self, size: int = LLM_LATENCY_WINDOW):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Recent p95 (seconds), or None until there are enough samples to trust it."""
+        if len(self._samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        quantile = ordered[min(len(ordered) - 1, int(LLM_HEDGE_QUANTILE * len(ordered)))]
+        return max(quantile, LLM_HEDGE_MIN_DELAY_MS / 1000)
+
+
+_latency_windows: dict[str, LatencyWindow] = {}
+
+
+async def invoke_llm(chain, inputs: dict, stage: str) -> Any:
+    """
+    `chain.ainvoke(inputs)` bounded by the stage timeout (see app.utils.deadline),
+    with one hedged duplicate after the stage's recent p95. Every attempt takes
+    a provider-guard slot first. Raises DeadlineExceeded when neither attempt
+    answers in time, or ProviderUnavailable when the guard refuses the call;
+    callers turn both into a degraded result.
+    """
+    timeout = stage_timeout(stage)
+    model = llm_model_name(getattr(chain, "last", chain))
+    if timeout <= 0:
+        LLM_TIMEOUTS.inc(chain=stage)
+        raise DeadlineExceeded(stage)
+
+    window = _latency_windows.setdefault(stage, LatencyWindow())
+
+    timed_out = False
+
+    async def attempt():
+        lease = await provider_guard.acquire()
+        started = time.perf_counter()
+        outcome = "cancelled"
+        try:
+            # Recorded/replayed when CASSETTE_MODE is set (see app/core/cassette.py)
+            result = await cassette.call(
+                "llm",
+                {"chain": stage, "model": model, "inputs": inputs},
+                lambda: chain.ainvoke(inputs),
+                encode=lambda message: message.content,
+                decode=lambda content: AIMessage(content=content),
+            )
+            outcome = "ok"
+        except asyncio.CancelledError:
+            # Losing a hedge race is neutral; running out of time counts against the provider
+            if timed_out:
+                outcome = "error"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            provider_guard.release_soon(lease, time.perf_counter() - started, outcome)
+        window.record(time.perf_counter() - started)
+        return result
+
+    loop = asyncio.get_running_loop()
+    expires_at = loop.time() + timeout
+    primary = asyncio.create_task(attempt())
+    hedge = None
+    pending = {primary}
+    error: Optional[BaseException] = None
+
+    with LLM_CALL_SECONDS.time(model=model, chain=stage) as timer:
+        try:
+            hedge_delay = window.hedge_delay() if LLM_HEDGE_ENABLED else None
+            if hedge_delay is not None and hedge_delay < timeout:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+                if not done:
+                    hedge = asyncio.create_task(attempt())
+                    pending.add(hedge)
+                    LLM_HEDGES.inc(chain=stage)
+
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=expires_at - loop.time(), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            LLM_HEDGE_WINS.inc(chain=stage)
+                        return task.result()
+                    error = task.exception()
+
+            if error is not None and not pending:
+                if isinstance(error, ProviderUnavailable):
+                    timer.outcome = "rejected"
+                raise error
+
+            timed_out = True
+            timer.outcome = "timeout"
+            LLM_TIMEOUTS.inc(chain=stage)
+            log.warning("llm.timeout", chain=stage, timeout_ms=round(timeout * 1000), hedged=hedge is not None)
+            raise DeadlineExceeded(stage)
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
@@ -0,0 +1,276 @@
+import os
+import time
+import uuid
+import asyncio
+from typing import Optional
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+
+from app.utils.deadline import LLM_BUDGET_MS
+from app.utils.logger import get_logger
+from app.utils.metrics import Counter, Gauge
+
+load_dotenv()
+log = get_logger(__name__)
+
+# Provider guard shared by every worker through Redis.
+# Each LLM call takes a slot first; the slot is refused when
+#   - the circuit breaker is open (too many provider errors recently),
+#   - the token bucket is empty (requests/second cap), or
+#   - the adaptive concurrency limit is reached. The limit grows by
+#     1/limit per fast success and shrinks by PROVIDER_AIMD_BACKOFF on errors
+#     or slow calls (AIMD, like TCP congestion control).
+# A refused call fails fast with ProviderUnavailable, and the caller returns
+# its degraded result instead of queueing behind a struggling provider.
+# Both steps are Lua scripts, so all workers share the same state atomically.
+# If Redis itself misbehaves, the guard fails open: calls go through unguarded.
+
+PROVIDER_GUARD_ENABLED = os.getenv("PROVIDER_GUARD_ENABLED", "1") == "1"
+PROVIDER_RATE_PER_SEC = float(os.getenv("PROVIDER_RATE_PER_SEC", "20"))
+PROVIDER_BURST = float(os.getenv("PROVIDER_BURST", "40"))
+PROVIDER_CONCURRENCY_INITIAL = float(os.getenv("PROVIDER_CONCURRENCY_INITIAL", "16"))
+PROVIDER_CONCURRENCY_MIN = float(os.getenv("PROVIDER_CONCURRENCY_MIN", "2"))
+PROVIDER_CONCURRENCY_MAX = float(os.getenv("PROVIDER_CONCURRENCY_MAX", "64"))
+PROVIDER_LATENCY_TARGET_MS = int(os.getenv("PROVIDER_LATENCY_TARGET_MS", "3000"))
+PROVIDER_AIMD_BACKOFF = float(os.getenv("PROVIDER_AIMD_BACKOFF", "0.7"))
+PROVIDER_AIMD_DECREASE_INTERVAL_MS = int(os.getenv("PROVIDER_AIMD_DECREASE_INTERVAL_MS", "1000"))
+PROVIDER_BREAKER_FAILURES = int(os.getenv("PROVIDER_BREAKER_FAILURES", "10"))
+PROVIDER_BREAKER_WINDOW_MS = int(os.getenv("PROVIDER_BREAKER_WINDOW_MS", "30000"))
+PROVIDER_BREAKER_COOLDOWN_MS = int(os.getenv("PROVIDER_BREAKER_COOLDOWN_MS", "15000"))
+PROVIDER_LEASE_TTL_MS = int(os.getenv("PROVIDER_LEASE_TTL_MS", "60000"))
+# How long a half-open probe holds off other calls: about one LLM call's budget, so a hung probe can't stall traffic for a whole lease TTL
+PROVIDER_PROBE_WINDOW_MS = int(os.getenv("PROVIDER_PROBE_WINDOW_MS", str(LLM_BUDGET_MS)))
+PROVIDER_GUARD_REDIS_TIMEOUT_S = float(os.getenv("PROVIDER_GUARD_REDIS_TIMEOUT_S", "0.25"))
+
+PROVIDER_REJECTIONS = Counter(
+    "provider_guard_rejections_total", "LLM calls refused by the provider guard.", ("provider", "reason")
+)
+PROVIDER_GUARD_ERRORS = Counter(
+    "provider_guard_redis_errors_total", "Guard calls that failed open because Redis errored.", ("provider",)
+)
+PROVIDER_CONCURRENCY_LIMIT = Gauge(
+    "provider_concurrency_limit", "Current adaptive concurrency limit (shared across workers).", ("provider",)
+)
+PROVIDER_BREAKER_STATE = Gauge(
+    "provider_breaker_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open.", ("provider",)
+)
+_BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+# KEYS: bucket, leases, state
+# ARGV: lease_id, rate, burst, initial_limit, lease_ttl_ms, cooldown_ms, probe_window_ms
+# Returns {allowed, reason|breaker, retry_after_ms, limit}
+_ACQUIRE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rate = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local lease_ttl = tonumber(ARGV[5])
+local cooldown = tonumber(ARGV[6])
+local probe_window = tonumber(ARGV[7])
+
+local state = redis.call('HMGET', KEYS[3], 'breaker', 'opened_at', 'limit', 'probe_until')
+local breaker = state[1] or 'closed'
+local limit = tonumber(state[3]) or tonumber(ARGV[4])
+
+if breaker == 'open' then
+  local elapsed = now - (tonumber(state[2]) or 0)
+  if elapsed < cooldown then
+    return {0, 'open', cooldown - elapsed, tostring(limit)}
+  end
+  breaker = 'half_open'
+  redis.call('HSET', KEYS[3], 'breaker', breaker)
+end
+if breaker == 'half_open' then
+  local probe_until = tonumber(state[4]) or 0
+  if probe_until > now then
+    return {0, 'half_open', probe_until - now, tostring(limit)}
+  end
+end
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+if tokens < 1 then
+  redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+  return {0, 'rate', math.ceil((1 - tokens) * 1000 / rate), tostring(limit)}
+end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if redis.call('ZCARD', KEYS[2]) >= math.max(1, math.floor(limit)) then
+  redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+  return {0, 'concurrency', 0, tostring(limit)}
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens - 1, 'ts', now)
+redis.call('ZADD', KEYS[2], now + lease_ttl, ARGV[1])
+redis.call('PEXPIRE', KEYS[2], lease_ttl)
+if breaker == 'half_open' then
+  redis.call('HSET', KEYS[3], 'probe_until', now + probe_window)
+end
+return {1, breaker, 0, tostring(limit)}
+"""
+
+# KEYS: bucket, leases, state
+# ARGV: lease_id, latency_ms, outcome (ok|error|cancelled), initial, min, max,
+#       target_ms, backoff, decrease_interval_ms, failure_threshold, window_ms
+# Returns {breaker, limit}
+_RELEASE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('ZREM', KEYS[2], ARGV[1])
+
+local state = redis.call('HMGET', KEYS[3], 'breaker', 'limit', 'failures', 'window_start', 'last_decrease')
+local breaker = state[1] or 'closed'
+local limit = tonumber(state[2]) or tonumber(ARGV[4])
+local outcome = ARGV[3]
+if outcome == 'cancelled' then
+  if breaker == 'half_open' then
+    redis.call('HDEL', KEYS[3], 'probe_until')
+  end
+  return {breaker, tostring(limit)}
+end
+
+local latency = tonumber(ARGV[2])
+local failures = tonumber(state[3]) or 0
+local window_start = tonumber(state[4]) or now
+local last_decrease = tonumber(state[5]) or 0
+if now - window_start > tonumber(ARGV[11]) then
+  failures = 0
+  window_start = now
+end
+
+if outcome == 'ok' and latency <= tonumber(ARGV[7]) then
+  limit = math.min(tonumber(ARGV[6]), limit + 1 / limit)
+  if breaker == 'half_open' then
+    breaker = 'closed'
+    failures = 0
+  end
+else
+  if now - last_decrease >= tonumber(ARGV[9]) then
+    limit = math.max(tonumber(ARGV[5]), limit * tonumber(ARGV[8]))
+    last_decrease = now
+  end
+  if outcome == 'error' then
+    failures = failures + 1
+    if breaker == 'half_open' or failures >= tonumber(ARGV[10]) then
+      breaker = 'open'
+      failures = 0
+      redis.call('HSET', KEYS[3], 'opened_at', now)
+    end
+  elseif breaker == 'half_open' then
+    breaker = 'closed'
+  end
+end
+
+if breaker ~= 'half_open' then
+  redis.call('HDEL', KEYS[3], 'probe_until')
+end
+redis.call('HSET', KEYS[3], 'breaker', breaker, 'limit', limit, 'failures', failures,
+  'window_start', window_start, 'last_decrease', last_decrease)
+return {breaker, tostring(limit)}
+"""
+
+
+class ProviderUnavailable(Exception):
+    """The provider guard refused the call; callers degrade instead of waiting."""
+
+    def __init__(self, provider: str, reason: str, retry_after_ms: int = 0):
+        super().__init__(f"Provider '{provider}' unavailable: {reason}")
+        self.provider = provider
+        self.reason = reason
+        self.retry_after_ms = retry_after_ms
+
+
+class ProviderGuard:
+    def __init__(self, provider: str = "gemini", redis_url: Optional[str] = os.getenv("REDIS_PATH")):
+        self.provider = provider
+        self.r = redis.from_url(
+            redis_url,
+            decode_responses=True,
+            socket_timeout=PROVIDER_GUARD_REDIS_TIMEOUT_S,
+            socket_connect_timeout=PROVIDER_GUARD_REDIS_TIMEOUT_S,
+        )
+        self._acquire = self.r.register_script(_ACQUIRE_LUA)
+        self._release = self.r.register_script(_RELEASE_LUA)
+        self._keys = [f"guard:{provider}:bucket", f"guard:{provider}:leases", f"guard:{provider}:state"]
+        # Once the breaker is seen open, refuse locally until the cooldown ends
+        self._open_until = 0.0
+        self._pending_releases: set[asyncio.Task] = set()
+
+    async def warm_up(self, connections: int) -> None:
+        """Opens pooled connections and loads the guard scripts ahead of the first LLM call."""
+        await asyncio.gather(*(self.r.ping() for _ in range(connections)))
+        for script in (self._acquire, self._release):
+            await self.r.script_load(script.script)
+
+    def _record_state(self, breaker: str, limit: str) -> None:
+        PROVIDER_BREAKER_STATE.set(_BREAKER_STATES.get(breaker, 0), provider=self.provider)
+        PROVIDER_CONCURRENCY_LIMIT.set(float(limit), provider=self.provider)
+
+    def _reject(self, reason: str, retry_after_ms: int = 0) -> ProviderUnavailable:
+        PROVIDER_REJECTIONS.inc(provider=self.provider, reason=reason)
+        return ProviderUnavailable(self.provider, reason, retry_after_ms)
+
+    async def acquire(self) -> Optional[str]:
+        """Takes a slot and returns its lease id (None when unguarded); raises ProviderUnavailable."""
+        if not PROVIDER_GUARD_ENABLED:
+            return None
+        now = time.monotonic()
+        if now < self._open_until:
+            raise self._reject("open", int((self._open_until - now) * 1000))
+
+        lease = uuid.uuid4().hex
+        try:
+            allowed, reason, retry_after_ms, limit = await self._acquire(
+                keys=self._keys,
+                args=[lease, PROVIDER_RATE_PER_SEC, PROVIDER_BURST, PROVIDER_CONCURRENCY_INITIAL,
+                      PROVIDER_LEASE_TTL_MS, PROVIDER_BREAKER_COOLDOWN_MS, PROVIDER_PROBE_WINDOW_MS],
+            )
+        except (RedisError, OSError) as e:
+            PROVIDER_GUARD_ERRORS.inc(provider=self.provider)
+            log.warning("provider_guard.fail_open", provider=self.provider, error=str(e))
+            return None
+
+        if allowed:
+            self._record_state(reason, limit)
+            return lease
+
+        if reason == "open":
+            self._open_until = now + int(retry_after_ms) / 1000
+            self._record_state("open", limit)
+        raise self._reject(reason, int(retry_after_ms))
+
+    async def release(self, lease: Optional[str], latency_s: float, outcome: str) -> None:
+        """Frees the slot and feeds the outcome (ok | error | cancelled) into AIMD and the breaker."""
+        if lease is None:
+            return
+        try:
+            breaker, limit = await self._release(
+                keys=self._keys,
+                args=[lease, round(latency_s * 1000), outcome, PROVIDER_CONCURRENCY_INITIAL,
+                      PROVIDER_CONCURRENCY_MIN, PROVIDER_CONCURRENCY_MAX, PROVIDER_LATENCY_TARGET_MS,
+                      PROVIDER_AIMD_BACKOFF, PROVIDER_AIMD_DECREASE_INTERVAL_MS,
+                      PROVIDER_BREAKER_FAILURES, PROVIDER_BREAKER_WINDOW_MS],
+            )
+        except (RedisError, OSError) as e:
+            PROVIDER_GUARD_ERRORS.inc(provider=self.provider)
+            log.warning("provider_guard.release_failed", provider=self.provider, error=str(e))
+            return
+
+        if breaker == "open" and self._open_until <= time.monotonic():
+            self._open_until = time.monotonic() + PROVIDER_BREAKER_COOLDOWN_MS / 1000
+            log.warning("provider_guard.breaker_open", provider=self.provider, limit=float(limit))
+        self._record_state(breaker, limit)
+
+    def release_soon(self, lease: Optional[str], latency_s: float, outcome: str) -> None:
+        """Release from a `finally` without delaying (or being cancelled with) the caller."""
+        if lease is None:
+            return
+        task = asyncio.create_task(self.release(lease, latency_s, outcome))
+        self._pending_releases.add(task)
+        task.add_done_callback(self._pending_releases.discard)
+
+
+provider_guard = ProviderGuard()
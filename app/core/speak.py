@@ -61,6 +61,11 @@
 import os
 import asyncio
 from gtts import gTTS
+from app.core.cassette import cassette
+from app.core.fakes import fake_enabled, fake_text_to_speech
+from app.utils.logger import get_logger
+
+log = get_logger(__name__)
 
 OUT_DIR_QUESTIONS = "OUT_DIR_Questions"
 os.makedirs(OUT_DIR_QUESTIONS, exist_ok=True)
@@ -92,16 +97,36 @@ async def text_to_speech(text: str, filename: str, voice: str = "en", retries: i
     output_path = os.path.join(OUT_DIR_QUESTIONS, f"{filename}.mp3")
     lang = normalize_lang_for_gtts(voice)
 
-    for attempt in range(1, retries + 1):
-        try:
-            await asyncio.to_thread(lambda: gTTS(text=text, lang=lang).save(output_path))
-            print(f"🔊 Saved: {output_path}")
-            return output_path
-        except Exception as e:
-            print(f"❌ gTTS failed on attempt {attempt} for {filename}: {e}")
-            await asyncio.sleep(2 ** attempt)
-
-    raise RuntimeError(f"gTTS failed after {retries} retries for: {filename}")
+    async def synthesize() -> str:
+        if fake_enabled("tts"):
+            return await fake_text_to_speech(output_path)
+
+        for attempt in range(1, retries + 1):
+            try:
+                await asyncio.to_thread(lambda: gTTS(text=text, lang=lang).save(output_path))
+                log.debug("tts.saved", path=output_path)
+                return output_path
+            except Exception as e:
+                log.warning("tts.attempt_failed", attempt=attempt, filename=filename, error=str(e))
+                await asyncio.sleep(2 ** attempt)
+
+        raise RuntimeError(f"gTTS failed after {retries} retries for: {filename}")
+
+    # Recorded/replayed when CASSETTE_MODE is set (see app/core/cassette.py)
+    return await cassette.call(
+        "tts",
+        {"text": text, "lang": lang},
+        synthesize,
+        encode=cassette.store_blob,
+        decode=lambda blob: cassette.load_blob(blob, output_path),
+    )
+
+async def warm_up_tts() -> None:
+    """Renders a throwaway clip so the first real question doesn't pay the TTS cold start."""
+    if cassette.mode == "replay":
+        return
+    path = await text_to_speech("Hello.", "warmup")
+    os.remove(path)
 
 # if __name__ == "__main__":
 #     sample_text = "Can you describe the specific challenges you encountered when deploying your app with Docker?"
@@ -0,0 +1,140 @@
+import os
+import re
+import time
+import uuid
+import shutil
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, RedirectResponse, Response
+
+from app.core.cloudinary import upload_audio_async, prewarm_audio
+from app.utils.logger import get_logger
+
+load_dotenv()
+log = get_logger(__name__)
+
+# Where rendered audio clips live and how clients fetch them.
+#   cloudinary - upload to Cloudinary; /audio/{id} redirects to its CDN URL
+#   local      - move the clip into AUDIO_STORAGE_DIR and serve it from this
+#                app (Range requests + long-lived cache headers), so no WAN
+#                upload sits between TTS and playback
+# Audio ids are opaque to callers either way; clients can always fetch
+# /audio/{audio_id}. With several app instances, AUDIO_STORAGE_DIR must be a
+# shared volume.
+
+# --- Config ---
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "cloudinary").lower()
+AUDIO_STORAGE_DIR = os.getenv("AUDIO_STORAGE_DIR", "audio_store")
+AUDIO_CACHE_MAX_AGE_S = int(os.getenv("AUDIO_CACHE_MAX_AGE_S", str(365 * 24 * 3600)))
+# Local clips older than this are swept (0 keeps them forever)
+AUDIO_LOCAL_MAX_AGE_S = float(os.getenv("AUDIO_LOCAL_MAX_AGE_S", str(7 * 24 * 3600)))
+AUDIO_LOCAL_SWEEP_INTERVAL_S = float(os.getenv("AUDIO_LOCAL_SWEEP_INTERVAL_S", "3600"))
+
+# Ids are generated here, so anything else (slashes, "..") is rejected outright
+_LOCAL_ID = re.compile(r"^[0-9a-f]{32}\.[a-z0-9]{2,5}$")
+_MEDIA_TYPES = {".mp3": "audio/mpeg", ".ogg": "audio/ogg", ".opus": "audio/ogg", ".wav": "audio/wav"}
+
+
+class AudioStorage:
+    name = "base"
+
+    async def put(self, file_path: str) -> Optional[str]:
+        """Stores a rendered clip and returns its audio id (None on failure)."""
+        raise NotImplementedError
+
+    async def prewarm(self, audio_id: str) -> bool:
+        """Best-effort: make the first client fetch of this clip fast."""
+        return True
+
+    def response(self, audio_id: str) -> Response:
+        """HTTP response for GET /audio/{audio_id}."""
+        raise NotImplementedError
+
+
+class CloudinaryStorage(AudioStorage):
+    name = "cloudinary"
+
+    async def put(self, file_path: str) -> Optional[str]:
+        return await upload_audio_async(file_path)
+
+    async def prewarm(self, audio_id: str) -> bool:
+        return await prewarm_audio(audio_id)
+
+    def response(self, audio_id: str) -> Response:
+        import cloudinary.utils
+
+        url, _ = cloudinary.utils.cloudinary_url(audio_id, resource_type="video", secure=True)
+        return RedirectResponse(url, status_code=307)
+
+
+class LocalStorage(AudioStorage):
+    name = "local"
+
+    def __init__(self, root: str = AUDIO_STORAGE_DIR, max_age_s: float = AUDIO_LOCAL_MAX_AGE_S):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_age_s = max_age_s
+        self._swept_at = 0.0
+
+    def path_for(self, audio_id: str) -> Optional[Path]:
+        if not _LOCAL_ID.match(audio_id):
+            return None
+        return self.root / audio_id
+
+    async def put(self, file_path: str) -> Optional[str]:
+        audio_id = f"{uuid.uuid4().hex}{Path(file_path).suffix.lower() or '.mp3'}"
+        try:
+            # A rename when both sit on the same filesystem, a copy otherwise
+            await asyncio.to_thread(shutil.move, file_path, self.root / audio_id)
+        except OSError as e:
+            log.error("storage.local_put_failed", path=file_path, error=str(e))
+            return None
+        self._maybe_sweep()
+        return audio_id
+
+    def response(self, audio_id: str) -> Response:
+        path = self.path_for(audio_id)
+        if path is None or not path.is_file():
+            raise HTTPException(status_code=404, detail="Audio not found")
+        # Ids are never reused, so the content behind one never changes
+        return FileResponse(
+            path,
+            media_type=_MEDIA_TYPES.get(path.suffix, "application/octet-stream"),
+            headers={"Cache-Control": f"public, max-age={AUDIO_CACHE_MAX_AGE_S}, immutable"},
+        )
+
+    # --- Retention ---
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if self.max_age_s <= 0 or now - self._swept_at < AUDIO_LOCAL_SWEEP_INTERVAL_S:
+            return
+        self._swept_at = now
+        asyncio.get_running_loop().run_in_executor(None, self._sweep)
+
+    def _sweep(self) -> None:
+        cutoff = time.time() - self.max_age_s
+        removed = 0
+        for path in self.root.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            log.info("storage.local_swept", removed=removed, root=str(self.root))
+
+
+def build_audio_storage(backend: str = STORAGE_BACKEND) -> AudioStorage:
+    if backend == "local":
+        return LocalStorage()
+    if backend != "cloudinary":
+        log.warning("storage.unknown_backend", backend=backend, fallback="cloudinary")
+    return CloudinaryStorage()
+
+
+audio_storage = build_audio_storage()
@@ -0,0 +1,206 @@
+import os
+import io
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, TypedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Config ---
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base.en")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "en")
+WHISPER_BEAM_SIZE = int(os.getenv("WHISPER_BEAM_SIZE", "1"))
+STT_WORKERS = int(os.getenv("STT_WORKERS", "2"))
+STT_CPU_THREADS = int(os.getenv("STT_CPU_THREADS", "2"))
+STT_BATCH_WINDOW_MS = int(os.getenv("STT_BATCH_WINDOW_MS", "25"))
+STT_MAX_BATCH = int(os.getenv("STT_MAX_BATCH", "8"))
+VAD_THRESHOLD = float(os.getenv("VAD_THRESHOLD", "0.5"))
+VAD_MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "100"))
+
+SAMPLE_RATE = 16000
+
+
+class TranscriptionResult(TypedDict):
+    text: str
+    duration: float
+    has_speech: bool
+    trailing_silence: float  # seconds of non-speech at the end of the chunk
+    error: Optional[str]
+
+
+# --- Worker side: one warm model per process ---
+_model = None
+
+
+def _init_worker(model_name: str, compute_type: str, cpu_threads: int) -> None:
+    global _model
+    from faster_whisper import WhisperModel
+
+    _model = WhisperModel(
+        model_name,
+        device="cpu",
+        compute_type=compute_type,
+        cpu_threads=cpu_threads,
+    )
+
+
+def _ping_worker() -> int:
+    # Forces the pool to spawn a process (and load its model) ahead of traffic
+    return os.getpid()
+
+
+def _transcribe_one(audio_bytes: bytes) -> TranscriptionResult:
+    from faster_whisper.audio import decode_audio
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    audio = decode_audio(io.BytesIO(audio_bytes), sampling_rate=SAMPLE_RATE)
+    duration = len(audio) / SAMPLE_RATE
+
+    # Endpointing: where does speech stop inside this chunk?
+    speech = get_speech_timestamps(
+        audio,
+        VadOptions(threshold=VAD_THRESHOLD, min_silence_duration_ms=VAD_MIN_SILENCE_MS, speech_pad_ms=0),
+        sampling_rate=SAMPLE_RATE,
+    )
+    if not speech:
+        # Pure silence — skip inference entirely
+        return {"text": "", "duration": duration, "has_speech": False, "trailing_silence": duration, "error": None}
+
+    trailing_silence = max(0.0, duration - speech[-1]["end"] / SAMPLE_RATE)
+
+    # The VAD pass above already found the speech; decode just that span instead of running VAD again
+    speech_audio = audio[speech[0]["start"]:speech[-1]["end"]]
+    segments, _ = _model.transcribe(
+        speech_audio,
+        language=WHISPER_LANGUAGE or None,
+        beam_size=WHISPER_BEAM_SIZE,
+        condition_on_previous_text=False,
+        vad_filter=False,
+    )
+    text = " ".join(segment.text.strip() for segment in segments).strip()
+    return {
+        "text": text,
+        "duration": duration,
+        "has_speech": True,
+        "trailing_silence": trailing_silence,
+        "error": None,
+    }
+
+
+def _transcribe_batch(chunks: list[bytes]) -> list[TranscriptionResult]:
+    results: list[TranscriptionResult] = []
+    for chunk in chunks:
+        try:
+            results.append(_transcribe_one(chunk))
+        except Exception as e:
+            results.append({
+                "text": "",
+                "duration": 0.0,
+                "has_speech": False,
+                "trailing_silence": 0.0,
+                "error": str(e),
+            })
+    return results
+
+
+# --- Event-loop side: per-worker grouping dispatcher ---
+class TranscriptionBatcher:
+    """
+    Collects audio chunks from concurrent sessions for a short window and
+    dispatches them to a warm process pool, so decoding and inference never
+    run on the event loop. Chunks are grouped per worker to save dispatch
+    round-trips; each one is still transcribed on its own (no batched
+    inference).
+    """
+
+    def __init__(
+        self,
+        workers: int = STT_WORKERS,
+        batch_window_ms: int = STT_BATCH_WINDOW_MS,
+        max_batch: int = STT_MAX_BATCH,
+    ):
+        self.workers = max(1, workers)
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: list[tuple[bytes, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(WHISPER_MODEL, WHISPER_COMPUTE_TYPE, STT_CPU_THREADS),
+            )
+        return self._pool
+
+    async def warm_up(self) -> None:
+        """Spawn every worker and load its model before the first chunk arrives."""
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        try:
+            await asyncio.gather(*(loop.run_in_executor(pool, _ping_worker) for _ in range(self.workers)))
+        except BrokenProcessPool:
+            # Don't leave a dead pool behind; the first chunk will try a fresh one
+            self.shutdown()
+            raise
+
+    async def transcribe(self, audio_bytes: bytes) -> TranscriptionResult:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((audio_bytes, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        # Spread the batch across workers so one long clip doesn't hold up the rest
+        groups = [batch[i::self.workers] for i in range(min(self.workers, len(batch)))]
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        for group in groups:
+            task = loop.run_in_executor(pool, _transcribe_batch, [audio for audio, _ in group])
+            task.add_done_callback(lambda t, group=group: self._resolve(group, t))
+
+    @staticmethod
+    def _resolve(group: list[tuple[bytes, asyncio.Future]], task: asyncio.Future) -> None:
+        if task.cancelled():
+            for _, future in group:
+                if not future.done():
+                    future.cancel()
+            return
+
+        error = task.exception()
+        for idx, (_, future) in enumerate(group):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(task.result()[idx])
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+transcriber = TranscriptionBatcher()
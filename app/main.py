@@ -1,16 +1,75 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 # from nodes import followup
 # from nodes import question_Manager
-from app.api.interview_router import router as interview_router
-from app.controllers import flow_controller
+from app.api.interview_router import router as interview_router, qa_manager
+from app.api.audio_router import router as audio_router
+from app.api.metrics_router import router as metrics_router, metrics_middleware
+from app.api.health_router import router as health_router
+from app.controller import flow_controller
+from app.core.audio_encoding import audio_encoder
+from app.core.llm import warm_up_llms
+from app.core.provider_guard import provider_guard
+from app.core.speak import warm_up_tts
+from app.core.transcribe import transcriber
+from app.services import mongo
+from app.services.backend_integration import close_backend_client
+from app.services.idempotency import idempotency_store
+from app.utils.loop_monitor import loop_monitor, LoopMonitorMiddleware, LOOP_MONITOR_ENABLED
+from app.utils.profiler import ProfilingMiddleware, PROFILING_ENABLED
+from app.utils.warmup import warmup, WARMUP_REDIS_CONNECTIONS
+
+
+async def _warm_redis():
+    await asyncio.gather(*(
+        client.warm_up(WARMUP_REDIS_CONNECTIONS) for client in (qa_manager, idempotency_store, provider_guard)
+    ))
+
+# Without Redis no interview can run; everything else only costs latency when cold
+warmup.step("redis", _warm_redis, required=True)
+warmup.step("mongo", mongo.warm_up)
+warmup.step("llm", warm_up_llms)
+warmup.step("tts", warm_up_tts)
+warmup.step("stt", transcriber.warm_up)
+warmup.step("encoder", audio_encoder.warm_up)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    warmup.start()
+    yield
+    await warmup.stop()
+    await loop_monitor.stop()
+    audio_encoder.shutdown()
+    transcriber.shutdown()
+    await close_backend_client()
+
 
 app = FastAPI(
     title="Agent-Vista",
     description="An AI Agent build for taking Interviews",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # app.include_router(followup.router,prefix="/followup",tags=["follow-up"])
 # app.include_router(question_Manager.router,prefix="/questionManager",tags=["questionManager"])
 app.include_router(interview_router, prefix="/interview")
 app.include_router(flow_controller.router,prefix ="/api", tags=["Flow Controller"])
+app.include_router(metrics_router)
+app.include_router(health_router)
+app.include_router(audio_router, tags=["Audio"])
+
+if PROFILING_ENABLED:
+    from app.api.profile_router import router as profile_router
+    app.include_router(profile_router, prefix="/debug", tags=["Debug"])
+
+# Order matters: the loop monitor and profiler must be inner to the metrics
+# middleware so they run in the same task as the endpoint (see LoopMonitorMiddleware)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(LoopMonitorMiddleware)
+app.middleware("http")(metrics_middleware)
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class FollowUp(BaseModel):
@@ -5,6 +6,10 @@ class FollowUp(BaseModel):
     candidate_id: str
     transcript: str
     final_chunk: bool = False 
+    # Either one makes retries of this chunk safe (see app/services/idempotency.py);
+    # `seq` numbers the question's chunks from 0 and also orders their appends
+    idempotency_key: Optional[str] = None
+    seq: Optional[int] = None
     
 class followUpResonse(BaseModel):
     Qid: str
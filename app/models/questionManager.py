@@ -11,9 +11,28 @@ class QuestionManagerResponse(BaseModel):
     question: str
     field_up_id: str 
     audio_id: str    
+    audio_profile: str = ""
 class DecisionHeapItem(BaseModel):
     status: int
     priority: int
     question: str
     field_up_id: str
     audio_id: str
+    audio_profile: str = ""
+    action: str = ""
+
+class SessionPlan(BaseModel):
+    candidate_id: str
+    questions: list[str]
+
+class InterviewPlan(BaseModel):
+    questions: list[str]
+    candidate_ids: list[str]
+
+class CandidatePlanResponse(BaseModel):
+    candidate_id: str
+    questions: list[QuestionManagerResponse]
+
+class InterviewPlanResponse(BaseModel):
+    status: int
+    candidates: list[CandidatePlanResponse]
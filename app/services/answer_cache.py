@@ -0,0 +1,208 @@
+import os
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import xxhash
+from rapidfuzz import utils
+from dotenv import load_dotenv
+
+from app.services.question_matching import normalize_question
+from app.utils.logger import get_logger
+from app.utils.metrics import Counter, Gauge
+
+load_dotenv()
+log = get_logger(__name__)
+
+# Near-duplicate answer cache.
+# Candidates answering the same scripted question produce many near-identical
+# chunks. Each (question, chunk) is reduced to a MinHash signature over
+# character shingles and indexed with LSH banding, so finding similar past
+# chunks is a few dict lookups. A past chunk counts as a match when its
+# estimated Jaccard similarity is >= ANSWER_CACHE_THRESHOLD. Its stored
+# decision result (including the audio_id) can then be reused instead of
+# calling the classifier, the handler and TTS again.
+#
+# ANSWER_CACHE_MODE:
+#   off    - no lookups
+#   shadow - look up, still decide fresh, count how often reuse would agree
+#   on     - serve matches from the cache
+# The index is per worker process and bounded (LRU + TTL).
+
+ANSWER_CACHE_MODE = os.getenv("ANSWER_CACHE_MODE", "shadow").lower()
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.8"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "50000"))
+ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", "86400"))
+ANSWER_CACHE_NUM_PERM = int(os.getenv("ANSWER_CACHE_NUM_PERM", "64"))
+ANSWER_CACHE_BANDS = int(os.getenv("ANSWER_CACHE_BANDS", "16"))
+ANSWER_CACHE_SHINGLE_CHARS = int(os.getenv("ANSWER_CACHE_SHINGLE_CHARS", "5"))
+
+ANSWER_CACHE_LOOKUPS = Counter("answer_cache_lookups_total", "Answer cache lookups.", ("result",))
+ANSWER_CACHE_SHADOW = Counter(
+    "answer_cache_shadow_total", "Shadow-mode matches compared with the fresh decision.", ("agreed",)
+)
+ANSWER_CACHE_EVICTIONS = Counter("answer_cache_evictions_total", "Answer cache evictions.", ("reason",))
+ANSWER_CACHE_ENTRIES = Gauge("answer_cache_entries", "Entries in the answer cache.")
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+@dataclass
+class _Entry:
+    question_key: int
+    signature: np.ndarray
+    result: dict
+    created_at: float
+
+
+@dataclass
+class CacheHit:
+    result: dict
+    similarity: float
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_s: float = ANSWER_CACHE_TTL_S,
+        num_perm: int = ANSWER_CACHE_NUM_PERM,
+        bands: int = ANSWER_CACHE_BANDS,
+        mode: str = ANSWER_CACHE_MODE,
+    ):
+        if num_perm % bands:
+            raise ValueError("ANSWER_CACHE_NUM_PERM must be a multiple of ANSWER_CACHE_BANDS")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.mode = mode
+        rng = np.random.default_rng(1)
+        self._a = rng.integers(1, (1 << 32) - 1, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, (1 << 32) - 1, size=num_perm, dtype=np.uint64)
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._buckets: dict[tuple, set[int]] = defaultdict(set)
+        self._next_id = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ("shadow", "on")
+
+    @property
+    def serving(self) -> bool:
+        return self.mode == "on"
+
+    # --- Signatures ---
+    def _signature(self, text: str) -> Optional[np.ndarray]:
+        norm = " ".join(utils.default_process(text or "").split())
+        if not norm:
+            return None
+        k = ANSWER_CACHE_SHINGLE_CHARS
+        shingles = {norm[i:i + k] for i in range(max(1, len(norm) - k + 1))}
+        hashes = np.fromiter((xxhash.xxh32_intdigest(s) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # h_i(x) = (a_i * x + b_i) mod p, truncated to 32 bits; min over shingles
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=1)
+
+    def _band_keys(self, question_key: int, signature: np.ndarray) -> list[tuple]:
+        return [
+            (question_key, band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def _question_key(question: str) -> int:
+        return xxhash.xxh64_intdigest(normalize_question(question))
+
+    # --- Index maintenance ---
+    def _remove(self, entry_id: int, reason: str) -> None:
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for key in self._band_keys(entry.question_key, entry.signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+        ANSWER_CACHE_EVICTIONS.inc(reason=reason)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._entries:
+            entry_id, entry = next(iter(self._entries.items()))
+            if len(self._entries) > self.max_entries:
+                self._remove(entry_id, "lru")
+            elif now - entry.created_at > self.ttl_s:
+                self._remove(entry_id, "ttl")
+            else:
+                break
+        ANSWER_CACHE_ENTRIES.set(len(self._entries))
+
+    def add(self, question: str, transcript: str, result: dict) -> None:
+        """Remembers a freshly produced decision result (with its audio_id) for this chunk."""
+        if not self.enabled or result.get("status") in (500, 520):
+            return
+        signature = self._signature(transcript)
+        if signature is None:
+            return
+        entry_id = self._next_id
+        self._next_id += 1
+        entry = _Entry(self._question_key(question), signature, dict(result), time.monotonic())
+        self._entries[entry_id] = entry
+        for key in self._band_keys(entry.question_key, signature):
+            self._buckets[key].add(entry_id)
+        self._evict()
+
+    def lookup(self, question: str, transcript: str) -> Optional[CacheHit]:
+        """Most similar past chunk for the same question, if it clears the threshold."""
+        if not self.enabled:
+            return None
+        signature = self._signature(transcript)
+        if signature is None:
+            return None
+        question_key = self._question_key(question)
+
+        candidates: set[int] = set()
+        for key in self._band_keys(question_key, signature):
+            candidates.update(self._buckets.get(key, ()))
+
+        best_id, best_similarity = None, 0.0
+        now = time.monotonic()
+        for entry_id in candidates:
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                continue
+            if now - entry.created_at > self.ttl_s:
+                self._remove(entry_id, "ttl")
+                continue
+            similarity = float(np.mean(entry.signature == signature))
+            if similarity > best_similarity:
+                best_id, best_similarity = entry_id, similarity
+
+        if best_id is None or best_similarity < self.threshold:
+            ANSWER_CACHE_LOOKUPS.inc(result="miss")
+            return None
+        ANSWER_CACHE_LOOKUPS.inc(result="hit")
+        self._entries.move_to_end(best_id)
+        return CacheHit(dict(self._entries[best_id].result), best_similarity)
+
+    @staticmethod
+    def record_shadow(hit: CacheHit, fresh: dict) -> None:
+        """Would reusing `hit` have matched the fresh decision? Same action (or status when untagged)."""
+        if hit.result.get("action") and fresh.get("action"):
+            agreed = hit.result["action"] == fresh["action"]
+        else:
+            agreed = hit.result.get("status") == fresh.get("status")
+        ANSWER_CACHE_SHADOW.inc(agreed=str(agreed).lower())
+        if not agreed:
+            log.debug("answer_cache.shadow_disagreed", similarity=round(hit.similarity, 3),
+                      cached=hit.result.get("action"), fresh=fresh.get("action"))
+
+
+answer_cache = AnswerCache()
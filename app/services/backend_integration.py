@@ -1,8 +1,74 @@
 # app/services/backend_integration.py
+import os
+from typing import Optional
 
-async def send_to_backend(data: dict):
-    """
-    Sends the generated question to the backend or stores it in a database.
-    TODO: Replace with Member 6's actual backend integration logic.
-    """
-    print("📤 Sending to backend:", data)
+import httpx
+from dotenv import load_dotenv
+
+from app.utils.logger import get_logger
+from app.utils.metrics import stage_timer
+
+load_dotenv()
+log = get_logger(__name__)
+
+# Delivery of generated questions to the interview backend.
+# One pooled client is shared by every request; with BACKEND_URL unset the
+# questions are only logged (local development).
+
+# --- Config ---
+BACKEND_URL = os.getenv("BACKEND_URL", "").rstrip("/")
+BACKEND_TIMEOUT_S = float(os.getenv("BACKEND_TIMEOUT_S", "10"))
+BACKEND_MAX_CONNECTIONS = int(os.getenv("BACKEND_MAX_CONNECTIONS", "20"))
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=BACKEND_URL,
+            timeout=BACKEND_TIMEOUT_S,
+            limits=httpx.Limits(
+                max_connections=BACKEND_MAX_CONNECTIONS,
+                max_keepalive_connections=BACKEND_MAX_CONNECTIONS,
+            ),
+        )
+    return _client
+
+
+async def _post(path: str, payload: dict) -> bool:
+    with stage_timer("backend") as timer:
+        try:
+            resp = await _get_client().post(path, json=payload)
+            resp.raise_for_status()
+            return True
+        except httpx.HTTPError as e:
+            timer.outcome = "error"
+            log.error("backend.send_failed", path=path, error=str(e))
+            return False
+
+
+async def send_to_backend(data: dict) -> bool:
+    """Sends one generated question to the backend."""
+    if not BACKEND_URL:
+        log.info("backend.send", data=data)
+        return True
+    return await _post("/questions", data)
+
+
+async def send_batch_to_backend(items: list[dict]) -> bool:
+    """Sends many generated questions in a single bulk call."""
+    if not items:
+        return True
+    if not BACKEND_URL:
+        log.info("backend.send_batch", count=len(items))
+        return True
+    return await _post("/questions/bulk", {"items": items})
+
+
+async def close_backend_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,23 +1,33 @@
 import os
 import json
 import re
+import time
 import asyncio
+from datetime import datetime
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
+from app.core.llm import get_llm, invoke_llm
+from app.core.provider_guard import ProviderUnavailable
+from app.services.intent_rules import IntentMatch, intent_rules
+from app.services.distilled_classifier import (
+    distilled_classifier, DISTILLED_CONFIDENCE, DISTILLED_DECISIONS, DISTILLED_AGREEMENT,
+)
+from app.services.mongo import decision_log_collection
+from app.utils.deadline import DeadlineExceeded
+from app.utils.metrics import HANDLER_SECONDS, LLM_PARSE_FAILURES, LLM_FALLBACKS, DECISIONS, stage_timer
+from app.utils.logger import get_logger
 
 # --- Load Environment Variables ---
 load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY not found in .env")
+log = get_logger(__name__)
 
 # --- LLM Setup ---
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-lite-preview-06-17",
-    temperature=0.5,
-    google_api_key=api_key
-)
+llm = get_llm(temperature=0.5)
+
+# Every classifier decision is logged to Mongo (decision_log) as training data
+# for the distilled classifier
+DECISION_LOG_ENABLED = os.getenv("DECISION_LOG_ENABLED", "1") == "1"
+_pending_log_writes: set[asyncio.Task] = set()
 
 # --- Prompt Template ---
 prompt = ChatPromptTemplate.from_template(
@@ -51,10 +61,10 @@ Your mission: **scrutinize every candidate response** and decide *exactly* what
 📥 **Inputs**:
 
 - **Full Q&A Trail (timestamped):**  
-  {{question_answer_trail}}
+  {question_answer_trail}
 
 - **Latest Transcript:**  
-  {{latest_transcript}}
+  {latest_transcript}
 
 ---
 
@@ -84,66 +94,121 @@ def extract_json_block(text: str) -> str:
 from app.services.follow_up_gen_new_update import generate_structured_followups
 async def handle_follow_up(latest_transcript: str, question_answer_trail: str):
     result = await generate_structured_followups(latest_transcript,question_answer_trail)
-    print("📌 Deciding to ask a follow-up based on latest response.",result)
+    log.debug("decision.follow_up", result=result)
     return result
 
 from app.services.wrong_answer import handle_wrong_answer_async
 async def handle_wrong_answer(latest_transcript: str, question_answer_trail: str):
     result = await handle_wrong_answer_async(latest_transcript,question_answer_trail)
-    print("⚠️ Candidate seems to have answered incorrectly. Prompting clarification.",result)
+    log.debug("decision.wrong_answer", result=result)
     return result
 
 from app.services.repeat_question import handle_repeat_question_async
 async def handle_repeat_question(latest_transcript: str, question_answer_trail: str):
     result = await handle_repeat_question_async(question_answer_trail)
-    print("🔁 Candidate asked for a repeat or didn’t hear the question clearly.",result)
+    log.debug("decision.repeat_question", result=result)
     return result
 
 from app.services.elaborate import handle_elaborate_async
 async def handle_elaborate(latest_transcript: str, question_answer_trail: str):
     result = await handle_elaborate_async(latest_transcript,question_answer_trail)
-    print("📎 Asking the candidate to elaborate further.",result)
+    log.debug("decision.elaborate", result=result)
     return result
 
-def handle_no_question(latest_transcript: str, question_answer_trail: str):
+async def handle_no_question(latest_transcript: str, question_answer_trail: str):
     return {
         "priority": 0,
         "discussion": "All Fine. No further probing needed.",
         "status": 200,
     }
 
-# --- Decision Controller ---
-async def make_decision(question_trail: str, transcript: str,id:str):
-    chain = prompt | llm
-    raw = ""  # ensure raw is always defined
+# --- Fast path (see app/services/intent_rules.py) ---
+def replay_question(question_text: str, audio_id: str = "", audio_profile: str = "") -> dict:
+    """Repeat request answered from the trail doc: same payload shape as the repeat handler, no LLM."""
+    result = {"status": 506, "discussion": question_text, "priority": 1000, "action": "Repeat_question"}
+    if audio_id:
+        result["audio_id"] = audio_id
+        result["audio_profile"] = audio_profile
+    return result
 
+async def shadow_check_intent(match: IntentMatch, question_trail: str, transcript: str):
+    """Background re-check of a fast-path hit by the real classifier, for precision tracking."""
     try:
-        response = chain.invoke({
+        parsed = await classify(question_trail, transcript)
+    except Exception as e:
+        log.debug("intent_shadow.failed", error=str(e))
+        return
+    intent_rules.record_shadow(match, parsed.get("action", "").strip())
+
+# --- Classifier ---
+async def classify(question_trail: str, transcript: str) -> dict:
+    """Runs the decision classifier and returns its parsed JSON."""
+    chain = prompt | llm
+    with stage_timer("classifier"):
+        response = await invoke_llm(chain, {
             "latest_transcript": transcript,
             "question_answer_trail": question_trail
-        })
-
-        raw = str(response.content or "").strip()
-        print(f"\n🧾 Raw LLM Output:\n{raw}\n")
-
-        json_block = extract_json_block(raw)
-        if not json_block:
-            raise ValueError("No valid JSON object found in LLM response.")
-
-        parsed = json.loads(json_block)
-        action = parsed.get("action", "").strip()
-        trail_summary = parsed.get("trail_summary", "No trail summary.")
-        context_summary = parsed.get("context_summary", "No context summary.")
-
-        combined_summary = (
-            f"\n--- CONTEXT ---\n"
-            f"📘 Latest Transcript: {transcript}\n"
-            f"🧭 Trail Summary: {trail_summary}\n"
-            f"🗒️ Context Summary: {context_summary}\n"
-            f"----------------\n"
-        )
+        }, stage="classifier")
+
+    raw = str(response.content or "").strip()
+    log.payload("classifier.raw_output", raw=raw)
+
+    json_block = extract_json_block(raw)
+    if not json_block:
+        log.warning("classifier.no_json", raw=raw)
+        raise ValueError("No valid JSON object found in LLM response.")
+    return json.loads(json_block)
+
+async def decide_action(question_trail: str, transcript: str) -> tuple[str, str]:
+    """Next action and who picked it: the distilled model when it is confident, else the LLM."""
+    guess = None
+    if distilled_classifier is not None:
+        guess, confidence = distilled_classifier.predict(question_trail, transcript)
+        if confidence >= DISTILLED_CONFIDENCE:
+            DISTILLED_DECISIONS.inc(source="distilled")
+            return guess, "distilled"
+
+    parsed = await classify(question_trail, transcript)
+    action = parsed.get("action", "").strip()
+    log.payload(
+        "classifier.context",
+        transcript=transcript,
+        trail_summary=parsed.get("trail_summary", "No trail summary."),
+        context_summary=parsed.get("context_summary", "No context summary."),
+    )
+    if guess is not None:
+        DISTILLED_DECISIONS.inc(source="llm")
+        DISTILLED_AGREEMENT.inc(agreed=str(guess == action).lower())
+    return action, "llm"
+
+async def _write_decision_log(doc: dict):
+    try:
+        await decision_log_collection.insert_one(doc)
+    except Exception as e:
+        log.warning("decision_log.write_failed", error=str(e))
+
+def log_decision(qid: str, question_trail: str, transcript: str, action: str, source: str, latency_ms: float):
+    if not DECISION_LOG_ENABLED:
+        return
+    doc = {
+        "qid": qid,
+        "question_trail": question_trail,
+        "transcript": transcript,
+        "action": action,
+        "source": source,
+        "latency_ms": round(latency_ms, 2),
+        "timestamp": datetime.now(),
+    }
+    task = asyncio.create_task(_write_decision_log(doc))
+    _pending_log_writes.add(task)
+    task.add_done_callback(_pending_log_writes.discard)
 
-        print(combined_summary)
+# --- Decision Controller ---
+async def make_decision(question_trail: str, transcript: str,id:str):
+    try:
+        started = time.perf_counter()
+        action, source = await decide_action(question_trail, transcript)
+        log_decision(id, question_trail, transcript, action, source, (time.perf_counter() - started) * 1000)
 
         decision_map = {
             "follow_up": lambda: handle_follow_up(transcript, question_trail),
@@ -154,16 +219,35 @@ async def make_decision(question_trail: str, transcript: str,id:str):
         }
 
         if action in decision_map:
-            print(f"\n🤖 LLM Decision: {action}")
-            result = await decision_map[action]()
-            print("🧩 Handler Output:", result)
-            return result
+            log.info("classifier.decision", action=action, source=source)
+            DECISIONS.inc(action=action)
+            with stage_timer("handler"), HANDLER_SECONDS.time(action=action) as timer:
+                result = await decision_map[action]()
+                if result.get("status") in (500, 520):
+                    timer.outcome = "parse_failure"
+                    LLM_PARSE_FAILURES.inc(chain=action, status=result.get("status"))
+            log.payload("handler.output", action=action, result=result)
+            return {**result, "action": action}
         else:
-            print(f"❌ Unexpected action from LLM: '{action}'\n🧾 Raw response: {json_block}")
+            log.warning("classifier.unknown_action", action=action)
+            LLM_PARSE_FAILURES.inc(chain="classifier", status=520)
             return {"priority": 0, "discussion": "Unknown action", "status": 520}
 
+    except DeadlineExceeded as e:
+        # Degrade gracefully: nothing to ask, the interview moves on
+        log.warning("decision.deadline_fallback", stage=e.stage)
+        LLM_FALLBACKS.inc(chain=e.stage, reason="deadline")
+        return await handle_no_question(transcript, question_trail)
+
+    except ProviderUnavailable as e:
+        # Provider is throttled or the breaker is open: shed the call instead of queueing
+        log.warning("decision.provider_fallback", reason=e.reason, retry_after_ms=e.retry_after_ms)
+        LLM_FALLBACKS.inc(chain="provider_guard", reason=e.reason)
+        return await handle_no_question(transcript, question_trail)
+
     except Exception as e:
-        print(f"❗ Error during LLM decision: {e}\n↪ Raw content was:\n{raw}")
+        log.error("classifier.failed", error=str(e))
+        LLM_PARSE_FAILURES.inc(chain="classifier", status=500)
         return {"priority": 0, "discussion": "Exception occurred", "status": 500}
 
 # # --- Run ---
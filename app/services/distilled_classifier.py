@@ -0,0 +1,168 @@
+import os
+import re
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+import xxhash
+from dotenv import load_dotenv
+
+from app.services.question_trail_dict import question_from_conversation
+from app.utils.logger import get_logger
+from app.utils.metrics import Counter, Histogram
+
+load_dotenv()
+log = get_logger(__name__)
+
+# Small on-box stand-in for the decision classifier, distilled from the
+# actions Gemini picked (see test/train_decision_classifier.py).
+# Features are hashed n-grams of the latest chunk and the question, plus a few
+# trail-shape tokens, stored sparse (CSR). The model is multinomial logistic
+# regression in plain NumPy. Serving uses it when it is confident enough and
+# falls back to the LLM otherwise.
+
+# --- Config ---
+DISTILLED_MODEL_PATH = os.getenv("DISTILLED_MODEL_PATH", "")
+DISTILLED_CONFIDENCE = float(os.getenv("DISTILLED_CONFIDENCE", "0.9"))
+DISTILLED_DIM = int(os.getenv("DISTILLED_DIM", str(2 ** 18)))
+
+ACTIONS = ["follow_up", "wrong_answer", "Repeat_question", "Elaborate", "No_question"]
+
+DISTILLED_DECISIONS = Counter(
+    "distilled_classifier_decisions_total",
+    "Classifier decisions by source: distilled (confident) or llm (fallback).",
+    ("source",),
+)
+DISTILLED_AGREEMENT = Counter(
+    "distilled_classifier_agreement_total",
+    "Distilled prediction vs the LLM on calls that went to the LLM anyway.",
+    ("agreed",),
+)
+DISTILLED_PREDICT_SECONDS = Histogram(
+    "distilled_classifier_predict_seconds",
+    "Latency of one distilled prediction.",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01),
+)
+
+_WORD = re.compile(r"[a-z0-9']+")
+_ANSWER_LINE = re.compile(r"^A\d+ \(", re.MULTILINE)
+
+
+# --- Features ---
+def _grams(question_trail: str, transcript: str) -> list[str]:
+    words = _WORD.findall(transcript.lower())
+    grams = [f"t:{w}" for w in words]
+    grams += [f"t2:{a} {b}" for a, b in zip(words, words[1:])]
+    text = " ".join(words)
+    grams += [f"c:{text[i:i + 4]}" for i in range(max(0, len(text) - 3))]
+    grams += [f"q:{w}" for w in _WORD.findall(question_from_conversation(question_trail).lower())]
+    # Trail shape: how far into the answer we are and how long this chunk is
+    grams.append(f"n_answers:{min(len(_ANSWER_LINE.findall(question_trail)), 10)}")
+    grams.append(f"len:{min(len(words).bit_length(), 8)}")
+    return grams
+
+
+def featurize(pairs: Iterable[tuple[str, str]], dim: int = DISTILLED_DIM):
+    """
+    Hashes (question_trail, transcript) pairs into a CSR matrix:
+    (indptr, indices, data), with sublinear tf and L2-normalized rows.
+    """
+    indptr = [0]
+    indices: list[np.ndarray] = []
+    data: list[np.ndarray] = []
+    for question_trail, transcript in pairs:
+        hashed = np.fromiter(
+            (xxhash.xxh3_64_intdigest(g) % dim for g in _grams(question_trail, transcript)), dtype=np.int64
+        )
+        cols, counts = np.unique(hashed, return_counts=True)
+        values = (1.0 + np.log(counts)).astype(np.float32)
+        values /= np.linalg.norm(values) or 1.0
+        indices.append(cols)
+        data.append(values)
+        indptr.append(indptr[-1] + len(cols))
+    return (
+        np.asarray(indptr, dtype=np.int64),
+        np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64),
+        np.concatenate(data) if data else np.zeros(0, dtype=np.float32),
+    )
+
+
+def _row_ids(indptr: np.ndarray) -> np.ndarray:
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+# --- Model ---
+class DistilledClassifier:
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, labels: list[str]):
+        self.weights = weights  # (dim, n_labels)
+        self.bias = bias
+        self.labels = labels
+        self.dim = weights.shape[0]
+
+    @classmethod
+    def empty(cls, dim: int = DISTILLED_DIM, labels: list[str] = ACTIONS) -> "DistilledClassifier":
+        return cls(np.zeros((dim, len(labels)), dtype=np.float32), np.zeros(len(labels), dtype=np.float32), list(labels))
+
+    @classmethod
+    def load(cls, path: str) -> "DistilledClassifier":
+        with np.load(path, allow_pickle=False) as f:
+            return cls(f["weights"], f["bias"], [str(label) for label in f["labels"]])
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, labels=np.asarray(self.labels))
+
+    def _logits(self, indptr, indices, data) -> np.ndarray:
+        n_rows = len(indptr) - 1
+        logits = np.tile(self.bias, (n_rows, 1))
+        if len(indices):
+            np.add.at(logits, _row_ids(indptr), data[:, None] * self.weights[indices])
+        return logits
+
+    def predict_proba(self, csr) -> np.ndarray:
+        return _softmax(self._logits(*csr))
+
+    def fit(self, csr, y: np.ndarray, epochs: int = 20, lr: float = 2.0, l2: float = 1e-6, batch_size: int = 256, seed: int = 0) -> None:
+        """Mini-batch gradient descent on the softmax cross-entropy."""
+        indptr, indices, data = csr
+        rng = np.random.default_rng(seed)
+        n_rows = len(indptr) - 1
+        onehot = np.eye(len(self.labels), dtype=np.float32)[y]
+        for _ in range(epochs):
+            order = rng.permutation(n_rows)
+            for start in range(0, n_rows, batch_size):
+                rows = order[start:start + batch_size]
+                starts, ends = indptr[rows], indptr[rows + 1]
+                take = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)]) if len(rows) else np.zeros(0, dtype=np.int64)
+                batch_indptr = np.concatenate([[0], np.cumsum(ends - starts)])
+                batch = (batch_indptr, indices[take], data[take])
+
+                grad_logits = (self.predict_proba(batch) - onehot[rows]) / len(rows)
+                grad_w = data[take][:, None] * grad_logits[_row_ids(batch_indptr)]
+                np.add.at(self.weights, indices[take], -lr * grad_w)
+                self.weights[indices[take]] *= (1 - lr * l2)
+                self.bias -= lr * grad_logits.sum(axis=0)
+
+    def predict(self, question_trail: str, transcript: str) -> tuple[str, float]:
+        """Best action and its probability for one chunk."""
+        with DISTILLED_PREDICT_SECONDS.time():
+            proba = self.predict_proba(featurize([(question_trail, transcript)], self.dim))[0]
+        best = int(proba.argmax())
+        return self.labels[best], float(proba[best])
+
+
+def load_distilled_classifier(path: str = DISTILLED_MODEL_PATH) -> Optional[DistilledClassifier]:
+    if not path or not os.path.exists(path):
+        return None
+    started = time.perf_counter()
+    model = DistilledClassifier.load(path)
+    log.info("distilled_classifier.loaded", path=path, dim=model.dim, ms=round((time.perf_counter() - started) * 1000))
+    return model
+
+
+distilled_classifier = load_distilled_classifier()
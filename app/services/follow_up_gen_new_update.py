@@ -3,21 +3,18 @@ import json
 import asyncio
 import re
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
+from app.core.llm import get_llm, invoke_llm
+from app.utils.logger import get_logger
+from app.core.provider_guard import ProviderUnavailable
+from app.utils.deadline import DeadlineExceeded
 
 # --- Step 1: Load Environment Variables ---
 load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY not found in .env")
+log = get_logger(__name__)
 
 # --- Step 2: LLM Setup ---
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-lite-preview-06-17",
-    temperature=0.4,
-    google_api_key=api_key
-)
+llm = get_llm(temperature=0.4)
 
 # --- Step 3: Prompt Template ---
 prompt = ChatPromptTemplate.from_template(
@@ -56,11 +53,11 @@ Rules:
 
 ---
 📄 Latest Transcript:
-{{latest_transcript}}
+{latest_transcript}
 
 ---
 🧠 Previous Q&A Trail:
-{{question_answer_trail}}
+{question_answer_trail}
 
 ---
 📤 Respond ONLY with a valid JSON object. Do not include markdown, prose, or code blocks.
@@ -80,12 +77,12 @@ async def generate_structured_followups(latest_transcript: str, question_answer_
     chain = prompt | llm
 
     try:
-        response = await chain.ainvoke({
+        response = await invoke_llm(chain, {
             "latest_transcript": latest_transcript,
             "question_answer_trail": question_answer_trail
-        })
+        }, stage="follow_up")
         raw = str(response.content or "").strip()
-        print("\n🧾 Raw LLM Output:\n", raw)
+        log.payload("follow_up.raw_output", raw=raw)
 
         clean = extract_json(raw)
         parsed = json.loads(clean)
@@ -99,8 +96,11 @@ async def generate_structured_followups(latest_transcript: str, question_answer_
             return parsed
 
         raise ValueError("Parsed content missing expected keys.")
+    except (DeadlineExceeded, ProviderUnavailable):
+        # Out of time or provider shedding load: make_decision answers with the degraded result
+        raise
     except Exception as e:
-        print(f"\n❗ Error during LLM decision: {e}")
+        log.error("follow_up.failed", error=str(e))
         return {
             "priority": 0,
             "discussion": "LLM failed to generate a valid response.",
@@ -2,21 +2,19 @@ import os
 import json
 import re
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
+from app.core.llm import get_llm, invoke_llm
+from app.utils.logger import get_logger
+from app.core.provider_guard import ProviderUnavailable
+from app.utils.deadline import DeadlineExceeded
+from app.utils.metrics import LLM_FALLBACKS
 
 # --- Load environment variables ---
 load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY not found in .env")
+log = get_logger(__name__)
 
 # --- Setup Gemini LLM ---
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-lite-preview-06-17",
-    temperature=0.4,
-    google_api_key=api_key
-)
+llm = get_llm(temperature=0.4)
 
 # --- Follow-up Prompt Template ---
 prompt = ChatPromptTemplate.from_template("""
@@ -54,11 +52,11 @@ Rules:
 
 ---
 📄 Latest Transcript:
-{{latest_transcript}}
+{latest_transcript}
 
 ---
 🧠 Previous Q&A Trail:
-{{question_answer_trail}}
+{question_answer_trail}
 
 ---
 📤 Respond ONLY with a valid JSON object. Do not include markdown, prose, or code blocks.
@@ -81,13 +79,13 @@ async def generate_followup(user_answer: str, qa_trail: str = "") -> str:
     chain = prompt | llm
 
     try:
-        response = await chain.ainvoke({
+        response = await invoke_llm(chain, {
             "latest_transcript": user_answer,
             "question_answer_trail": qa_trail
-        })
+        }, stage="followup_generator")
 
         raw = str(response.content or "").strip()
-        print("\n🧾 Raw LLM Output:\n", raw)
+        log.payload("followup_generator.raw_output", raw=raw)
 
         clean = extract_json(raw)
         parsed = json.loads(clean)
@@ -97,6 +95,12 @@ async def generate_followup(user_answer: str, qa_trail: str = "") -> str:
 
         raise ValueError("Parsed content missing 'discussion' field.")
 
+    except DeadlineExceeded:
+        LLM_FALLBACKS.inc(chain="followup_generator", reason="deadline")
+        return "No follow-up needed."
+    except ProviderUnavailable as e:
+        LLM_FALLBACKS.inc(chain="followup_generator", reason=e.reason)
+        return "No follow-up needed."
     except Exception as e:
-        print(f"\n❗ Error generating follow-up: {e}")
+        log.error("followup_generator.failed", error=str(e))
         return "No follow-up needed."
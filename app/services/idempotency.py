@@ -0,0 +1,166 @@
+import os
+import json
+import uuid
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+
+from app.utils.logger import get_logger
+from app.utils.loop_monitor import inherit_task_tags
+from app.utils.profiler import inherit_profile
+from app.utils.metrics import Counter
+
+load_dotenv()
+log = get_logger(__name__)
+
+# Idempotent chunk submissions.
+# A /stream retry carrying the same idempotency key (or chunk seq) as an
+# earlier request must not append the transcript again or re-run the LLM/TTS
+# pipeline. The first request claims idem:{qid}:{key} in Redis with an
+# in-flight marker (SET NX, expires so a crashed worker doesn't block retries
+# forever) and stores the result there when done. A retry then:
+#   - joins the running computation when it lands on the same worker
+#   - returns the stored result when it is finished
+#   - polls briefly when another worker is still computing it, then gives up
+#     with IdempotencyConflict (-> 409 + Retry-After)
+# A failed computation removes the marker so the next retry (or a request
+# already waiting on it) runs afresh.
+# Redis errors fail open: the request runs without protection.
+
+# --- Config ---
+IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "1") == "1"
+IDEMPOTENCY_INFLIGHT_TTL_MS = int(os.getenv("IDEMPOTENCY_INFLIGHT_TTL_MS", "30000"))
+IDEMPOTENCY_RESULT_TTL_S = int(os.getenv("IDEMPOTENCY_RESULT_TTL_S", "3600"))
+IDEMPOTENCY_WAIT_MS = int(os.getenv("IDEMPOTENCY_WAIT_MS", "10000"))
+IDEMPOTENCY_POLL_MS = int(os.getenv("IDEMPOTENCY_POLL_MS", "100"))
+IDEMPOTENCY_REDIS_TIMEOUT_S = float(os.getenv("IDEMPOTENCY_REDIS_TIMEOUT_S", "0.25"))
+
+IDEMPOTENCY_RESULTS = Counter(
+    "idempotency_requests_total",
+    "Keyed chunk submissions by outcome: executed, replayed, joined, waited, conflict, unprotected.",
+    ("result",),
+)
+
+# Delete the in-flight marker only if it is still ours
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class IdempotencyConflict(Exception):
+    """The same key is still being processed elsewhere."""
+
+    def __init__(self, key: str, retry_after_ms: int):
+        super().__init__(f"Request {key} is still in progress")
+        self.key = key
+        self.retry_after_ms = retry_after_ms
+
+
+class IdempotencyStore:
+    def __init__(self, redis_url: Optional[str] = os.getenv("REDIS_PATH")):
+        self.r = redis.from_url(
+            redis_url,
+            decode_responses=True,
+            socket_timeout=IDEMPOTENCY_REDIS_TIMEOUT_S,
+            socket_connect_timeout=IDEMPOTENCY_REDIS_TIMEOUT_S,
+        )
+        self._release = self.r.register_script(_RELEASE_LUA)
+        # Computations running on this worker, for retries that land here
+        self._local: dict[str, asyncio.Task] = {}
+
+    async def warm_up(self, connections: int) -> None:
+        """Opens pooled connections and loads the release script ahead of the first request."""
+        await asyncio.gather(*(self.r.ping() for _ in range(connections)))
+        await self.r.script_load(self._release.script)
+
+    @staticmethod
+    def key_for(qid: str, idempotency_key: Optional[str], seq: Optional[int]) -> Optional[str]:
+        if idempotency_key:
+            return f"idem:{qid}:{idempotency_key}"
+        if seq is not None:
+            return f"idem:{qid}:seq:{seq}"
+        return None
+
+    async def run(self, key: Optional[str], compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Runs `compute` at most once per key and returns its (JSON-encoded) result."""
+        if not IDEMPOTENCY_ENABLED or key is None:
+            return await compute()
+
+        task = self._local.get(key)
+        if task is not None:
+            IDEMPOTENCY_RESULTS.inc(result="joined")
+            return await asyncio.shield(task)
+
+        token = f"pending:{uuid.uuid4().hex}"
+        for _ in range(2):
+            try:
+                claimed = await self.r.set(key, token, nx=True, px=IDEMPOTENCY_INFLIGHT_TTL_MS)
+            except (RedisError, OSError) as e:
+                IDEMPOTENCY_RESULTS.inc(result="unprotected")
+                log.warning("idempotency.fail_open", key=key, error=str(e))
+                return await compute()
+            if claimed:
+                break
+            found, result = await self._wait_for_result(key)
+            if found:
+                return result
+            # The marker vanished without a result (that attempt failed): claim it ourselves
+        else:
+            IDEMPOTENCY_RESULTS.inc(result="conflict")
+            raise IdempotencyConflict(key, IDEMPOTENCY_POLL_MS)
+
+        IDEMPOTENCY_RESULTS.inc(result="executed")
+        task = asyncio.create_task(self._compute_and_store(key, token, compute))
+        inherit_task_tags(task)
+        inherit_profile(task)
+        self._local[key] = task
+        task.add_done_callback(lambda _: self._local.pop(key, None))
+        # Shielded: a client that hangs up doesn't cancel work its retry will join
+        return await asyncio.shield(task)
+
+    async def _compute_and_store(self, key: str, token: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            result = jsonable_encoder(await compute())
+        except BaseException:
+            try:
+                await self._release(keys=[key], args=[token])
+            except (RedisError, OSError) as e:
+                log.warning("idempotency.release_failed", key=key, error=str(e))
+            raise
+        try:
+            await self.r.set(key, json.dumps({"result": result}), ex=IDEMPOTENCY_RESULT_TTL_S)
+        except (RedisError, OSError) as e:
+            log.warning("idempotency.store_failed", key=key, error=str(e))
+        return result
+
+    async def _wait_for_result(self, key: str) -> tuple[bool, Any]:
+        """(True, result) once stored; (False, None) if the marker disappears without one."""
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + IDEMPOTENCY_WAIT_MS / 1000
+        waited = False
+        while True:
+            try:
+                raw = await self.r.get(key)
+            except (RedisError, OSError) as e:
+                log.warning("idempotency.read_failed", key=key, error=str(e))
+                raw = ""
+            if raw is None:
+                return False, None
+            if raw and not raw.startswith("pending:"):
+                IDEMPOTENCY_RESULTS.inc(result="waited" if waited else "replayed")
+                return True, json.loads(raw)["result"]
+            if loop.time() >= give_up_at:
+                IDEMPOTENCY_RESULTS.inc(result="conflict")
+                raise IdempotencyConflict(key, IDEMPOTENCY_WAIT_MS)
+            waited = True
+            await asyncio.sleep(IDEMPOTENCY_POLL_MS / 1000)
+
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,149 @@
+import os
+import re
+import time
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+import yaml
+from rapidfuzz import fuzz, process, utils
+from dotenv import load_dotenv
+
+from app.utils.logger import get_logger
+from app.utils.metrics import Counter
+
+load_dotenv()
+log = get_logger(__name__)
+
+# Local pre-classifier for chunks whose intent is obvious ("can you repeat
+# that?", "um", "let me think"). A hit skips the classifier call and, for
+# repeats, the rephrasing call too. Rules live in a YAML file that is re-read
+# when it changes; a broken edit keeps the previous rules.
+
+# --- Config ---
+INTENT_FAST_PATH_ENABLED = os.getenv("INTENT_FAST_PATH_ENABLED", "1") == "1"
+# Empty counts as unset, so a blank line copied from env.sample keeps the bundled rules
+INTENT_RULES_PATH = os.getenv("INTENT_RULES_PATH") or os.path.join(os.path.dirname(__file__), "intent_rules.yaml")
+INTENT_RULES_RELOAD_S = float(os.getenv("INTENT_RULES_RELOAD_S", "5"))
+# Fraction of hits re-checked by the real classifier in the background
+INTENT_SHADOW_RATE = float(os.getenv("INTENT_SHADOW_RATE", "0.1"))
+# Longer transcripts go straight to the classifier; no rule allows this many words anyway
+INTENT_MAX_CHARS = int(os.getenv("INTENT_MAX_CHARS", "200"))
+
+INTENT_CHECKS = Counter(
+    "intent_fast_path_total", "Chunks checked by the intent fast path (intent=none is a miss).", ("intent",)
+)
+INTENT_SHADOW = Counter(
+    "intent_fast_path_shadow_total",
+    "Sampled fast-path hits re-checked by the classifier; precision = agreed / all.",
+    ("intent", "agreed"),
+)
+
+
+@dataclass
+class IntentMatch:
+    intent: str
+    action: str
+    shadow_action: str
+    score: float
+
+
+@dataclass
+class _IntentRule:
+    name: str
+    action: str
+    shadow_action: str
+    threshold: float
+    max_words: int
+    regex: list[re.Pattern]
+    phrases: list[str]
+
+
+def _normalize(text: str) -> str:
+    # "didn't" -> "didnt" rather than "didn t"; "sorry, can" -> "sorry can"
+    return " ".join(utils.default_process(text.replace("'", "").replace("’", "")).split())
+
+
+def _parse_rules(data: dict) -> list[_IntentRule]:
+    rules = []
+    for name, spec in (data.get("intents") or {}).items():
+        rules.append(_IntentRule(
+            name=name,
+            action=spec["action"],
+            shadow_action=spec.get("shadow_action", ""),
+            threshold=float(spec.get("threshold", 90)),
+            max_words=int(spec.get("max_words", 10)),
+            regex=[re.compile(p) for p in spec.get("regex", [])],
+            phrases=[_normalize(p) for p in spec.get("phrases", [])],
+        ))
+    return rules
+
+
+class IntentRules:
+    def __init__(self, path: str = INTENT_RULES_PATH, reload_s: float = INTENT_RULES_RELOAD_S):
+        self.path = path
+        self.reload_s = reload_s
+        self._rules: list[_IntentRule] = []
+        self._mtime = 0.0
+        self._checked_at = 0.0
+        self._maybe_reload(force=True)
+
+    def _maybe_reload(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.reload_s:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._mtime:
+                return
+            with open(self.path, encoding="utf-8") as f:
+                rules = _parse_rules(yaml.safe_load(f) or {})
+        except (OSError, yaml.YAMLError, KeyError, TypeError, ValueError, re.error) as e:
+            log.error("intent_rules.load_failed", path=self.path, error=str(e))
+            return
+        self._rules, self._mtime = rules, mtime
+        log.info("intent_rules.loaded", path=self.path, intents=[r.name for r in rules])
+
+    def match(self, transcript: str) -> Optional[IntentMatch]:
+        """Best rule hit for a chunk, or None when it needs the classifier."""
+        if not INTENT_FAST_PATH_ENABLED:
+            return None
+        self._maybe_reload()
+
+        transcript = transcript or ""
+        if len(transcript) > INTENT_MAX_CHARS:
+            INTENT_CHECKS.inc(intent="none")
+            return None
+        text = _normalize(transcript)
+        n_words = len(text.split())
+        best: Optional[IntentMatch] = None
+        for rule in self._rules:
+            if not text or n_words > rule.max_words:
+                continue
+            if any(p.fullmatch(text) for p in rule.regex):
+                score = 100.0
+            else:
+                hit = process.extractOne(text, rule.phrases, scorer=fuzz.ratio, score_cutoff=rule.threshold)
+                if hit is None:
+                    continue
+                score = hit[1]
+            if best is None or score > best.score:
+                best = IntentMatch(rule.name, rule.action, rule.shadow_action, score)
+
+        INTENT_CHECKS.inc(intent=best.intent if best else "none")
+        return best
+
+    @staticmethod
+    def should_shadow() -> bool:
+        return INTENT_SHADOW_RATE > 0 and random.random() < INTENT_SHADOW_RATE
+
+    @staticmethod
+    def record_shadow(match: IntentMatch, classifier_action: str) -> None:
+        agreed = classifier_action == match.shadow_action
+        INTENT_SHADOW.inc(intent=match.intent, agreed=str(agreed).lower())
+        if not agreed:
+            log.info("intent_rules.shadow_disagreed", intent=match.intent, score=match.score, classifier=classifier_action)
+
+
+intent_rules = IntentRules()
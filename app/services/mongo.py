@@ -1,8 +1,30 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 import os
 
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
-client = AsyncIOMotorClient(MONGO_URL)
+# minPoolSize keeps that many connections open (re-opened in the background), so bursts don't pay the handshake
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "5"))
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+client = AsyncIOMotorClient(MONGO_URL, minPoolSize=MONGO_MIN_POOL_SIZE, maxPoolSize=MONGO_MAX_POOL_SIZE)
 
 db = client["interview_db"]
 final_collection = db["final_responses"]
+decision_log_collection = db["decision_log"]
+
+
+async def ensure_indexes() -> None:
+    """Indexes for the lookups done on the final responses and the decision log (no-ops when present)."""
+    await asyncio.gather(
+        final_collection.create_index("qid"),
+        final_collection.create_index([("candidate_id", 1), ("timestamp", -1)]),
+        final_collection.create_index("timestamp"),
+        decision_log_collection.create_index([("source", 1), ("action", 1)]),
+        decision_log_collection.create_index("timestamp"),
+    )
+
+
+async def warm_up() -> None:
+    """Connects and authenticates before the first write, then makes sure the indexes exist."""
+    await client.admin.command("ping")
+    await ensure_indexes()
@@ -0,0 +1,172 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from dotenv import load_dotenv
+
+from app.services.question_trail_dict import AsyncQATrailManager
+from app.utils.text_speech_cloud import prerender_question_audio
+from app.utils.logger import get_logger
+from app.utils.metrics import Counter
+
+load_dotenv()
+log = get_logger(__name__)
+
+# Speculative prep of a candidate's next main question.
+# With the session plan known (POST /interview/plan), the trail doc and audio
+# for question N+1 are prepared in the background while the candidate answers
+# question N. /interview/start then claims the prepared Qid instead of writing
+# to Redis, and finds the audio already in question_audio_cache.
+#
+# Outcomes (prefetch_total{result}):
+#   hit       - prepared and ready when /start asked for it
+#   pending   - /start joined a prefetch that was still running
+#   miss      - nothing prepared for that question
+#   wasted    - prepared for a question that was not asked next (doc deleted)
+#   cancelled - dropped because the plan changed before it finished
+#   expired   - session idle past PREFETCH_SESSION_TTL_S, or evicted as the
+#               least recently active beyond PREFETCH_MAX_SESSIONS (doc deleted)
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") == "1"
+PREFETCH_SESSION_TTL_S = float(os.getenv("PREFETCH_SESSION_TTL_S", "3600"))
+PREFETCH_MAX_SESSIONS = int(os.getenv("PREFETCH_MAX_SESSIONS", "10000"))
+
+PREFETCH_RESULTS = Counter("prefetch_total", "Next-question prefetch outcomes.", ("result",))
+
+
+@dataclass
+class _Prefetch:
+    question: str
+    task: asyncio.Task
+
+
+class SessionPrefetcher:
+    def __init__(self, qa_manager: AsyncQATrailManager, role: str = "AI_Interviewer"):
+        self.qa_manager = qa_manager
+        self.role = role
+        self._plans: dict[str, list[str]] = {}
+        self._current: dict[str, str] = {}
+        self._pending: dict[str, _Prefetch] = {}
+        self._cleanup_tasks: set[asyncio.Task] = set()
+        # Last activity per candidate, oldest first; abandoned sessions are dropped from the front
+        self._last_seen: OrderedDict[str, float] = OrderedDict()
+
+    async def _prepare(self, question: str) -> str:
+        create = asyncio.ensure_future(self.qa_manager.create_question(question_text=f"{self.role}: {question}"))
+        try:
+            await asyncio.gather(create, prerender_question_audio([question]))
+        except asyncio.CancelledError:
+            # Cancelled after the doc was written: nobody will claim it
+            if create.done() and not create.cancelled() and create.exception() is None:
+                self._delete_doc(create.result())
+            raise
+        return create.result()
+
+    def _delete_doc(self, qid: str) -> None:
+        task = asyncio.create_task(self.qa_manager.delete_question(qid))
+        self._cleanup_tasks.add(task)
+        task.add_done_callback(self._cleanup_tasks.discard)
+
+    def _touch(self, candidate_id: str) -> None:
+        now = time.monotonic()
+        self._last_seen[candidate_id] = now
+        self._last_seen.move_to_end(candidate_id)
+        while self._last_seen:
+            oldest, seen_at = next(iter(self._last_seen.items()))
+            if len(self._last_seen) <= PREFETCH_MAX_SESSIONS and now - seen_at <= PREFETCH_SESSION_TTL_S:
+                break
+            self._end(oldest, "expired")
+
+    def _start(self, candidate_id: str, question: str) -> None:
+        task = asyncio.create_task(self._prepare(question))
+        # Failures only mean a miss later; keep them out of "exception never retrieved"
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._pending[candidate_id] = _Prefetch(question, task)
+
+    def _discard(self, candidate_id: str, result: str) -> None:
+        entry = self._pending.pop(candidate_id, None)
+        if entry is None:
+            return
+        if not entry.task.done():
+            entry.task.cancel()
+            PREFETCH_RESULTS.inc(result="cancelled")
+            return
+        PREFETCH_RESULTS.inc(result=result)
+        if not entry.task.cancelled() and entry.task.exception() is None:
+            # Nobody will ever use this doc
+            self._delete_doc(entry.task.result())
+
+    def set_plan(self, candidate_id: str, questions: list[str]) -> bool:
+        """
+        Registers (or replaces) a session plan and starts on the question that
+        comes next in it. Returns whether the plan changed.
+        """
+        if not PREFETCH_ENABLED:
+            return False
+        self._touch(candidate_id)
+        questions = [q.strip() for q in questions if q.strip()]
+        if self._plans.get(candidate_id) == questions:
+            return False
+        if not questions:
+            self._end(candidate_id)
+            return True
+        self._plans[candidate_id] = questions
+        self._prefetch_after(candidate_id, self._current.get(candidate_id))
+        log.info("prefetch.plan_set", candidate_id=candidate_id, questions=len(questions))
+        return True
+
+    async def claim(self, candidate_id: str, question: str) -> Optional[str]:
+        """Qid prepared for this (candidate, question), or None when it has to be created now."""
+        if candidate_id not in self._plans:
+            return None
+        self._touch(candidate_id)
+        entry = self._pending.get(candidate_id)
+        if entry is None or entry.question != question.strip():
+            self._discard(candidate_id, "wasted")
+            PREFETCH_RESULTS.inc(result="miss")
+            return None
+
+        del self._pending[candidate_id]
+        result = "hit" if entry.task.done() else "pending"
+        try:
+            # Shielded: a client hanging up mustn't cancel the prefetch halfway through writing its doc
+            qid = await asyncio.shield(entry.task)
+        except asyncio.CancelledError:
+            # Keep it for the client's retry (or for expiry to clean up)
+            self._pending.setdefault(candidate_id, entry)
+            raise
+        except Exception as e:
+            log.warning("prefetch.failed", candidate_id=candidate_id, error=str(e))
+            PREFETCH_RESULTS.inc(result="miss")
+            return None
+        PREFETCH_RESULTS.inc(result=result)
+        return qid
+
+    def schedule_next(self, candidate_id: str, question: str) -> None:
+        """Called once question N is live: starts preparing N+1 (or ends the session after the last one)."""
+        if candidate_id not in self._plans:
+            return
+        self._touch(candidate_id)
+        self._current[candidate_id] = question.strip()
+        self._prefetch_after(candidate_id, question.strip())
+
+    def _prefetch_after(self, candidate_id: str, current: Optional[str]) -> None:
+        plan = self._plans[candidate_id]
+        # Off-plan (or not started yet): the plan's first question is the best guess
+        index = plan.index(current) + 1 if current in plan else 0
+        if index >= len(plan):
+            self._end(candidate_id)
+            return
+        entry = self._pending.get(candidate_id)
+        if entry is not None and entry.question == plan[index]:
+            return  # already on it; a plan change elsewhere doesn't invalidate it
+        self._discard(candidate_id, "wasted")
+        self._start(candidate_id, plan[index])
+
+    def _end(self, candidate_id: str, result: str = "wasted") -> None:
+        self._discard(candidate_id, result)
+        self._plans.pop(candidate_id, None)
+        self._current.pop(candidate_id, None)
+        self._last_seen.pop(candidate_id, None)
@@ -0,0 +1,107 @@
+import os
+import re
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+import numpy as np
+from rapidfuzz import fuzz, process, utils
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Config ---
+QUESTION_DUPLICATE_THRESHOLD = float(os.getenv("QUESTION_DUPLICATE_THRESHOLD", "85"))
+QUESTION_BANK_PATH = os.getenv("QUESTION_BANK_PATH")
+QUESTION_INDEX_MAX_SESSIONS = int(os.getenv("QUESTION_INDEX_MAX_SESSIONS", "10000"))
+
+# "AI_Interviewer: ..." prefixes are added by /start and shouldn't count towards similarity
+_ROLE_PREFIX = re.compile(r"^\s*(AI_Interviewer|human)\s*:\s*", re.IGNORECASE)
+
+
+def strip_role_prefix(text: str) -> str:
+    return _ROLE_PREFIX.sub("", text or "")
+
+
+def normalize_question(text: str) -> str:
+    return utils.default_process(strip_role_prefix(text))
+
+
+class QuestionIndex:
+    """
+    In-memory similarity index over the static question bank
+    (QUESTION_BANK_PATH) and the questions of each session, kept for the
+    QUESTION_INDEX_MAX_SESSIONS most recent sessions. Scoring is done with RapidFuzz `cdist`,
+    so a lookup against the whole index is a single vectorized call.
+    """
+
+    def __init__(self, threshold: float = QUESTION_DUPLICATE_THRESHOLD, max_sessions: int = QUESTION_INDEX_MAX_SESSIONS):
+        self.threshold = threshold
+        self.max_sessions = max_sessions
+        self._bank: list[str] = []
+        self._bank_seen: set[str] = set()
+        self._sessions: OrderedDict[str, list[str]] = OrderedDict()
+
+    # --- Index maintenance ---
+    def add_to_bank(self, text: str) -> None:
+        norm = normalize_question(text)
+        if norm and norm not in self._bank_seen:
+            self._bank_seen.add(norm)
+            self._bank.append(norm)
+
+    def load_bank(self, path: str) -> int:
+        """Loads one question per line; returns how many were added."""
+        before = len(self._bank)
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                self.add_to_bank(line)
+        return len(self._bank) - before
+
+    def add_asked(self, session_id: str, text: str) -> None:
+        norm = normalize_question(text)
+        if not norm:
+            return
+        asked = self._sessions.get(session_id)
+        if asked is None:
+            asked = self._sessions[session_id] = []
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        if norm not in asked:
+            asked.append(norm)
+
+    def clear_session(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    # --- Lookups ---
+    def _choices(self, session_id: str, extra: Iterable[str]) -> list[str]:
+        return self._sessions.get(session_id, []) + [normalize_question(t) for t in extra] + self._bank
+
+    def score_batch(self, session_id: str, texts: list[str], extra: Iterable[str] = ()) -> tuple[np.ndarray, list[Optional[str]]]:
+        """
+        Best similarity (0-100) of each text against the session's asked
+        questions, `extra` (e.g. items already waiting in the heap) and the bank.
+        """
+        choices = self._choices(session_id, extra)
+        if not texts:
+            return np.zeros(0, dtype=np.float32), []
+        if not choices:
+            return np.zeros(len(texts), dtype=np.float32), [None] * len(texts)
+
+        queries = [normalize_question(t) for t in texts]
+        scores = process.cdist(queries, choices, scorer=fuzz.token_sort_ratio, dtype=np.float32, workers=1)
+        best_idx = scores.argmax(axis=1)
+        best = scores[np.arange(len(queries)), best_idx]
+        return best, [choices[i] for i in best_idx]
+
+    def find_duplicate(self, session_id: str, text: str, extra: Iterable[str] = ()) -> tuple[float, Optional[str]]:
+        """Returns (score, matched question) if `text` is a near-duplicate, else (score, None)."""
+        scores, matches = self.score_batch(session_id, [text], extra)
+        if scores.size and scores[0] >= self.threshold:
+            return float(scores[0]), matches[0]
+        return (float(scores[0]) if scores.size else 0.0), None
+
+
+question_index = QuestionIndex()
+if QUESTION_BANK_PATH and os.path.exists(QUESTION_BANK_PATH):
+    question_index.load_bank(QUESTION_BANK_PATH)
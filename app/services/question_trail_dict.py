@@ -1,9 +1,10 @@
 import os
-import json
 import uuid
 from typing import Literal, TypedDict, List, Optional
 import redis.asyncio as redis  # Note the asyncio variant
 from dotenv import load_dotenv
+from app.utils.metrics import stage_timer
+from app.utils.trail_codec import encode_trail, decode_trail
 load_dotenv()
 import asyncio
 
@@ -19,14 +20,32 @@ class QuestionDoc(TypedDict):
     system_messages: List[str]
 
 
+def question_from_conversation(conversation: str) -> str:
+    """Question text from a `get_question_conversation` string (its first line)."""
+    first_line = conversation.split("\n", 1)[0]
+    return first_line.split("): ", 1)[-1]
+
+
+def format_conversation(qid: str, doc: QuestionDoc) -> str:
+    lines = [f"Q ({qid}): {doc['question']}"]
+    for idx, a in enumerate(doc["answers"], 1):
+        lines.append(f"A{idx} ({a['role']}): {a['text']}")
+    return "\n".join(lines)
+
+
 class AsyncQATrailManager:
     def __init__(self, redis_url=os.getenv('REDIS_PATH')):
-        self.r = redis.from_url(redis_url, decode_responses=True)
+        # Raw bytes: trail docs may be binary (see app/utils/trail_codec.py)
+        self.r = redis.from_url(redis_url)
         self.prefix = "qa:"
 
     def _key(self, qid: str) -> str:
         return f"{self.prefix}{qid}"
 
+    async def warm_up(self, connections: int) -> None:
+        """Opens `connections` pooled connections before the first request needs them."""
+        await asyncio.gather(*(self.r.ping() for _ in range(connections)))
+
     async def create_question(self, question_text: str) -> str:
         qid = str(uuid.uuid4())
         doc: QuestionDoc = {
@@ -35,32 +54,57 @@ class AsyncQATrailManager:
             "answers": [],
             "system_messages": []
         }
-        await self.r.set(self._key(qid), json.dumps(doc))
+        with stage_timer("redis"):
+            await self.r.set(self._key(qid), encode_trail(doc))
         return qid
 
+    async def create_questions(self, question_texts: List[str]) -> List[str]:
+        """Creates one trail doc per question in a single pipelined round-trip."""
+        qids = [str(uuid.uuid4()) for _ in question_texts]
+        pipe = self.r.pipeline(transaction=False)
+        for qid, question_text in zip(qids, question_texts):
+            doc: QuestionDoc = {
+                "id": qid,
+                "question": question_text,
+                "answers": [],
+                "system_messages": []
+            }
+            pipe.set(self._key(qid), encode_trail(doc))
+        with stage_timer("redis"):
+            await pipe.execute()
+        return qids
+
+    async def delete_question(self, qid: str) -> None:
+        with stage_timer("redis"):
+            await self.r.delete(self._key(qid))
+
     async def _get_doc(self, qid: str) -> Optional[QuestionDoc]:
-        raw = await self.r.get(self._key(qid))  # 👈 Fix: await
-        return json.loads(raw) if raw else None
+        with stage_timer("redis"):
+            raw = await self.r.get(self._key(qid))  # 👈 Fix: await
+        return decode_trail(raw) if raw else None
 
     async def _set_doc(self, qid: str, doc: QuestionDoc) -> None:
-        await self.r.set(self._key(qid), json.dumps(doc))
+        with stage_timer("redis"):
+            await self.r.set(self._key(qid), encode_trail(doc))
 
-    async def append_answer(self, qid: str, answer_text: str, role: Literal["human", "AI_Interviewer"]) -> None:
+    async def append_answer(self, qid: str, answer_text: str, role: Literal["human", "AI_Interviewer"]) -> QuestionDoc:
+        """Appends a chunk and returns the updated doc, so callers don't need a second read."""
         doc = await self._get_doc(qid)
         if not doc:
             raise KeyError(f"Invalid ID: {qid}")
         doc["answers"].append({"role": role, "text": answer_text})
         await self._set_doc(qid, doc)
+        return doc
+
+    async def get_question_text(self, qid: str) -> Optional[str]:
+        doc = await self._get_doc(qid)
+        return doc["question"] if doc else None
 
     async def get_question_conversation(self, qid: str) -> str:
         doc = await self._get_doc(qid)
         if not doc:
             return "Invalid Question ID."
-
-        lines = [f"Q ({qid}): {doc['question']}"]
-        for idx, a in enumerate(doc["answers"], 1):
-            lines.append(f"A{idx} ({a['role']}): {a['text']}")
-        return "\n".join(lines)
+        return format_conversation(qid, doc)
 
 
 
@@ -3,21 +3,18 @@ import json
 import asyncio
 import re
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
+from app.core.llm import get_llm, invoke_llm
+from app.utils.logger import get_logger
+from app.core.provider_guard import ProviderUnavailable
+from app.utils.deadline import DeadlineExceeded
 
 # --- Step 1: Load Environment Variables ---
 load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY not found in .env")
+log = get_logger(__name__)
 
 # --- Step 2: LLM Setup ---
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-lite-preview-06-17",
-    temperature=0.4,
-    google_api_key=api_key
-)
+llm = get_llm(temperature=0.4)
 
 # --- Step 3: Define Prompt Template with Priority ---
 wrong_answer_prompt = ChatPromptTemplate.from_template("""
@@ -68,18 +65,21 @@ def extract_json_from_llm_response(text: str) -> dict:
 async def handle_wrong_answer_async(latest_transcript: str, question_answer_trail: str) -> dict:
     chain = wrong_answer_prompt | llm
     try:
-        response = await chain.ainvoke({
+        response = await invoke_llm(chain, {
             "latest_transcript": latest_transcript,
             "question_answer_trail": question_answer_trail
-        })
+        }, stage="wrong_answer")
         raw = str(response.content or "").strip()
-        print("\n📨 Raw LLM response:\n", raw)
+        log.payload("wrong_answer.raw_output", raw=raw)
 
         result = extract_json_from_llm_response(raw)
-        print(f"\n✅ Parsed Response: status={result['status']}, priority={result['priority']}")
+        log.debug("wrong_answer.parsed", status=result["status"], priority=result["priority"])
         return result
+    except (DeadlineExceeded, ProviderUnavailable):
+        # Out of time or provider shedding load: make_decision answers with the degraded result
+        raise
     except Exception as e:
-        print(f"\n❗ Unexpected error: {e}")
+        log.error("wrong_answer.failed", error=str(e))
         return {"status": 500, "explanation": str(e), "priority": 0}
 
 # # --- Manual Test Section ---
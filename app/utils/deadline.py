@@ -0,0 +1,79 @@
+import os
+import time
+import contextvars
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Optional
+
+# Request deadlines and per-stage budgets.
+# An endpoint opens a `deadline_scope(ms)`; the deadline lives in a contextvar,
+# so it follows the request into every coroutine (and any task it spawns).
+# Each LLM stage also has its own budget; a call gets whichever is smaller,
+# so a slow classifier can't eat the time the handler needs, and nothing
+# waits on the provider longer than the request has left.
+
+STREAM_DEADLINE_MS = int(os.getenv("STREAM_DEADLINE_MS", "10000"))
+LLM_BUDGET_MS = int(os.getenv("LLM_BUDGET_MS", "6000"))
+
+# Per-stage overrides: LLM_BUDGET_<STAGE>_MS, e.g. LLM_BUDGET_CLASSIFIER_MS=3000
+_DEFAULT_STAGE_BUDGETS_MS = {"classifier": 3000}
+
+
+class DeadlineExceeded(Exception):
+    """The request (or stage) ran out of time before the call could finish."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded in stage '{stage}'")
+        self.stage = stage
+
+
+class Deadline:
+    __slots__ = ("expires_at",)
+
+    def __init__(self, timeout_ms: float):
+        self.expires_at = time.monotonic() + timeout_ms / 1000
+
+    def remaining(self) -> float:
+        """Seconds left (never negative)."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(timeout_ms: float):
+    """Sets the request deadline; a nested scope can only tighten it, never extend it."""
+    deadline = Deadline(timeout_ms)
+    outer = _current_deadline.get()
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+@lru_cache(maxsize=None)
+def stage_budget(stage: str) -> float:
+    """Configured budget for one stage, in seconds."""
+    default = _DEFAULT_STAGE_BUDGETS_MS.get(stage, LLM_BUDGET_MS)
+    return int(os.getenv(f"LLM_BUDGET_{stage.upper()}_MS", default)) / 1000
+
+
+def stage_timeout(stage: str) -> float:
+    """Time this stage may take: its own budget, capped by what the request has left."""
+    budget = stage_budget(stage)
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return budget
+    return min(budget, deadline.remaining())
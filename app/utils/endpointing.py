@@ -0,0 +1,87 @@
+import os
+import asyncio
+from enum import Enum
+
+VAD_PAUSE_MS = int(os.getenv("VAD_PAUSE_MS", "300"))
+VAD_END_SILENCE_MS = int(os.getenv("VAD_END_SILENCE_MS", "900"))
+
+
+class EndpointEvent(str, Enum):
+    WAITING = "waiting"    # no speech heard yet for this question
+    SPEAKING = "speaking"
+    PAUSE = "pause"        # silence just crossed the pause threshold
+    END = "end"            # silence long enough to treat the answer as finished
+
+
+class Endpointer:
+    """
+    Tracks trailing silence across a question's audio chunks and decides when
+    the candidate has finished speaking. Fed with the per-chunk VAD stats the
+    STT workers return. END is reported once per answer; the state then
+    starts over, so further silence reads as WAITING rather than END again.
+
+    Chunks are transcribed concurrently, so callers take a ticket when a
+    chunk arrives and apply its stats with `update_in_order`, which waits for
+    every earlier chunk to be applied (or given up with `finish`).
+    """
+
+    def __init__(self, pause_ms: int = VAD_PAUSE_MS, end_silence_ms: int = VAD_END_SILENCE_MS):
+        self.pause_s = pause_ms / 1000
+        self.end_silence_s = end_silence_ms / 1000
+        self.heard_speech = False
+        self.silence = 0.0
+        self._pause_signalled = False
+        self._issued = 0
+        self._next = 0
+        self._finished: set[int] = set()
+        self._waiters: dict[int, asyncio.Future] = {}
+
+    def ticket(self) -> int:
+        ticket = self._issued
+        self._issued += 1
+        return ticket
+
+    def finish(self, ticket: int) -> None:
+        """Marks the chunk's turn as used (or skipped when it failed); idempotent."""
+        if ticket < self._next or ticket in self._finished:
+            return
+        self._finished.add(ticket)
+        while self._next in self._finished:
+            self._finished.discard(self._next)
+            self._next += 1
+        waiter = self._waiters.get(self._next)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def update_in_order(self, ticket: int, has_speech: bool, trailing_silence: float, duration: float) -> EndpointEvent:
+        if ticket != self._next:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters[ticket] = waiter
+            try:
+                await waiter
+            finally:
+                self._waiters.pop(ticket, None)
+        try:
+            return self.update(has_speech, trailing_silence, duration)
+        finally:
+            self.finish(ticket)
+
+    def update(self, has_speech: bool, trailing_silence: float, duration: float) -> EndpointEvent:
+        if has_speech:
+            self.heard_speech = True
+            self.silence = trailing_silence
+            self._pause_signalled = False
+        else:
+            self.silence += duration
+
+        if not self.heard_speech:
+            return EndpointEvent.WAITING
+        if self.silence >= self.end_silence_s:
+            self.heard_speech = False
+            self.silence = 0.0
+            self._pause_signalled = False
+            return EndpointEvent.END
+        if self.silence >= self.pause_s and not self._pause_signalled:
+            self._pause_signalled = True
+            return EndpointEvent.PAUSE
+        return EndpointEvent.SPEAKING
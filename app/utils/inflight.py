@@ -0,0 +1,92 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+from app.utils.logger import get_logger
+from app.utils.metrics import Counter
+
+load_dotenv()
+log = get_logger(__name__)
+
+# Per-question bookkeeping of chunk work still running.
+# Once a question is finalized, results from its earlier chunks can no longer
+# reach the candidate, so finalization cancels them. It can first wait up to
+# FINALIZE_GRACE_MS for them, in case one is about to push a higher-priority
+# follow-up. Finalized Qids are remembered for a while, so late chunks and
+# late results are dropped instead of recreating per-question state.
+
+# --- Config ---
+FINALIZE_GRACE_MS = int(os.getenv("FINALIZE_GRACE_MS", "0"))
+FINALIZED_TTL_S = float(os.getenv("FINALIZED_TTL_S", "3600"))
+FINALIZED_MAX = int(os.getenv("FINALIZED_MAX", "100000"))
+
+CHUNK_WORK_DROPPED = Counter(
+    "chunk_work_dropped_total",
+    "Chunk work not used because its question was finalized: "
+    "cancelled (in flight), late (chunk arrived after), discarded (result arrived after).",
+    ("reason",),
+)
+FINALIZE_GRACE = Counter(
+    "finalize_grace_waits_total", "Finalizations that waited for in-flight chunks, by outcome.", ("outcome",)
+)
+
+
+class QuestionWorkTracker:
+    def __init__(self, grace_ms: int = FINALIZE_GRACE_MS):
+        self.grace_ms = grace_ms
+        self._tasks: dict[str, set[asyncio.Task]] = {}
+        self._finalized: OrderedDict[str, float] = OrderedDict()
+
+    def add(self, qid: str, task: asyncio.Task) -> None:
+        self._tasks.setdefault(qid, set()).add(task)
+
+    def discard(self, qid: str, task: asyncio.Task) -> None:
+        tasks = self._tasks.get(qid)
+        if tasks is not None:
+            tasks.discard(task)
+            if not tasks:
+                del self._tasks[qid]
+
+    def in_flight(self, qid: str) -> int:
+        return len(self._tasks.get(qid, ()))
+
+    def is_finalized(self, qid: str) -> bool:
+        finalized_at = self._finalized.get(qid)
+        if finalized_at is None:
+            return False
+        if time.monotonic() - finalized_at > FINALIZED_TTL_S:
+            del self._finalized[qid]
+            return False
+        return True
+
+    async def settle(self, qid: str) -> None:
+        """Gives other chunks of `qid` up to the grace period to finish."""
+        current = asyncio.current_task()
+        others = [t for t in self._tasks.get(qid, ()) if t is not current]
+        if not others or self.grace_ms <= 0:
+            return
+        _, pending = await asyncio.wait(others, timeout=self.grace_ms / 1000)
+        FINALIZE_GRACE.inc(outcome="timeout" if pending else "settled")
+
+    def finalize(self, qid: str) -> int:
+        """Marks `qid` finalized and cancels its remaining chunk work. Returns how many were cancelled."""
+        self._finalized[qid] = time.monotonic()
+        self._finalized.move_to_end(qid)
+        while len(self._finalized) > FINALIZED_MAX:
+            self._finalized.popitem(last=False)
+
+        current = asyncio.current_task()
+        cancelled = 0
+        for task in self._tasks.pop(qid, ()):
+            if task is not current and not task.done():
+                task.cancel()
+                cancelled += 1
+        if cancelled:
+            CHUNK_WORK_DROPPED.inc(cancelled, reason="cancelled")
+            log.info("inflight.cancelled", qid=qid, tasks=cancelled)
+        return cancelled
+
+
+question_work = QuestionWorkTracker()
@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+import zlib
+import queue
+import atexit
+import logging
+import contextvars
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+
+from app.utils.metrics import LOG_RECORDS_DROPPED
+
+# Structured, non-blocking logging for the hot path.
+# Callers only build a LogRecord and push it onto a bounded queue; JSON
+# encoding and the stdout write happen on a background listener thread, so a
+# slow stdout can never stall the event loop. If the queue is full the record
+# is dropped (and counted) instead of blocking.
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "500"))
+# Fraction of sessions (by Qid) whose raw LLM payloads / trails are logged
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.05"))
+
+_log_context: contextvars.ContextVar[dict] = contextvars.ContextVar("log_context", default={})
+
+
+def bind_context(**fields: Any) -> contextvars.Token:
+    """Attach fields (e.g. qid) to every log line emitted from the current task."""
+    return _log_context.set({**_log_context.get(), **fields})
+
+
+def reset_context(token: contextvars.Token) -> None:
+    _log_context.reset(token)
+
+
+def truncate(value: Any, limit: int = LOG_MAX_FIELD_CHARS) -> Any:
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}…(+{len(value) - limit} chars)"
+    if isinstance(value, dict):
+        return {k: truncate(v, limit) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [truncate(v, limit) for v in value]
+    return value
+
+
+def payload_sampled(qid: str) -> bool:
+    if LOG_PAYLOAD_SAMPLE_RATE >= 1:
+        return True
+    if LOG_PAYLOAD_SAMPLE_RATE <= 0 or not qid:
+        return False
+    # Stable per session: a sampled interview logs all of its payloads
+    return zlib.crc32(qid.encode()) % 10_000 < LOG_PAYLOAD_SAMPLE_RATE * 10_000
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+class StructLogger:
+    """Thin wrapper over a stdlib logger: `log.info("event", key=value, ...)`."""
+
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+
+    def _log(self, level: int, event: str, exc_info: bool = False, **fields: Any) -> None:
+        if not self._logger.isEnabledFor(level):
+            return
+        merged = {**_log_context.get(), **fields}
+        self._logger.log(level, event, exc_info=exc_info, extra={"fields": truncate(merged)})
+
+    def debug(self, event: str, **fields: Any) -> None:
+        self._log(logging.DEBUG, event, **fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        self._log(logging.INFO, event, **fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self._log(logging.WARNING, event, **fields)
+
+    def error(self, event: str, exc_info: bool = False, **fields: Any) -> None:
+        self._log(logging.ERROR, event, exc_info=exc_info, **fields)
+
+    def payload(self, event: str, **fields: Any) -> None:
+        """Raw LLM output / trails: only for sampled sessions, and always truncated."""
+        if not self._logger.isEnabledFor(logging.INFO):
+            return
+        if payload_sampled(_log_context.get().get("qid", "")):
+            self._log(logging.INFO, event, **fields)
+
+
+# --- Wiring ---
+_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_queue_handler = DroppingQueueHandler(_queue)
+
+_stream_handler = logging.StreamHandler(sys.stdout)
+_stream_handler.setFormatter(JsonFormatter())
+_listener = QueueListener(_queue, _stream_handler, respect_handler_level=False)
+
+_root = logging.getLogger("agent_vista")
+_root.setLevel(LOG_LEVEL)
+_root.addHandler(_queue_handler)
+_root.propagate = False
+
+_listener.start()
+atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> StructLogger:
+    return StructLogger(_root.getChild(name))
+
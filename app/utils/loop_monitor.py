@@ -0,0 +1,159 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+import weakref
+from typing import Any, Optional
+
+from app.utils.logger import get_logger
+from app.utils.metrics import Counter, Histogram
+
+# Event-loop stall detector.
+# A heartbeat coroutine wakes every LOOP_MONITOR_INTERVAL_MS and records how
+# late it was scheduled. A watchdog thread checks the heartbeat; if the loop
+# hasn't ticked for LOOP_STALL_THRESHOLD_MS, something is blocking it, so the
+# watchdog grabs the loop thread's current stack (which *is* the blocking
+# call) and reports it with the route and Qid of the task that was running.
+
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR", "1") == "1"
+LOOP_MONITOR_INTERVAL_MS = int(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50"))
+LOOP_STALL_THRESHOLD_MS = int(os.getenv("LOOP_STALL_THRESHOLD_MS", "200"))
+LOOP_STALL_STACK_DEPTH = int(os.getenv("LOOP_STALL_STACK_DEPTH", "25"))
+
+log = get_logger(__name__)
+
+LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "How late the loop-monitor heartbeat was scheduled.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_STALLS = Counter("event_loop_stalls_total", "Event-loop stalls over the threshold.", ("route",))
+
+# Request tags per task, so the watchdog thread can say whose code was blocking
+_task_tags: "weakref.WeakKeyDictionary[asyncio.Task, dict]" = weakref.WeakKeyDictionary()
+
+
+def tag_task(**fields: Any) -> None:
+    task = asyncio.current_task()
+    if task is not None:
+        _task_tags.setdefault(task, {}).update(fields)
+
+
+def inherit_task_tags(child: asyncio.Task) -> None:
+    """Gives a task spawned on behalf of the current request the same tags."""
+    parent = asyncio.current_task()
+    if parent is not None and parent in _task_tags:
+        _task_tags[child] = dict(_task_tags[parent])
+
+
+def _describe_task(task: Optional[asyncio.Task]) -> dict:
+    if task is None:
+        return {"route": "none"}
+    tags = dict(_task_tags.get(task, {}))
+    scope = tags.pop("scope", None)
+    if scope is not None:
+        route = scope.get("route")
+        tags.setdefault("route", getattr(route, "path", None) or scope.get("path", "unknown"))
+    tags.setdefault("route", "background")
+    tags["task"] = task.get_name()
+    return tags
+
+
+class LoopMonitorMiddleware:
+    """
+    Pure ASGI middleware: runs in the same task as the endpoint, so it can tag
+    that task with its request scope. Must sit inside any BaseHTTPMiddleware
+    (those run the downstream app in a separate task).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            tag_task(scope=scope)
+        await self.app(scope, receive, send)
+
+
+class LoopMonitor:
+    def __init__(
+        self,
+        interval_ms: int = LOOP_MONITOR_INTERVAL_MS,
+        threshold_ms: int = LOOP_STALL_THRESHOLD_MS,
+    ):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._reported_beat = 0.0
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        if self._heartbeat is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat = asyncio.create_task(self._beat(), name="loop-monitor-heartbeat")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+
+    async def _beat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_beat = now
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag >= self.threshold:
+                log.warning("loop.stall_ended", lag_ms=round(lag * 1000))
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval / 2):
+            beat = self._last_beat
+            stalled_for = time.monotonic() - beat
+            if stalled_for < self.threshold or beat == self._reported_beat:
+                continue
+            self._reported_beat = beat  # one report per stall
+            self._report(stalled_for)
+
+    def _report(self, stalled_for: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame, limit=LOOP_STALL_STACK_DEPTH) if frame is not None else []
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        info = _describe_task(task)
+
+        # Metrics are only updated on the loop thread; counted once the loop is free again
+        try:
+            self._loop.call_soon_threadsafe(lambda: LOOP_STALLS.inc(route=info["route"]))
+        except RuntimeError:
+            pass  # loop closed while we were looking
+        log.warning(
+            "loop.stall",
+            stalled_ms=round(stalled_for * 1000),
+            stack=[line.strip() for line in stack],
+            **info,
+        )
+
+
+loop_monitor = LoopMonitor()
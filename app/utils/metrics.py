@@ -0,0 +1,197 @@
+import time
+from bisect import bisect_left
+from typing import Optional
+
+# Minimal in-process metrics with Prometheus text exposition.
+# All updates happen on the event-loop thread, so there is no locking; an
+# observation is a dict lookup plus a couple of additions.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def labels(self, **labels):
+        key = self._key(labels)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in self._children.items():
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key: tuple, child) -> list[str]:
+        return [f"{self.name}{_label_str(self.labelnames, key)} {child.value}"]
+
+
+class _ValueChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        self.labels(**labels).value += amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        self.labels(**labels).value += amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.labels(**labels).value -= amount
+
+    def set(self, value: float, **labels) -> None:
+        self.labels(**labels).value = value
+
+
+class _HistogramChild:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * (n_buckets + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+class _Timer:
+    """Times a block; `outcome` defaults to ok/error but can be overridden inside the block."""
+
+    __slots__ = ("_hist", "_labels", "_gauge", "_t0", "outcome")
+
+    def __init__(self, hist: "Histogram", labels: dict, in_flight: Optional[object] = None):
+        self._hist = hist
+        self._labels = labels
+        self._gauge = in_flight
+        self.outcome: Optional[str] = None
+
+    def __enter__(self) -> "_Timer":
+        if self._gauge is not None:
+            self._gauge.value += 1
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        elapsed = time.perf_counter() - self._t0
+        if self._gauge is not None:
+            self._gauge.value -= 1
+        outcome = self.outcome or ("error" if exc_type else "ok")
+        self._hist.observe(elapsed, outcome=outcome, **self._labels)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(len(self.buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        child = self.labels(**labels)
+        child.counts[bisect_left(self.buckets, value)] += 1
+        child.sum += value
+        child.count += 1
+
+    def time(self, in_flight: Optional[Gauge] = None, **labels) -> _Timer:
+        """Context manager timing a block; optionally tracks it on an in-flight gauge with the same labels."""
+        gauge_child = in_flight.labels(**labels) if in_flight is not None else None
+        return _Timer(self, labels, gauge_child)
+
+    def _render_child(self, key: tuple, child: _HistogramChild) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, child.counts):
+            cumulative += count
+            le = 'le="%s"' % bound
+            lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, le)} {cumulative}")
+        cumulative += child.counts[-1]
+        le = 'le="+Inf"'
+        lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {child.sum}")
+        lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {child.count}")
+        return lines
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Interview pipeline metrics ---
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "End-to-end HTTP request latency.", ("route", "method", "outcome")
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled.", ("route",))
+
+STAGE_SECONDS = Histogram(
+    "interview_stage_seconds",
+    "Latency of each pipeline stage (redis, classifier, handler, tts, upload, mongo, stt).",
+    ("stage", "outcome"),
+)
+HANDLER_SECONDS = Histogram("decision_handler_seconds", "Latency of each decision handler.", ("action", "outcome"))
+LLM_CALL_SECONDS = Histogram("llm_call_seconds", "Latency of individual LLM calls.", ("model", "chain", "outcome"))
+
+LLM_PARSE_FAILURES = Counter(
+    "llm_parse_failures_total", "LLM responses that fell back to a 500/520 result.", ("chain", "status")
+)
+DECISIONS = Counter("decisions_total", "Decisions taken, by action.", ("action",))
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "Log records dropped because the log queue was full.")
+STAGE_IN_FLIGHT = Gauge("interview_stage_in_flight", "Pipeline stages currently running.", ("stage",))
+
+
+def stage_timer(stage: str) -> _Timer:
+    return STAGE_SECONDS.time(in_flight=STAGE_IN_FLIGHT, stage=stage)
+
+LLM_TIMEOUTS = Counter("llm_timeouts_total", "LLM calls abandoned at their deadline.", ("chain",))
+LLM_HEDGES = Counter("llm_hedges_total", "Hedge requests fired after the p95 delay.", ("chain",))
+LLM_HEDGE_WINS = Counter("llm_hedge_wins_total", "Hedge requests that returned before the primary.", ("chain",))
+LLM_FALLBACKS = Counter("llm_fallbacks_total", "Degraded results returned instead of an LLM answer.", ("chain", "reason"))
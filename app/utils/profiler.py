@@ -0,0 +1,223 @@
+import os
+import sys
+import time
+import uuid
+import random
+import asyncio
+import threading
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from app.utils.logger import get_logger
+
+# Opt-in per-request sampling profiler.
+# A request is profiled when it carries `X-Profile: 1` or is picked by
+# PROFILE_SAMPLE_RATE. While at least one profiled request is in flight a
+# sampler thread wakes every PROFILE_INTERVAL_MS and, for each profiled task,
+# records either
+#   - the loop thread's stack, if that task is the one running right now
+#     ("on-cpu": pydantic validation, JSON extraction, sync calls), or
+#   - the task's coroutine await chain, if it is suspended
+#     ("awaiting": where wall-clock time goes inside LangChain/Gemini I/O).
+# Tasks a request spawns (pipeline stages, shared computations) are sampled
+# into its profile too, once registered with inherit_profile.
+# Samples are stored as collapsed ("folded") stacks keyed by request id, ready
+# for flamegraph.pl / speedscope. Requests that aren't profiled pay nothing:
+# the middleware isn't installed unless PROFILING_ENABLED=1, and when it is,
+# the only per-request work is a header lookup and one random() draw.
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "50"))
+PROFILE_HEADER = b"x-profile"
+REQUEST_ID_HEADER = b"x-request-id"
+
+log = get_logger(__name__)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _coro_frame(obj):
+    return getattr(obj, "cr_frame", None) or getattr(obj, "gi_frame", None) or getattr(obj, "ag_frame", None)
+
+
+def _await_stack(task: asyncio.Task) -> list[str]:
+    """Outermost-first await chain of a suspended task."""
+    stack = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = _coro_frame(coro)
+        if frame is None:
+            break
+        stack.append(_frame_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+        if coro is not None and _coro_frame(coro) is None:
+            stack.append(f"[awaiting {type(coro).__name__}]")
+            break
+    return stack
+
+
+def _thread_stack(frame, root) -> list[str]:
+    """Outermost-first stack of the loop thread, trimmed to start at the task's root coroutine."""
+    stack = []
+    while frame is not None:
+        stack.append(frame)
+        if frame is root:
+            break
+        frame = frame.f_back
+    return [_frame_label(f) for f in reversed(stack)]
+
+
+class _ActiveProfile:
+    __slots__ = ("request_id", "route", "task", "started", "wall_start", "counts")
+
+    def __init__(self, request_id: str, route: str, task: asyncio.Task):
+        self.request_id = request_id
+        self.route = route
+        self.task = task
+        self.started = time.perf_counter()
+        self.wall_start = time.time()
+        self.counts: Counter = Counter()
+
+
+class RequestProfiler:
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS, max_stored: int = PROFILE_MAX_STORED):
+        self.interval = interval_ms / 1000
+        self.max_stored = max_stored
+        self.recent: OrderedDict[str, dict] = OrderedDict()
+        self._active: dict[asyncio.Task, _ActiveProfile] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+
+    # --- Lifecycle of one profiled request (called on the loop thread) ---
+    def begin(self, request_id: str, route: str) -> _ActiveProfile:
+        task = asyncio.current_task()
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        profile = _ActiveProfile(request_id, route, task)
+        with self._lock:
+            self._active[task] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def inherit(self, child: asyncio.Task) -> None:
+        """Samples `child` into the current task's profile, if it has one, until the child finishes."""
+        parent = asyncio.current_task()
+        with self._lock:
+            profile = self._active.get(parent)
+            if profile is None:
+                return
+            self._active[child] = profile
+        child.add_done_callback(self._forget)
+
+    def _forget(self, task: asyncio.Task) -> None:
+        with self._lock:
+            self._active.pop(task, None)
+
+    def end(self, profile: _ActiveProfile, status: int) -> None:
+        with self._lock:
+            for task in [t for t, p in self._active.items() if p is profile]:
+                del self._active[task]
+            # The sampler only writes to profiles still in _active, so this copy is final
+            counts = Counter(profile.counts)
+
+        duration_ms = (time.perf_counter() - profile.started) * 1000
+        self.recent[profile.request_id] = {
+            "request_id": profile.request_id,
+            "route": profile.route,
+            "status": status,
+            "started_at": profile.wall_start,
+            "duration_ms": round(duration_ms, 1),
+            "samples": sum(counts.values()),
+            "interval_ms": self.interval * 1000,
+            "folded": "\n".join(f"{stack} {count}" for stack, count in counts.most_common()),
+        }
+        while len(self.recent) > self.max_stored:
+            self.recent.popitem(last=False)
+        log.info("profile.stored", request_id=profile.request_id, route=profile.route, duration_ms=round(duration_ms, 1))
+
+    # --- Sampler thread ---
+    def _sample_loop(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.items())
+                if not active:
+                    self._thread = None
+                    return
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            try:
+                running = asyncio.current_task(self._loop)
+            except RuntimeError:
+                running = None
+
+            for task, profile in active:
+                try:
+                    if task is running and frame is not None:
+                        root = _coro_frame(task.get_coro())
+                        stack = ["[on-cpu]"] + _thread_stack(frame, root)
+                    else:
+                        stack = ["[awaiting]"] + _await_stack(task)
+                except Exception:
+                    # The loop thread moved on mid-walk; drop this sample
+                    continue
+                with self._lock:
+                    # end() may have taken this profile's counts since the snapshot above
+                    if self._active.get(task) is profile:
+                        profile.counts[";".join(stack)] += 1
+
+
+request_profiler = RequestProfiler()
+
+
+def inherit_profile(child: asyncio.Task) -> None:
+    """Counts a task spawned on behalf of a profiled request towards that request's profile."""
+    request_profiler.inherit(child)
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware that profiles requests asking for it. Like the loop
+    monitor middleware it must run in the endpoint's own task.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        requested = headers.get(PROFILE_HEADER) in (b"1", b"true")
+        if not requested and not (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE):
+            return await self.app(scope, receive, send)
+
+        request_id = (headers.get(REQUEST_ID_HEADER) or b"").decode() or str(uuid.uuid4())
+        profile = request_profiler.begin(request_id, scope.get("path", ""))
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                profile.route = getattr(route, "path", profile.route)
+            request_profiler.end(profile, status)
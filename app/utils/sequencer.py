@@ -0,0 +1,161 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+from dotenv import load_dotenv
+
+from app.utils.metrics import Counter
+
+load_dotenv()
+
+# Ordering and backpressure for chunk submissions.
+#
+# ChunkSequencer: trail mutations of one question happen one at a time, in
+# arrival order, or in `seq` order when the client numbers its chunks from 0.
+# A chunk whose predecessor hasn't arrived yet waits for it up to
+# SEQ_GAP_TIMEOUT_MS; then the missing seq is skipped up to the lowest chunk
+# still waiting (a lost chunk must not stall the question). Only the append
+# is serialized; decisions for different chunks still overlap. State of a
+# question is dropped at finalize, or once idle past SEQ_STATE_TTL_S / beyond
+# SEQ_STATE_MAX questions.
+#
+# SessionBudget: at most SESSION_MAX_INFLIGHT chunks per candidate are being
+# processed at once; more get SessionBusy (-> 429 + Retry-After), so one
+# chatty client can't occupy the LLM capacity everyone shares.
+
+# --- Config ---
+SEQ_GAP_TIMEOUT_MS = int(os.getenv("SEQ_GAP_TIMEOUT_MS", "500"))
+SEQ_STATE_TTL_S = float(os.getenv("SEQ_STATE_TTL_S", "3600"))
+SEQ_STATE_MAX = int(os.getenv("SEQ_STATE_MAX", "100000"))
+SESSION_MAX_INFLIGHT = int(os.getenv("SESSION_MAX_INFLIGHT", "4"))
+SESSION_RETRY_AFTER_S = int(os.getenv("SESSION_RETRY_AFTER_S", "1"))
+
+CHUNK_SEQUENCE = Counter(
+    "chunk_sequence_total",
+    "Chunk appends by ordering outcome: in_order, reordered (waited for a predecessor), gap_timeout, late.",
+    ("result",),
+)
+SESSION_REJECTIONS = Counter("session_budget_rejections_total", "Chunks refused because their session was over budget.")
+
+
+@dataclass
+class _QuestionState:
+    cond: asyncio.Condition = field(default_factory=asyncio.Condition)
+    busy: bool = False
+    next_seq: int = 0
+    waiting: set[int] = field(default_factory=set)  # numbered chunks waiting for their turn
+    users: int = 0  # turns in progress; a state in use is never swept
+    last_used: float = 0.0
+
+
+class ChunkSequencer:
+    def __init__(self, gap_timeout_ms: int = SEQ_GAP_TIMEOUT_MS):
+        self.gap_timeout = gap_timeout_ms / 1000
+        self._states: OrderedDict[str, _QuestionState] = OrderedDict()
+
+    def _use(self, qid: str) -> _QuestionState:
+        now = time.monotonic()
+        state = self._states.get(qid)
+        if state is None:
+            state = self._states[qid] = _QuestionState()
+        state.users += 1
+        state.last_used = now
+        self._states.move_to_end(qid)
+        for _ in range(len(self._states)):
+            oldest_qid, oldest = next(iter(self._states.items()))
+            if len(self._states) <= SEQ_STATE_MAX and now - oldest.last_used <= SEQ_STATE_TTL_S:
+                break
+            if oldest.users:
+                self._states.move_to_end(oldest_qid)
+            else:
+                del self._states[oldest_qid]
+        return state
+
+    @asynccontextmanager
+    async def turn(self, qid: str, seq: Optional[int] = None):
+        """Holds the question's trail for one chunk, after every earlier chunk has had its turn."""
+        state = self._use(qid)
+        try:
+            async with state.cond:
+                if seq is not None:
+                    await self._wait_in_order(state, seq)
+                # Unnumbered and late chunks only wait for the trail itself
+                await state.cond.wait_for(lambda: not state.busy)
+                state.busy = True
+                if seq is not None:
+                    # Advanced on acquire, so chunks arriving during this append wait for it
+                    state.next_seq = max(state.next_seq, seq + 1)
+            try:
+                yield
+            finally:
+                async with state.cond:
+                    state.busy = False
+                    state.cond.notify_all()
+        finally:
+            state.users -= 1
+
+    async def _wait_in_order(self, state: _QuestionState, seq: int) -> None:
+        if seq < state.next_seq:
+            CHUNK_SEQUENCE.inc(result="late")  # its successor already gave up waiting for it
+            return
+        result = "in_order" if seq == state.next_seq else "reordered"
+        state.waiting.add(seq)
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(
+                        state.cond.wait_for(lambda: not state.busy and state.next_seq >= seq), self.gap_timeout
+                    )
+                    break
+                except asyncio.TimeoutError:
+                    if state.next_seq < seq and state.next_seq not in state.waiting:
+                        # Predecessor never arrived: skip to the lowest chunk that did
+                        state.next_seq = min(s for s in state.waiting if s >= state.next_seq)
+                        result = "gap_timeout"
+                        state.cond.notify_all()
+        finally:
+            state.waiting.discard(seq)
+        CHUNK_SEQUENCE.inc(result=result)
+
+    def forget(self, qid: str) -> None:
+        self._states.pop(qid, None)
+
+
+class SessionBusy(Exception):
+    def __init__(self, candidate_id: str, retry_after_s: int):
+        super().__init__(f"Too many chunks in flight for {candidate_id}")
+        self.candidate_id = candidate_id
+        self.retry_after_s = retry_after_s
+
+
+class SessionBudget:
+    def __init__(self, max_inflight: int = SESSION_MAX_INFLIGHT):
+        self.max_inflight = max_inflight
+        self._inflight: dict[str, int] = {}
+
+    @asynccontextmanager
+    async def slot(self, candidate_id: str):
+        """One of the session's in-flight slots for the duration of a chunk; raises SessionBusy when none is free."""
+        if self.max_inflight <= 0:
+            yield
+            return
+        count = self._inflight.get(candidate_id, 0)
+        if count >= self.max_inflight:
+            SESSION_REJECTIONS.inc()
+            raise SessionBusy(candidate_id, SESSION_RETRY_AFTER_S)
+        self._inflight[candidate_id] = count + 1
+        try:
+            yield
+        finally:
+            remaining = self._inflight[candidate_id] - 1
+            if remaining:
+                self._inflight[candidate_id] = remaining
+            else:
+                del self._inflight[candidate_id]
+
+
+chunk_sequencer = ChunkSequencer()
+session_budget = SessionBudget()
@@ -0,0 +1,167 @@
+import os
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from app.utils.logger import get_logger
+from app.utils.loop_monitor import inherit_task_tags
+from app.utils.profiler import inherit_profile
+from app.utils.metrics import Counter
+
+log = get_logger(__name__)
+
+# Minimal async DAG runner for request pipelines.
+# Stages declare the stages they depend on; each one starts as soon as its
+# dependencies have finished, so independent stages overlap. A stage gets
+# the run's context object plus its dependencies' results (in declared order)
+# and can end the whole run early by raising StopGraph(result). Remaining
+# stages are then cancelled. Every run records a per-stage trace (start/end
+# offsets) and the critical path: the chain of last-finishing dependencies
+# that determined the total latency.
+
+STAGE_TRACE_LOG = os.getenv("STAGE_TRACE_LOG", "0") == "1"
+
+STAGE_CRITICAL = Counter(
+    "pipeline_stage_critical_total", "Runs in which a stage was on the critical path.", ("graph", "stage")
+)
+
+
+class StopGraph(Exception):
+    """Raised by a stage to finish the run early with `result`."""
+
+    def __init__(self, result: Any):
+        super().__init__("stop")
+        self.result = result
+
+
+@dataclass
+class _Stage:
+    name: str
+    fn: Callable[..., Awaitable[Any]]
+    deps: tuple[str, ...]
+
+
+@dataclass
+class StageSpan:
+    stage: str
+    start_ms: float
+    end_ms: float
+    outcome: str  # ok, stop, error, cancelled
+
+
+@dataclass
+class GraphTrace:
+    graph: str
+    spans: dict[str, StageSpan] = field(default_factory=dict)
+    critical_path: list[str] = field(default_factory=list)
+    total_ms: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "graph": self.graph,
+            "total_ms": round(self.total_ms, 1),
+            "critical_path": self.critical_path,
+            "stages": {
+                name: [round(span.start_ms, 1), round(span.end_ms, 1), span.outcome]
+                for name, span in self.spans.items()
+            },
+        }
+
+
+class StageGraph:
+    def __init__(self, name: str):
+        self.name = name
+        self._stages: dict[str, _Stage] = {}
+
+    def stage(self, *deps: str, name: Optional[str] = None):
+        """Decorator registering `async def fn(ctx, *dep_results)` as a stage."""
+        def register(fn):
+            stage_name = name or fn.__name__
+            missing = [d for d in deps if d not in self._stages]
+            if missing:
+                # Dependencies must be declared first, which also rules out cycles
+                raise ValueError(f"{self.name}.{stage_name}: unknown dependencies {missing}")
+            self._stages[stage_name] = _Stage(stage_name, fn, tuple(deps))
+            return fn
+        return register
+
+    async def run(self, ctx: Any, output: Optional[str] = None) -> tuple[Any, GraphTrace]:
+        """
+        Runs every stage and returns (result, trace): the `output` stage's
+        result (default: the last declared stage) or the StopGraph result.
+        """
+        output = output or next(reversed(self._stages))
+        trace = GraphTrace(self.name)
+        started = time.perf_counter()
+        tasks: dict[str, asyncio.Task] = {}
+
+        def now_ms() -> float:
+            return (time.perf_counter() - started) * 1000
+
+        async def run_stage(stage: _Stage):
+            dep_results = [await tasks[d] for d in stage.deps]
+            span = StageSpan(stage.name, now_ms(), 0.0, "ok")
+            trace.spans[stage.name] = span
+            try:
+                return await stage.fn(ctx, *dep_results)
+            except StopGraph:
+                span.outcome = "stop"
+                raise
+            except asyncio.CancelledError:
+                span.outcome = "cancelled"
+                raise
+            except Exception:
+                span.outcome = "error"
+                raise
+            finally:
+                span.end_ms = now_ms()
+
+        for stage in self._stages.values():
+            task = asyncio.create_task(run_stage(stage), name=f"{self.name}.{stage.name}")
+            inherit_task_tags(task)
+            inherit_profile(task)
+            tasks[stage.name] = task
+
+        stopped: Optional[StopGraph] = None
+        try:
+            pending = set(tasks.values())
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_EXCEPTION)
+                failed = [t for t in done if not t.cancelled() and t.exception() is not None]
+                if failed:
+                    # Prefer the first stage (in declaration order) that stopped or failed
+                    first = min(failed, key=lambda t: list(tasks.values()).index(t))
+                    error = first.exception()
+                    if isinstance(error, StopGraph):
+                        stopped = error
+                        break
+                    raise error
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            # Let cancelled stages unwind (and close their spans) before reporting
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            trace.total_ms = now_ms()
+            self._finish_trace(trace)
+
+        result = stopped.result if stopped is not None else tasks[output].result()
+        return result, trace
+
+    def _finish_trace(self, trace: GraphTrace) -> None:
+        # Walk back from the stage that finished last through its latest-finishing dependency
+        finished = [s for s in trace.spans.values() if s.outcome in ("ok", "stop")]
+        if finished:
+            current = max(finished, key=lambda s: s.end_ms).stage
+            path = [current]
+            while True:
+                deps = [trace.spans[d] for d in self._stages[current].deps if d in trace.spans]
+                if not deps:
+                    break
+                current = max(deps, key=lambda s: s.end_ms).stage
+                path.append(current)
+            trace.critical_path = path[::-1]
+            for stage in trace.critical_path:
+                STAGE_CRITICAL.inc(graph=self.name, stage=stage)
+        if STAGE_TRACE_LOG:
+            log.info("stage_graph.trace", **trace.as_dict())
@@ -1,38 +1,145 @@
+import os
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
 from pathlib import Path
+from typing import Optional
 from app.core.speak import text_to_speech
-from app.core.cloudinary import upload_audio_async
+from app.core.storage import audio_storage, AUDIO_LOCAL_MAX_AGE_S
+from app.core.audio_encoding import audio_encoder
+from app.utils.metrics import stage_timer
+from app.utils.logger import get_logger
+
+log = get_logger(__name__)
 
 async def analyze_audio_url(transcript: str, fileId: str):
+    """
+    Renders, encodes and stores a clip. Returns (True, audio_id, profile) or
+    (False, error, "").
+    """
     # Step 1: Generate the audio file
-    output_path = await text_to_speech(transcript,fileId)
+    with stage_timer("tts"):
+        output_path = await text_to_speech(transcript,fileId)
 
     if not output_path:
-        print("Text-to-speech failed. No file generated.")
-        return False, "TTS failed"
+        log.error("tts.no_file")
+        return False, "TTS failed", ""
 
-    file_path = Path(output_path)
+    if not Path(output_path).exists():
+        log.error("tts.file_missing", path=output_path)
+        return False, "TTS file missing", ""
 
-    if not file_path.exists():
-        print("Generated file does not exist.")
-        return False, "TTS file missing"
+    # Step 1b: Re-encode into the configured speech profile (falls back to the original)
+    output_path, profile = await audio_encoder.encode(output_path)
+    file_path = Path(output_path)
 
-    # Step 2: Upload the audio file to Cloudinary
-    public_id = await upload_audio_async(str(file_path))
+    # Step 2: Hand the audio file to the configured storage backend
+    with stage_timer("upload") as timer:
+        public_id = await audio_storage.put(str(file_path))
+        if not public_id:
+            timer.outcome = "error"
 
     if not public_id:
-        print("Upload to Cloudinary failed.")
+        log.error("upload.failed_cleanup", path=str(file_path))
         try:
             file_path.unlink()
-            print(f"Deleted local file after failed upload: {file_path}")
+            log.debug("audio.local_deleted", path=str(file_path))
         except Exception as e:
-            print(f"Could not delete file after failed upload: {e}")
-        return False, "Cloudinary upload failed"
+            log.warning("audio.local_delete_failed", path=str(file_path), error=str(e))
+        return False, f"{audio_storage.name} upload failed", ""
 
-    # Step 3: Successful upload – now delete local file
+    # Step 3: Successful upload – now delete local file (local storage has already moved it)
+    if not file_path.exists():
+        return True, public_id, profile
     try:
         file_path.unlink()
-        print(f"File uploaded and local copy deleted: {file_path}")
+        log.debug("audio.local_deleted", path=str(file_path))
     except Exception as e:
-        print(f"File uploaded but failed to delete local file: {e}")
+        log.warning("audio.local_delete_failed", path=str(file_path), error=str(e))
+
+    return True, public_id, profile
+
+# --- Pre-rendered main-question audio ---
+PRERENDER_CONCURRENCY = int(os.getenv("PRERENDER_CONCURRENCY", "8"))
+QUESTION_AUDIO_CACHE_MAX = int(os.getenv("QUESTION_AUDIO_CACHE_MAX", "5000"))
+# Must stay below the storage's own expiry, or /start hands out ids /audio no longer has.
+# Defaults to half of AUDIO_LOCAL_MAX_AGE_S; 0 keeps entries until evicted.
+QUESTION_AUDIO_CACHE_TTL_S = float(os.getenv("QUESTION_AUDIO_CACHE_TTL_S") or AUDIO_LOCAL_MAX_AGE_S / 2)
+
+
+class QuestionAudioCache:
+    """
+    Scripted question text -> (uploaded audio id, encoding profile). Least
+    recently used entries are dropped first; entries older than `ttl_s` are
+    re-rendered.
+    """
+
+    def __init__(self, max_entries: int = QUESTION_AUDIO_CACHE_MAX, ttl_s: float = QUESTION_AUDIO_CACHE_TTL_S):
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = ttl_s
+        self._entries: OrderedDict[str, tuple[tuple[str, str], float]] = OrderedDict()
+
+    def _live(self, text: str) -> Optional[tuple[str, str]]:
+        item = self._entries.get(text)
+        if item is None:
+            return None
+        entry, stored_at = item
+        if self.ttl_s > 0 and time.monotonic() - stored_at > self.ttl_s:
+            del self._entries[text]
+            return None
+        return entry
+
+    def __contains__(self, text: str) -> bool:
+        return self._live(text) is not None
+
+    def get(self, text: str, default=None):
+        entry = self._live(text)
+        if entry is None:
+            return default
+        self._entries.move_to_end(text)
+        return entry
+
+    def put(self, text: str, entry: tuple[str, str]) -> None:
+        self._entries[text] = (entry, time.monotonic())
+        self._entries.move_to_end(text)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+question_audio_cache = QuestionAudioCache()
+
+# Renders in progress by question text, so plans asking for the same question share one
+_inflight_renders: dict[str, asyncio.Task] = {}
+
+async def _render_question(text: str, semaphore: asyncio.Semaphore) -> None:
+    async with semaphore:
+        try:
+            success, audio_id, profile = await analyze_audio_url(text, f"question_{uuid.uuid4()}")
+        except Exception as e:
+            log.error("prerender.failed", question=text, error=str(e))
+            return
+    if success:
+        question_audio_cache.put(text, (audio_id, profile))
+
+async def prerender_question_audio(questions: list[str], concurrency: int = PRERENDER_CONCURRENCY) -> dict[str, tuple[str, str]]:
+    """
+    Renders and uploads audio for each distinct question text, at most
+    `concurrency` at a time. Returns question text -> (audio id, profile);
+    questions whose rendering failed are left out.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    def render(text: str) -> asyncio.Task:
+        task = _inflight_renders.get(text)
+        if task is None:
+            task = asyncio.create_task(_render_question(text, semaphore))
+            _inflight_renders[text] = task
+            task.add_done_callback(lambda t: _inflight_renders.pop(text) if _inflight_renders.get(text) is t else None)
+        return task
 
-    return True, public_id
+    todo = [text for text in dict.fromkeys(questions) if text not in question_audio_cache]
+    # Shielded: one caller going away doesn't cancel a render another plan is waiting on
+    await asyncio.gather(*(asyncio.shield(render(text)) for text in todo))
+    cached = {text: question_audio_cache.get(text) for text in dict.fromkeys(questions)}
+    return {text: entry for text, entry in cached.items() if entry is not None}
@@ -0,0 +1,82 @@
+import os
+import json
+from typing import Union
+
+import ormsgpack
+import zstandard
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Serialization of QA trail docs stored under qa:{qid}.
+# The first byte of a stored value says how to read it, so keys written by an
+# older build stay readable after the codec changes:
+#   "{"   - plain JSON (the original format)
+#   0x01  - schema-packed msgpack
+#   0x02  - schema-packed msgpack, zstd-compressed
+# Packed docs are positional lists instead of dicts, with known roles as small
+# ints: [id, question, [[role, text], ...], system_messages].
+#
+# TRAIL_CODEC selects what new writes use: json (default) or packed. Small
+# docs skip zstd, where its frame header would cost more than it saves.
+
+# --- Config ---
+TRAIL_CODEC = os.getenv("TRAIL_CODEC", "json").lower()
+TRAIL_ZSTD_LEVEL = int(os.getenv("TRAIL_ZSTD_LEVEL", "3"))
+TRAIL_ZSTD_MIN_BYTES = int(os.getenv("TRAIL_ZSTD_MIN_BYTES", "256"))
+
+TAG_PACKED = b"\x01"
+TAG_PACKED_ZSTD = b"\x02"
+
+_ROLE_CODES = {"human": 0, "AI_Interviewer": 1}
+_ROLE_NAMES = {code: role for role, code in _ROLE_CODES.items()}
+
+# Not thread-safe; only used from the event loop
+_compressor = zstandard.ZstdCompressor(level=TRAIL_ZSTD_LEVEL)
+_decompressor = zstandard.ZstdDecompressor()
+
+
+class TrailCodecError(ValueError):
+    pass
+
+
+# --- Packing ---
+def _pack(doc: dict) -> bytes:
+    answers = [[_ROLE_CODES.get(a["role"], a["role"]), a["text"]] for a in doc["answers"]]
+    return ormsgpack.packb([doc["id"], doc["question"], answers, doc["system_messages"]])
+
+
+def _unpack(raw: bytes) -> dict:
+    qid, question, answers, system_messages = ormsgpack.unpackb(raw)
+    return {
+        "id": qid,
+        "question": question,
+        "answers": [{"role": _ROLE_NAMES.get(role, role), "text": text} for role, text in answers],
+        "system_messages": system_messages,
+    }
+
+
+# --- Public API ---
+def encode_trail(doc: dict, codec: str = TRAIL_CODEC) -> bytes:
+    if codec != "packed":
+        return json.dumps(doc).encode("utf-8")
+    packed = _pack(doc)
+    if len(packed) < TRAIL_ZSTD_MIN_BYTES:
+        return TAG_PACKED + packed
+    return TAG_PACKED_ZSTD + _compressor.compress(packed)
+
+
+def decode_trail(raw: Union[bytes, str]) -> dict:
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    tag = raw[:1]
+    try:
+        if tag == b"{":
+            return json.loads(raw)
+        if tag == TAG_PACKED:
+            return _unpack(raw[1:])
+        if tag == TAG_PACKED_ZSTD:
+            return _unpack(_decompressor.decompress(raw[1:]))
+    except (ValueError, ormsgpack.MsgpackDecodeError, zstandard.ZstdError) as e:
+        raise TrailCodecError(f"Corrupt trail doc ({tag!r}): {e}") from e
+    raise TrailCodecError(f"Unknown trail doc format tag {tag!r}")
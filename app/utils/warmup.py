@@ -0,0 +1,124 @@
+import os
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+from dotenv import load_dotenv
+
+from app.utils.logger import get_logger
+from app.utils.metrics import Gauge
+
+load_dotenv()
+log = get_logger(__name__)
+
+# Start-up warm-up with a readiness signal.
+# Steps (open pools, create indexes, first LLM/TTS calls, spawn worker pools)
+# run concurrently in the background once the app starts, so a fresh pod
+# doesn't hand those cold costs to its first candidates. /ready answers 503
+# until every step has finished. A failed step is reported and otherwise
+# ignored, except for required steps: those are retried every WARMUP_RETRY_S
+# and keep the pod unready until they succeed.
+
+# --- Config ---
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+WARMUP_STEP_TIMEOUT_S = float(os.getenv("WARMUP_STEP_TIMEOUT_S", "30"))
+WARMUP_RETRY_S = float(os.getenv("WARMUP_RETRY_S", "2"))
+WARMUP_SKIP = {s.strip() for s in os.getenv("WARMUP_SKIP", "").split(",") if s.strip()}
+WARMUP_REDIS_CONNECTIONS = int(os.getenv("WARMUP_REDIS_CONNECTIONS", "10"))
+
+WARMUP_STEP_SECONDS = Gauge(
+    "warmup_step_seconds", "Time a start-up warm-up step took, by outcome.", ("step", "outcome")
+)
+SERVICE_READY = Gauge("service_ready", "1 once start-up warm-up has finished.")
+
+
+@dataclass
+class _Step:
+    fn: Callable[[], Awaitable[None]]
+    required: bool
+
+
+@dataclass
+class StepResult:
+    outcome: str  # running, ok, error, timeout, skipped
+    ms: float = 0.0
+    attempts: int = 0
+    error: str = ""
+
+
+class WarmUp:
+    def __init__(self):
+        self._steps: dict[str, _Step] = {}
+        self.results: dict[str, StepResult] = {}
+        self.total_ms = 0.0
+        self.done = False
+        self._task: Optional[asyncio.Task] = None
+
+    def step(self, name: str, fn: Callable[[], Awaitable[None]], required: bool = False) -> None:
+        self._steps[name] = _Step(fn, required)
+
+    @property
+    def ready(self) -> bool:
+        return self.done
+
+    def start(self) -> None:
+        if not WARMUP_ENABLED:
+            self.done = True
+            SERVICE_READY.set(1)
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        started = time.perf_counter()
+        await asyncio.gather(*(self._run_step(name, step) for name, step in self._steps.items()))
+        self.total_ms = (time.perf_counter() - started) * 1000
+        self.done = True
+        SERVICE_READY.set(1)
+        log.info(
+            "warmup.done",
+            total_ms=round(self.total_ms),
+            **{name: f"{r.outcome} {r.ms:.0f}ms" for name, r in self.results.items()},
+        )
+
+    async def _run_step(self, name: str, step: _Step) -> None:
+        if name in WARMUP_SKIP:
+            self.results[name] = StepResult("skipped")
+            return
+        result = self.results[name] = StepResult("running")
+        started = time.perf_counter()
+        while True:
+            result.attempts += 1
+            try:
+                await asyncio.wait_for(step.fn(), WARMUP_STEP_TIMEOUT_S)
+                result.outcome, result.error = "ok", ""
+            except asyncio.TimeoutError:
+                result.outcome, result.error = "timeout", f"took longer than {WARMUP_STEP_TIMEOUT_S:g}s"
+            except Exception as e:
+                result.outcome, result.error = "error", f"{type(e).__name__}: {e}"
+            result.ms = (time.perf_counter() - started) * 1000
+            if result.outcome == "ok" or not step.required:
+                break
+            log.warning("warmup.retry", step=name, attempt=result.attempts, error=result.error)
+            await asyncio.sleep(WARMUP_RETRY_S)
+
+        WARMUP_STEP_SECONDS.set(result.ms / 1000, step=name, outcome=result.outcome)
+        if result.outcome != "ok":
+            log.warning("warmup.step_failed", step=name, error=result.error)
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "total_ms": round(self.total_ms, 1) if self.done else None,
+            "steps": {
+                name: {"outcome": r.outcome, "ms": round(r.ms, 1), "attempts": r.attempts, **({"error": r.error} if r.error else {})}
+                for name, r in self.results.items()
+            },
+        }
+
+
+warmup = WarmUp()
@@ -0,0 +1,92 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import soundfile as sf
+
+from app.core.transcribe import transcriber, STT_WORKERS, WHISPER_MODEL, WHISPER_COMPUTE_TYPE
+
+# Real-time-factor benchmark for the on-box STT pool.
+# Usage: PYTHONPATH=. python test/benchmark_stt.py [audio files...] [--concurrency N]
+# With no files, a sample clip is synthesised from a scripted answer via gTTS.
+
+SAMPLE_TEXT = (
+    "When you type google.com into the browser, it checks if it already has the IP cached. "
+    "Once the IP is found, the browser uses TCP with a three-way handshake, then wraps it in TLS for HTTPS."
+)
+
+
+def print_divider():
+    print("=" * 60)
+
+
+def audio_duration(path: Path) -> float:
+    try:
+        return sf.info(str(path)).duration
+    except Exception:
+        # soundfile can't read every container (e.g. older libsndfile + mp3); fall back to av
+        import av
+        with av.open(str(path)) as container:
+            return float(container.duration or 0) / 1_000_000
+
+
+async def make_sample() -> Path:
+    from app.core.speak import text_to_speech
+    return Path(await text_to_speech(SAMPLE_TEXT, "stt_benchmark_sample"))
+
+
+async def run_benchmark(paths: list[Path], concurrency: int):
+    print_divider()
+    print(f"🎙️ STT benchmark — model={WHISPER_MODEL} compute={WHISPER_COMPUTE_TYPE} workers={STT_WORKERS}")
+    print_divider()
+
+    t0 = time.perf_counter()
+    await transcriber.warm_up()
+    print(f"🔥 Pool warm-up: {time.perf_counter() - t0:.2f} sec")
+
+    clips = [(path, path.read_bytes(), audio_duration(path)) for path in paths]
+
+    # Sequential: latency of a single chunk on an idle pool
+    for path, data, duration in clips:
+        t0 = time.perf_counter()
+        result = await transcriber.transcribe(data)
+        elapsed = time.perf_counter() - t0
+        rtf = elapsed / duration if duration else float("nan")
+        print(f"📄 {path.name}: audio={duration:.2f}s wall={elapsed:.2f}s RTF={rtf:.3f}")
+        print(f"   ↪ {result['text'][:100]}")
+
+    # Concurrent: many sessions submitting at once, exercising the batcher
+    batch = [clips[i % len(clips)] for i in range(concurrency)]
+    total_audio = sum(duration for _, _, duration in batch)
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(transcriber.transcribe(data) for _, data, _ in batch))
+    elapsed = time.perf_counter() - t0
+    errors = sum(1 for r in results if r["error"])
+
+    print_divider()
+    print(f"⚡ {concurrency} concurrent chunks: audio={total_audio:.1f}s wall={elapsed:.2f}s "
+          f"aggregate RTF={elapsed / total_audio:.3f} errors={errors}")
+    print(f"   throughput: {total_audio / elapsed:.1f} sec of audio per wall-clock sec")
+    print_divider()
+
+    transcriber.shutdown()
+
+
+def main():
+    args = sys.argv[1:]
+    concurrency = 16
+    if "--concurrency" in args:
+        idx = args.index("--concurrency")
+        concurrency = int(args[idx + 1])
+        del args[idx:idx + 2]
+
+    paths = [Path(a) for a in args]
+    if not paths:
+        paths = [asyncio.run(make_sample())]
+
+    asyncio.run(run_benchmark(paths, concurrency))
+
+
+if __name__ == "__main__":
+    main()
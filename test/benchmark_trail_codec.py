@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from app.utils.trail_codec import decode_trail, encode_trail
+
+# Trail doc codec: plain JSON vs packed (msgpack + zstd).
+# Reports stored bytes per session and encode/decode cost at a few trail
+# lengths. With --redis it also writes the docs to Redis and reads back
+# MEMORY USAGE, which includes per-key overhead.
+#
+#   PYTHONPATH=. python test/benchmark_trail_codec.py
+#   PYTHONPATH=. python test/benchmark_trail_codec.py --redis redis://localhost --sessions 2000
+
+CHUNKS = [
+    "When you type google.com into the browser, it checks if it already has the IP cached.",
+    "If not, the browser performs a DNS request to find the server's address, starting with the resolver.",
+    "Once the IP is found, the browser uses TCP with a three-way handshake, then wraps it in TLS for HTTPS.",
+    "The browser receives the HTML and parses it into a DOM tree, then issues more requests for linked resources.",
+    "Uh... I don't really remember exactly, but I think I worked with some people on the caching layer.",
+    "At first, I was frustrated, but then I offered to run a quick Git workshop for the rest of the team.",
+    "We put Redis in front of Postgres as a write-through cache and tuned the TTLs per endpoint.",
+    "I learned that patience and small leadership actions matter a lot when a release is slipping.",
+]
+
+
+def print_divider():
+    print("=" * 72)
+
+
+def make_doc(n_answers: int, rng: random.Random) -> dict:
+    answers = []
+    for i in range(n_answers):
+        # Transcripts grow chunk by chunk, so later answers repeat earlier words
+        text = " ".join(rng.choice(CHUNKS) for _ in range(rng.randint(1, 3)))
+        answers.append({"role": "human" if i % 3 else "AI_Interviewer", "text": text})
+    return {
+        "id": str(uuid.uuid4()),
+        "question": "AI_Interviewer: Can you walk me through what happens when you type google.com in the browser?",
+        "answers": answers,
+        "system_messages": [],
+    }
+
+
+def time_per_op(fn, docs, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for doc in docs:
+            fn(doc)
+    return (time.perf_counter() - started) / (repeat * len(docs)) * 1e6
+
+
+def bench_codec(docs: list[dict], codec: str, repeat: int) -> dict:
+    encoded = [encode_trail(doc, codec) for doc in docs]
+    assert all(decode_trail(raw) == doc for raw, doc in zip(encoded, docs)), f"{codec} round trip failed"
+    return {
+        "bytes": sum(map(len, encoded)) / len(encoded),
+        "encode_us": time_per_op(lambda doc: encode_trail(doc, codec), docs, repeat),
+        "decode_us": time_per_op(decode_trail, encoded, repeat),
+        "encoded": encoded,
+    }
+
+
+async def redis_memory(url: str, encoded: list[bytes]) -> float:
+    import redis.asyncio as redis
+
+    r = redis.from_url(url)
+    keys = [f"bench:trail:{uuid.uuid4()}" for _ in encoded]
+    try:
+        pipe = r.pipeline(transaction=False)
+        for key, raw in zip(keys, encoded):
+            pipe.set(key, raw)
+        await pipe.execute()
+        pipe = r.pipeline(transaction=False)
+        for key in keys:
+            pipe.memory_usage(key)
+        usage = await pipe.execute()
+        return sum(u or 0 for u in usage) / len(usage)
+    finally:
+        await r.delete(*keys)
+        await r.aclose()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Trail doc codec benchmark")
+    parser.add_argument("--sessions", type=int, default=500, help="Docs per trail length")
+    parser.add_argument("--answers", default="1,5,10,25", help="Comma-separated trail lengths")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--redis", help="Redis URL; also report MEMORY USAGE per key")
+    parser.add_argument("--json", help="Write results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    results = []
+    print_divider()
+    print(f"{'answers':>7} {'codec':>7} {'bytes':>9} {'ratio':>6} {'enc µs':>8} {'dec µs':>8} {'redis B':>9}")
+    print_divider()
+    for n_answers in (int(n) for n in args.answers.split(",")):
+        docs = [make_doc(n_answers, rng) for _ in range(args.sessions)]
+        baseline = None
+        for codec in ("json", "packed"):
+            stats = bench_codec(docs, codec, args.repeat)
+            encoded = stats.pop("encoded")
+            stats["redis_bytes"] = await redis_memory(args.redis, encoded) if args.redis else None
+            baseline = baseline or stats["bytes"]
+            stats.update(answers=n_answers, codec=codec, ratio=baseline / stats["bytes"])
+            results.append(stats)
+            redis_col = f"{stats['redis_bytes']:>9.0f}" if stats["redis_bytes"] is not None else f"{'-':>9}"
+            print(f"{n_answers:>7} {codec:>7} {stats['bytes']:>9.0f} {stats['ratio']:>5.2f}x "
+                  f"{stats['encode_us']:>8.1f} {stats['decode_us']:>8.1f} {redis_col}")
+    print_divider()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"📝 Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
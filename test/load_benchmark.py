@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+# Load generator for /interview/start and /interview/stream.
+#
+# Run the server against local fakes so results don't depend on Gemini, gTTS
+# or Cloudinary, e.g.:
+#   FAKE_BACKENDS=all FAKE_LLM_LATENCY_MS=600,1800 FAKE_LLM_ERROR_RATE=0.01 uvicorn app.main:app
+#   python test/load_benchmark.py --candidates 200 --chunks 7
+
+BASE_URL = "http://localhost:8000/interview"
+
+QUESTIONS = [
+    "Can you walk me through what happens when you type google.com in the browser and hit enter?",
+    "Tell me about a time you had to lead under pressure.",
+    "Explain how Axios and Webhooks work together and how to handle them securely.",
+]
+
+DISCUSSION_CHUNKS = [
+    "When you type google.com into the browser, it checks if it already has the IP cached.",
+    "If not, the browser performs a DNS request using the FTP protocol to find the server's MAC address.",
+    "Once the IP is found, the browser uses TCP with a three-way handshake, then wraps it in TLS for HTTPS.",
+    "HTTP is sent directly inside DNS, which is more efficient because it's closer to the user.",
+    "The browser receives the HTML and parses it into a DOM tree, then issues more requests for linked resources.",
+    "The browser stores the entire DOM in cookies for faster reload next time.",
+    "Once scripts and assets are loaded, the page is rendered and becomes interactive for the user.",
+    "Uh... I don't really remember exactly, but I think I worked with some people.",
+    "At first, I was frustrated, but then I offered to run a quick Git workshop.",
+    "I learned that patience and small leadership actions matter a lot.",
+]
+
+
+def print_divider():
+    print("=" * 78)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+class StageStats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, stage: str, latency: float, error: str = None):
+        self.latencies[stage].append(latency)
+        if error:
+            self.errors[stage][error] += 1
+
+    def summary(self) -> dict:
+        out = {}
+        for stage, values in self.latencies.items():
+            ordered = sorted(values)
+            errors = sum(self.errors[stage].values())
+            out[stage] = {
+                "count": len(ordered),
+                "errors": errors,
+                "error_rate": errors / len(ordered) if ordered else 0.0,
+                "error_kinds": dict(self.errors[stage]),
+                "p50_ms": percentile(ordered, 50) * 1000,
+                "p95_ms": percentile(ordered, 95) * 1000,
+                "p99_ms": percentile(ordered, 99) * 1000,
+                "max_ms": ordered[-1] * 1000 if ordered else float("nan"),
+            }
+        return out
+
+
+async def timed_post(client: httpx.AsyncClient, stats: StageStats, stage: str, url: str, payload: dict):
+    t0 = time.perf_counter()
+    try:
+        resp = await client.post(url, json=payload)
+    except httpx.TimeoutException:
+        stats.record(stage, time.perf_counter() - t0, "timeout")
+        return None
+    except httpx.HTTPError as e:
+        stats.record(stage, time.perf_counter() - t0, type(e).__name__)
+        return None
+
+    elapsed = time.perf_counter() - t0
+    if resp.status_code >= 400:
+        stats.record(stage, elapsed, f"http_{resp.status_code}")
+        return None
+
+    try:
+        body = resp.json()
+    except ValueError:
+        stats.record(stage, elapsed, "bad_json")
+        return None
+
+    # The pipeline reports TTS/upload failures in-band rather than via status code
+    if isinstance(body, dict) and str(body.get("message", "")).startswith("❌"):
+        stats.record(stage, elapsed, "pipeline_failed")
+        return body
+
+    stats.record(stage, elapsed)
+    return body
+
+
+async def simulate_candidate(idx: int, args, client: httpx.AsyncClient, stats: StageStats):
+    await asyncio.sleep(random.uniform(0, args.ramp_s))
+    candidate_id = f"bench_candidate_{idx}"
+
+    for _ in range(args.questions):
+        body = await timed_post(client, stats, "start", f"{args.base_url}/start", {
+            "questions": random.choice(QUESTIONS),
+            "candidate_id": candidate_id,
+        })
+        if not body:
+            return
+        qid = body["Qid"]
+
+        chunks = random.sample(DISCUSSION_CHUNKS, min(args.chunks, len(DISCUSSION_CHUNKS)))
+        for i, chunk in enumerate(chunks):
+            is_final = i == len(chunks) - 1
+            await timed_post(client, stats, "final" if is_final else "stream", f"{args.base_url}/stream", {
+                "Qid": qid,
+                "transcript": chunk,
+                "candidate_id": candidate_id,
+                "final_chunk": is_final,
+            })
+            if args.think_ms:
+                await asyncio.sleep(random.uniform(0.5, 1.5) * args.think_ms / 1000)
+
+
+async def fetch_server_metrics(client: httpx.AsyncClient, base_url: str) -> str:
+    root = base_url.rsplit("/interview", 1)[0]
+    try:
+        resp = await client.get(f"{root}/metrics")
+        return resp.text if resp.status_code == 200 else ""
+    except httpx.HTTPError:
+        return ""
+
+
+def histogram_quantiles(metrics_text: str, name: str, label: str) -> dict:
+    """Approximates p50/p95/p99 per `label` value from a scraped Prometheus histogram."""
+    buckets: dict[str, list[tuple[float, float]]] = defaultdict(list)
+    for line in metrics_text.splitlines():
+        if not line.startswith(f"{name}_bucket{{"):
+            continue
+        labels_part, value = line[len(name) + 8:].rsplit("} ", 1)
+        labels = dict(part.split("=", 1) for part in labels_part.split(","))
+        key = labels[label].strip('"')
+        le = labels["le"].strip('"')
+        buckets[key].append((float("inf") if le == "+Inf" else float(le), float(value)))
+
+    out = {}
+    for key, rows in buckets.items():
+        # Sum across other labels (e.g. outcome) bucket by bucket
+        merged: dict[float, float] = defaultdict(float)
+        for bound, count in rows:
+            merged[bound] += count
+        ordered = sorted(merged.items())
+        total = ordered[-1][1] if ordered else 0
+        if not total:
+            continue
+        quantiles = {}
+        for pct in (50, 95, 99):
+            target = total * pct / 100
+            prev_bound, prev_count = 0.0, 0.0
+            for bound, count in ordered:
+                if count >= target:
+                    if bound == float("inf"):
+                        quantiles[pct] = prev_bound
+                    else:
+                        frac = (target - prev_count) / (count - prev_count) if count > prev_count else 1.0
+                        quantiles[pct] = prev_bound + (bound - prev_bound) * frac
+                    break
+                prev_bound, prev_count = bound, count
+        out[key] = {"count": int(total), **{f"p{p}_ms": v * 1000 for p, v in quantiles.items()}}
+    return out
+
+
+def print_server_stages(metrics_text: str):
+    stages = histogram_quantiles(metrics_text, "interview_stage_seconds", "stage")
+    if not stages:
+        return
+    print("🖥️ server-side stages (approximated from /metrics histogram buckets)")
+    print(f"{'stage':<12}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, s in stages.items():
+        print(f"{stage:<12}{s['count']:>7}{s['p50_ms']:>10.0f}{s['p95_ms']:>10.0f}{s['p99_ms']:>10.0f}")
+    print_divider()
+
+
+def loop_stalls(metrics_text: str) -> dict[str, int]:
+    """event_loop_stalls_total by route, as reported by the server's loop monitor."""
+    stalls = {}
+    for line in metrics_text.splitlines():
+        if line.startswith("event_loop_stalls_total{"):
+            labels_part, value = line.rsplit("} ", 1)
+            route = labels_part.split('route="', 1)[1].rstrip('"')
+            stalls[route] = int(float(value))
+    return stalls
+
+
+def print_report(summary: dict, wall: float):
+    total = sum(s["count"] for s in summary.values())
+    errors = sum(s["errors"] for s in summary.values())
+    print_divider()
+    print(f"⏱️ wall={wall:.1f}s requests={total} throughput={total / wall:.1f} req/s errors={errors} ({errors / max(total, 1):.2%})")
+    print_divider()
+    print(f"{'stage':<8}{'count':>7}{'err%':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  errors")
+    for stage in ("start", "stream", "final"):
+        if stage not in summary:
+            continue
+        s = summary[stage]
+        kinds = ", ".join(f"{k}={v}" for k, v in s["error_kinds"].items())
+        print(f"{stage:<8}{s['count']:>7}{s['error_rate']:>8.2%}{s['p50_ms']:>10.0f}{s['p95_ms']:>10.0f}"
+              f"{s['p99_ms']:>10.0f}{s['max_ms']:>10.0f}  {kinds}")
+    print_divider()
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.candidates, max_keepalive_connections=args.candidates)
+    stats = StageStats()
+    async with httpx.AsyncClient(timeout=args.timeout_s, limits=limits) as client:
+        print(f"🚀 {args.candidates} candidates × {args.questions} question(s) × {args.chunks} chunks → {args.base_url}")
+        t0 = time.perf_counter()
+        await asyncio.gather(*(simulate_candidate(i, args, client, stats) for i in range(args.candidates)))
+        wall = time.perf_counter() - t0
+        server_metrics = await fetch_server_metrics(client, args.base_url)
+
+    summary = stats.summary()
+    print_report(summary, wall)
+    print_server_stages(server_metrics)
+
+    stalls = loop_stalls(server_metrics)
+    if stalls:
+        print(f"🐢 event-loop stalls (blocking calls on the loop): {stalls}")
+        print("   see the server's 'loop.stall' log lines for the offending stacks")
+        print_divider()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"wall_s": wall, "stages": summary, "loop_stalls": stalls, "server_metrics": server_metrics}, f, indent=2)
+        print(f"📝 Wrote {args.json}")
+
+    # Lets CI treat a blocking call sneaking back onto the loop as a failure
+    if args.fail_on_stall and stalls:
+        raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent interview load benchmark")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--candidates", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=1, help="questions per candidate")
+    parser.add_argument("--chunks", type=int, default=7, help="chunks per question (last one is final)")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between chunks")
+    parser.add_argument("--ramp-s", type=float, default=2.0, help="spread candidate arrivals over this window")
+    parser.add_argument("--timeout-s", type=float, default=60.0)
+    parser.add_argument("--json", help="also write the summary to this file")
+    parser.add_argument("--fail-on-stall", action="store_true", help="exit non-zero if the server reported event-loop stalls")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+
+import httpx
+
+# Replays recorded interview sessions through /interview/start + /interview/stream
+# and compares runs of two pipeline versions.
+#
+# Pair it with cassette replay on the server, so LLM/TTS/upload answers (and
+# their latencies) come from a recording instead of the network:
+#   CASSETTE_MODE=record uvicorn app.main:app              # once, against real backends
+#   CASSETTE_MODE=replay CASSETTE_LATENCY_SCALE=1 LLM_HEDGE_ENABLED=0 uvicorn app.main:app
+#   python test/replay_sessions.py --from-mongo 50 --save-sessions sessions.jsonl --json base.json
+#   ...switch pipeline version, restart the server...
+#   python test/replay_sessions.py --sessions sessions.jsonl --json new.json --compare base.json
+#
+# A session is {"id", "candidate_id", "question", "chunks": [transcript, ...]}.
+# --from-mongo rebuilds them from the full_trail of final_responses documents.
+
+BASE_URL = "http://localhost:8000/interview"
+
+_QUESTION_LINE = re.compile(r"^Q \([^)]*\): (?:[\w ]+: )?(.*)$")
+_ANSWER_LINE = re.compile(r"^A\d+ \((\w+)\): (.*)$")
+
+
+def print_divider():
+    print("=" * 78)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def session_from_trail(session_id: str, candidate_id: str, full_trail: str):
+    """Question and human answer chunks of a formatted trail (see format_conversation)."""
+    question, chunks = None, []
+    for line in full_trail.splitlines():
+        if question is None:
+            match = _QUESTION_LINE.match(line)
+            if match:
+                question = match.group(1)
+            continue
+        match = _ANSWER_LINE.match(line)
+        if match:
+            chunks.append([match.group(1), match.group(2)])
+        elif chunks:
+            chunks[-1][1] += "\n" + line  # multi-line answer
+    human = [text for role, text in chunks if role == "human"]
+    if question is None or not human:
+        return None
+    return {"id": session_id, "candidate_id": candidate_id, "question": question, "chunks": human}
+
+
+async def load_from_mongo(limit: int) -> list[dict]:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    cursor = client["interview_db"]["final_responses"].find({}, {"qid": 1, "candidate_id": 1, "full_trail": 1})
+    sessions = []
+    async for doc in cursor.sort("timestamp", -1).limit(limit):
+        session = session_from_trail(doc["qid"], doc.get("candidate_id", "replay"), doc.get("full_trail", ""))
+        if session:
+            sessions.append(session)
+    client.close()
+    return sessions[::-1]
+
+
+def load_sessions(path: str) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def replay_session(session: dict, args, client: httpx.AsyncClient) -> dict:
+    out = {"id": session["id"], "chunk_ms": [], "final_ms": None, "final": None, "errors": []}
+    try:
+        resp = await client.post(f"{args.base_url}/start", json={
+            "questions": session["question"],
+            "candidate_id": session["candidate_id"],
+        })
+        resp.raise_for_status()
+        qid = resp.json()["Qid"]
+
+        for seq, transcript in enumerate(session["chunks"]):
+            is_final = seq == len(session["chunks"]) - 1
+            t0 = time.perf_counter()
+            resp = await client.post(f"{args.base_url}/stream", json={
+                "Qid": qid,
+                "candidate_id": session["candidate_id"],
+                "transcript": transcript,
+                "final_chunk": is_final,
+                "seq": seq,
+            })
+            elapsed = (time.perf_counter() - t0) * 1000
+            if resp.status_code >= 400:
+                out["errors"].append(f"http_{resp.status_code}")
+                continue
+            body = resp.json()
+            if is_final:
+                out["final_ms"] = elapsed
+                out["final"] = {k: body.get(k) for k in ("status", "priority", "question")} if "Qid" in body else body
+            else:
+                out["chunk_ms"].append(elapsed)
+                if str(body.get("message", "")).startswith("❌"):
+                    out["errors"].append("pipeline_failed")
+            if args.chunk_gap_ms:
+                await asyncio.sleep(args.chunk_gap_ms / 1000)
+    except httpx.HTTPError as e:
+        out["errors"].append(type(e).__name__)
+    return out
+
+
+def summarize(results: list[dict]) -> dict:
+    chunk = sorted(ms for r in results for ms in r["chunk_ms"])
+    final = sorted(r["final_ms"] for r in results if r["final_ms"] is not None)
+    return {
+        "sessions": len(results),
+        "errors": sum(len(r["errors"]) for r in results),
+        "chunk_p50_ms": percentile(chunk, 50),
+        "chunk_p95_ms": percentile(chunk, 95),
+        "final_p50_ms": percentile(final, 50),
+        "final_p95_ms": percentile(final, 95),
+    }
+
+
+def print_comparison(summary: dict, results: list[dict], base: dict):
+    print(f"{'':<14}{'base':>10}{'this run':>10}{'delta':>10}")
+    for key in ("chunk_p50_ms", "chunk_p95_ms", "final_p50_ms", "final_p95_ms", "errors"):
+        old, new = base["summary"][key], summary[key]
+        print(f"{key:<14}{old:>10.0f}{new:>10.0f}{new - old:>+10.0f}")
+    base_finals = {r["id"]: r["final"] for r in base["results"]}
+    changed = [r["id"] for r in results if r["id"] in base_finals and r["final"] != base_finals[r["id"]]]
+    print(f"final decisions changed: {len(changed)}/{len(results)}")
+    for session_id in changed[:10]:
+        print(f"  {session_id}")
+    print_divider()
+
+
+async def run(args):
+    if args.from_mongo:
+        sessions = await load_from_mongo(args.from_mongo)
+    elif args.sessions:
+        sessions = load_sessions(args.sessions)
+    else:
+        raise SystemExit("Pass --sessions FILE or --from-mongo N")
+    if args.save_sessions:
+        with open(args.save_sessions, "w") as f:
+            f.writelines(json.dumps(s) + "\n" for s in sessions)
+        print(f"📝 Wrote {len(sessions)} sessions to {args.save_sessions}")
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def bounded(session):
+        async with semaphore:
+            return await replay_session(session, args, client)
+
+    async with httpx.AsyncClient(timeout=args.timeout_s) as client:
+        print(f"🔁 Replaying {len(sessions)} sessions → {args.base_url}")
+        results = await asyncio.gather(*(bounded(s) for s in sessions))
+
+    summary = summarize(results)
+    print_divider()
+    print(f"sessions={summary['sessions']} errors={summary['errors']}")
+    print(f"chunk p50={summary['chunk_p50_ms']:.0f}ms p95={summary['chunk_p95_ms']:.0f}ms  "
+          f"final p50={summary['final_p50_ms']:.0f}ms p95={summary['final_p95_ms']:.0f}ms")
+    print_divider()
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(summary, results, json.load(f))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "results": results}, f, indent=2)
+        print(f"📝 Wrote {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded interview sessions")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--sessions", help="JSONL file of sessions")
+    parser.add_argument("--from-mongo", type=int, default=0, help="rebuild the N latest sessions from final_responses")
+    parser.add_argument("--save-sessions", help="write the sessions being replayed to this JSONL file")
+    parser.add_argument("--concurrency", type=int, default=4, help="sessions replayed at once")
+    parser.add_argument("--chunk-gap-ms", type=float, default=0, help="pause between a session's chunks")
+    parser.add_argument("--timeout-s", type=float, default=60.0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
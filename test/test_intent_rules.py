@@ -0,0 +1,47 @@
+import time
+
+from app.services.intent_rules import intent_rules
+
+# Intent fast path: rule hits and a timing regression for the filler regex.
+# Stuttered fillers ("hmmmm...") used to backtrack exponentially and block the
+# event loop for seconds; every match here must stay well under a millisecond.
+#
+#   PYTHONPATH=. python test/test_intent_rules.py
+
+MAX_MS = 5.0
+
+CASES = [
+    ("can you repeat the question", "repeat"),
+    ("Sorry, I didn't catch that.", "repeat"),
+    ("um", "filler"),
+    ("umm uh let me think", "filler"),
+    ("okay so give me a second", "filler"),
+    ("I built the cache layer with Redis", None),
+]
+
+STUTTERS = [
+    "hm" + "m" * 40 + " what",
+    "um" * 30,
+    " ".join(["ummm"] * 6) + " x",
+    "hm" + "m" * 195,
+    "h" + "m" * 5000,
+]
+
+
+def main():
+    for text, expected in CASES:
+        match = intent_rules.match(text)
+        got = match.intent if match else None
+        assert got == expected, f"{text!r}: expected {expected}, got {got}"
+        print(f"ok      {text!r} -> {got}")
+
+    for text in STUTTERS:
+        started = time.perf_counter()
+        intent_rules.match(text)
+        ms = (time.perf_counter() - started) * 1000
+        assert ms < MAX_MS, f"{text[:20]!r}... ({len(text)} chars) took {ms:.1f} ms"
+        print(f"ok      {len(text):>5} chars in {ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+import numpy as np
+import xxhash
+
+from app.services.distilled_classifier import (
+    ACTIONS, DISTILLED_CONFIDENCE, DISTILLED_DIM, DistilledClassifier, featurize,
+)
+
+# Offline pipeline for the distilled decision classifier.
+#   export:   decision_log (LLM decisions, one per chunk) -> JSONL
+#   train:    JSONL -> model .npz, evaluated on a held-out split by Qid
+#   evaluate: agreement with the LLM and latency on the held-out split
+#
+#   PYTHONPATH=. python test/train_decision_classifier.py export --out decisions.jsonl
+#   PYTHONPATH=. python test/train_decision_classifier.py train --data decisions.jsonl --out decision_model.npz
+#   PYTHONPATH=. python test/train_decision_classifier.py evaluate --data decisions.jsonl --model decision_model.npz
+# Serve with DISTILLED_MODEL_PATH=decision_model.npz (and DISTILLED_CONFIDENCE).
+
+
+def print_divider():
+    print("=" * 60)
+
+
+# --- export ---
+async def export(out_path: str) -> None:
+    from app.services.mongo import decision_log_collection
+
+    # One row per logged LLM decision: the trail and chunk it was made for, and its action.
+    # final_responses is not used: its decision is the winner across all chunks of a
+    # question, not the label of any one chunk.
+    written = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        async for doc in decision_log_collection.find({"source": "llm", "action": {"$in": ACTIONS}}):
+            out.write(json.dumps({
+                "qid": doc.get("qid", ""),
+                "question_trail": doc["question_trail"],
+                "transcript": doc["transcript"],
+                "action": doc["action"],
+                "latency_ms": doc.get("latency_ms"),
+            }) + "\n")
+            written += 1
+
+    print(f"📝 Wrote {out_path}: {written} decisions")
+
+
+# --- train / evaluate ---
+def load_rows(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [row for row in map(json.loads, f) if row.get("action") in ACTIONS]
+
+
+def split(rows: list[dict], holdout: float) -> tuple[list[dict], list[dict]]:
+    """Held-out set by Qid, so chunks of one question never land on both sides."""
+    train, test = [], []
+    for row in rows:
+        bucket = xxhash.xxh32_intdigest(row.get("qid") or row["transcript"]) % 1000
+        (test if bucket < holdout * 1000 else train).append(row)
+    return train, test
+
+
+def _pairs(rows: list[dict]) -> list[tuple[str, str]]:
+    return [(row["question_trail"], row["transcript"]) for row in rows]
+
+
+def _labels(rows: list[dict], labels: list[str]) -> np.ndarray:
+    return np.asarray([labels.index(row["action"]) for row in rows], dtype=np.int64)
+
+
+def report(model: DistilledClassifier, rows: list[dict], threshold: float) -> dict:
+    if not rows:
+        print("⚠️ Empty held-out set")
+        return {}
+    y = _labels(rows, model.labels)
+    proba = model.predict_proba(featurize(_pairs(rows), model.dim))
+    pred, confidence = proba.argmax(axis=1), proba.max(axis=1)
+    confident = confidence >= threshold
+
+    # Per-prediction latency as served (one chunk at a time)
+    timings = []
+    for question_trail, transcript in _pairs(rows[:500]):
+        started = time.perf_counter()
+        model.predict(question_trail, transcript)
+        timings.append((time.perf_counter() - started) * 1000)
+    llm_latencies = [row["latency_ms"] for row in rows if row.get("latency_ms")]
+
+    summary = {
+        "n": len(rows),
+        "agreement": float((pred == y).mean()),
+        "threshold": threshold,
+        "coverage": float(confident.mean()),
+        "agreement_when_confident": float((pred[confident] == y[confident]).mean()) if confident.any() else None,
+        "distilled_p50_ms": float(np.percentile(timings, 50)),
+        "distilled_p95_ms": float(np.percentile(timings, 95)),
+        "llm_p50_ms": float(np.percentile(llm_latencies, 50)) if llm_latencies else None,
+        "llm_p95_ms": float(np.percentile(llm_latencies, 95)) if llm_latencies else None,
+    }
+
+    print_divider()
+    print(f"🎯 held-out n={summary['n']} agreement with LLM={summary['agreement']:.1%}")
+    if summary["agreement_when_confident"] is not None:
+        print(f"   at confidence ≥ {threshold}: coverage={summary['coverage']:.1%} "
+              f"agreement={summary['agreement_when_confident']:.1%}")
+    print(f"⏱️ distilled p50={summary['distilled_p50_ms']:.2f} ms p95={summary['distilled_p95_ms']:.2f} ms", end="")
+    if summary["llm_p50_ms"] is not None:
+        print(f" | LLM classifier p50={summary['llm_p50_ms']:.0f} ms p95={summary['llm_p95_ms']:.0f} ms")
+    else:
+        print()
+    print_divider()
+    print(f"{'action':<17}{'support':>8}{'precision':>11}{'recall':>8}")
+    for i, label in enumerate(model.labels):
+        support = int((y == i).sum())
+        predicted = int((pred == i).sum())
+        hits = int(((pred == i) & (y == i)).sum())
+        precision = hits / predicted if predicted else 0.0
+        recall = hits / support if support else 0.0
+        print(f"{label:<17}{support:>8}{precision:>11.1%}{recall:>8.1%}")
+    print_divider()
+    return summary
+
+
+def train(args) -> None:
+    rows = load_rows(args.data)
+    train_rows, test_rows = split(rows, args.holdout)
+    print(f"📚 {len(rows)} labelled chunks: train={len(train_rows)} held-out={len(test_rows)}")
+    print(f"   labels: {dict(Counter(row['action'] for row in train_rows))}")
+    if not train_rows:
+        print("⚠️ Nothing to train on")
+        return
+
+    model = DistilledClassifier.empty(dim=args.dim)
+    started = time.perf_counter()
+    model.fit(featurize(_pairs(train_rows), args.dim), _labels(train_rows, model.labels),
+              epochs=args.epochs, lr=args.lr)
+    print(f"🏋️ trained in {time.perf_counter() - started:.1f}s")
+    model.save(args.out)
+    print(f"💾 Saved {args.out}")
+    report(model, test_rows, args.threshold)
+
+
+def evaluate(args) -> None:
+    _, test_rows = split(load_rows(args.data), args.holdout)
+    summary = report(DistilledClassifier.load(args.model), test_rows, args.threshold)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"📝 Wrote {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distilled decision classifier: export, train, evaluate")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="Dump labelled decisions from Mongo to JSONL")
+    p_export.add_argument("--out", default="decisions.jsonl")
+
+    for name in ("train", "evaluate"):
+        p = sub.add_parser(name)
+        p.add_argument("--data", default="decisions.jsonl")
+        p.add_argument("--holdout", type=float, default=0.2, help="Fraction of Qids held out")
+        p.add_argument("--threshold", type=float, default=DISTILLED_CONFIDENCE)
+        if name == "train":
+            p.add_argument("--out", default="decision_model.npz")
+            p.add_argument("--dim", type=int, default=DISTILLED_DIM)
+            p.add_argument("--epochs", type=int, default=20)
+            p.add_argument("--lr", type=float, default=2.0)
+        else:
+            p.add_argument("--model", default="decision_model.npz")
+            p.add_argument("--json", help="Also write the summary as JSON")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        asyncio.run(export(args.out))
+    elif args.command == "train":
+        train(args)
+    else:
+        evaluate(args)
+
+
+if __name__ == "__main__":
+    main()